@@ -0,0 +1,45 @@
+"""ASGI entry point.
+
+The async Gemini-bound handlers under /api run on a Quart app; every other
+path is handed to the existing Flask app, which keeps serving the pages.
+Run with an ASGI server, for example:
+
+    hypercorn asgi:app --bind 0.0.0.0:5000
+
+The WSGI entry point in main.py is unchanged.
+"""
+import logging
+from quart import Quart
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from config import ASGI_MAX_BODY_BYTES, MAX_UPLOAD_BYTES
+from main import app as flask_app
+from routes.async_api import api_bp
+from routes.metrics import init_async_request_metrics
+from services.async_gemini_client import close_async_gemini_client
+
+logger = logging.getLogger(__name__)
+
+# Initialize the async app
+api_app = Quart(__name__)
+# The /api handlers take one document, so the single-upload limit applies
+api_app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+# Generation can outlast the default 60 s limits on bodies and responses
+api_app.config['BODY_TIMEOUT'] = None
+api_app.config['RESPONSE_TIMEOUT'] = None
+api_app.register_blueprint(api_bp)
+init_async_request_metrics(api_app)
+
+@api_app.after_serving
+async def close_clients():
+    """Close pooled Gemini connections on shutdown."""
+    await close_async_gemini_client()
+
+# The Flask app runs on the server's thread pool
+wsgi_app = AsyncioWSGIMiddleware(flask_app, max_body_size=ASGI_MAX_BODY_BYTES)
+
+async def app(scope, receive, send):
+    """Route /api and lifespan events to the async app, everything else to Flask."""
+    if scope['type'] == 'lifespan' or scope['path'].startswith(api_bp.url_prefix + '/'):
+        await api_app(scope, receive, send)
+    else:
+        await wsgi_app(scope, receive, send)
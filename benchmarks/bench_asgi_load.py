@@ -0,0 +1,170 @@
+"""Load-test the WSGI and ASGI serving paths against a local Gemini stub.
+
+Both modes run under the same ASGI server (hypercorn) in a subprocess and
+differ only in the handler: "wsgi" posts to the Flask /explain/process
+view, which holds one thread of a bounded pool for the whole Gemini call,
+and "asgi" posts to the Quart /api/explain view, which awaits the call on
+the event loop. The stub answers after a fixed latency, so throughput is
+bounded by how many generations each mode can keep in flight.
+
+Usage:
+    python benchmarks/bench_asgi_load.py --requests 2000 --concurrency 400 --latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+
+import aiohttp
+from benchmarks.gemini_stub import GeminiStubServer
+
+MODES = {
+    "wsgi": "/explain/process",
+    "asgi": "/api/explain"
+}
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _serve(mode: str, port: int, threads: int):
+    """Run the app for one mode under hypercorn (subprocess entry point)."""
+    from concurrent.futures import ThreadPoolExecutor
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+    
+    import asgi
+    logging.disable(logging.CRITICAL)
+    try:
+        # Keep database writes in-process so both modes pay the same cost
+        import mongomock
+        import models
+        models.mongo.db = mongomock.MongoClient().db
+    except ImportError:
+        pass
+    
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.backlog = 2048
+    config.accesslog = None
+    app = asgi.app if mode == "asgi" else asgi.wsgi_app
+    
+    async def main():
+        # The WSGI app runs on the loop's default executor: a bounded thread pool
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=threads))
+        await serve(app, config)
+    
+    asyncio.run(main())
+
+def _start_server(mode: str, api_base: str, threads: int):
+    port = _free_port()
+    env = dict(os.environ, GEMINI_API_BASE=api_base, RESPONSE_CACHE_BACKEND="none",
+               MONGO_URI="mongodb://127.0.0.1:1/benchmark?serverSelectionTimeoutMS=100")
+    process = subprocess.Popen(
+        [sys.executable, __file__, "--serve", mode, "--port", str(port), "--threads", str(threads)],
+        env=env, cwd=ROOT
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+async def _load(base_url: str, path: str, total: int, concurrency: int):
+    """Issue ``total`` requests with at most ``concurrency`` in flight.
+    
+    Returns:
+        (elapsed seconds, sorted latencies of successful requests, error count)
+    """
+    latencies = []
+    errors = 0
+    next_index = 0
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=300)
+    
+    async with aiohttp.ClientSession(base_url, connector=connector, timeout=timeout) as client:
+        async def worker():
+            nonlocal next_index, errors
+            while next_index < total:
+                index = next_index
+                next_index += 1
+                start = time.perf_counter()
+                try:
+                    async with client.post(path, data={"topic": f"benchmark topic {index}"}) as response:
+                        await response.read()
+                        if response.status == 200:
+                            latencies.append(time.perf_counter() - start)
+                        else:
+                            errors += 1
+                except aiohttp.ClientError:
+                    errors += 1
+        
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return elapsed, sorted(latencies), errors
+
+def _percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per mode")
+    parser.add_argument("--concurrency", type=int, default=200, help="Requests kept in flight")
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub latency in seconds")
+    parser.add_argument("--threads", type=int, default=32, help="WSGI worker threads")
+    parser.add_argument("--modes", default="wsgi,asgi", help="Comma-separated modes to run")
+    parser.add_argument("--serve", choices=sorted(MODES), help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.serve:
+        _serve(args.serve, args.port, args.threads)
+        return
+    
+    results = {}
+    with GeminiStubServer(latency=args.latency) as stub:
+        for mode in args.modes.split(","):
+            process, base_url = _start_server(mode, stub.api_base, args.threads)
+            try:
+                # One warm-up round opens the upstream connections
+                asyncio.run(_load(base_url, MODES[mode], min(args.concurrency, 50), min(args.concurrency, 50)))
+                elapsed, latencies, errors = asyncio.run(
+                    _load(base_url, MODES[mode], args.requests, args.concurrency)
+                )
+            finally:
+                process.terminate()
+                process.wait()
+            results[mode] = {
+                "requests": args.requests,
+                "errors": errors,
+                "seconds": round(elapsed, 3),
+                "requests_per_sec": round(len(latencies) / elapsed, 1),
+                "p50_ms": round(_percentile(latencies, 0.50) * 1000, 1),
+                "p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+                "p99_ms": round(_percentile(latencies, 0.99) * 1000, 1)
+            }
+    
+    if "wsgi" in results and "asgi" in results and results["wsgi"]["requests_per_sec"]:
+        results["speedup"] = round(results["asgi"]["requests_per_sec"] / results["wsgi"]["requests_per_sec"], 2)
+    results["config"] = {"concurrency": args.concurrency, "latency": args.latency, "wsgi_threads": args.threads}
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
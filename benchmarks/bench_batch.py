@@ -0,0 +1,80 @@
+"""Benchmark batch summarization throughput against the local Gemini stub.
+
+Spools ``--files`` synthetic documents (a mix of txt, pdf and docx) and
+runs them through services.batch_processor.process_batch with several
+summary concurrency levels. The stub answers after a fixed latency, so
+with enough concurrency the wall time is bounded by upstream latency
+times files / concurrency rather than by the file count alone.
+
+Usage:
+    python benchmarks/bench_batch.py --files 40 --latency 0.5 --concurrency 1 4 8
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+os.environ.setdefault("RESPONSE_CACHE_BACKEND", "none")
+
+from benchmarks.gemini_stub import GeminiStubServer
+from benchmarks.synthetic_docs import make_docx, make_pdf, make_text
+
+def _make_uploads(count: int, seed: int):
+    """Build (filename, bytes) pairs cycling through the supported types."""
+    builders = (
+        ("txt", lambda doc_seed: make_text(40, seed=doc_seed).encode("utf-8")),
+        ("pdf", lambda doc_seed: make_pdf(8, seed=doc_seed)),
+        ("docx", lambda doc_seed: make_docx(40, tables=2, seed=doc_seed))
+    )
+    return [(f"doc{index}.{builders[index % 3][0]}", builders[index % 3][1](seed + index))
+            for index in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=40, help="Documents in the batch")
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub latency in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8], help="Summary concurrency levels")
+    args = parser.parse_args()
+    
+    os.environ["EXTRACTION_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench-batch-")
+    from werkzeug.datastructures import FileStorage
+    from services.batch_processor import BatchCollector, process_batch
+    from services.gemini_client import GeminiClient, create_session
+    from services.pdf_extractor import get_extraction_pool
+    
+    # Start the pool up front, as a running server would have
+    pool = get_extraction_pool()
+    pool.submit(os.getpid).result()
+    
+    results = {"files": args.files, "latency_s": args.latency, "runs": []}
+    with GeminiStubServer(latency=args.latency) as stub:
+        for concurrency in args.concurrency:
+            client = GeminiClient(session=create_session(pool_size=concurrency), api_base=stub.api_base)
+            collector = BatchCollector()
+            # New documents for every run, so none comes from the extraction or response cache
+            for filename, data in _make_uploads(args.files, seed=concurrency * args.files):
+                collector.add_upload(FileStorage(io.BytesIO(data), filename=filename))
+            
+            before = stub.request_count
+            start = time.perf_counter()
+            outcomes = list(process_batch(collector.items, client.generate_summary, concurrency=concurrency))
+            elapsed = time.perf_counter() - start
+            collector.cleanup()
+            results["runs"].append({
+                "concurrency": concurrency,
+                "seconds": round(elapsed, 3),
+                "files_per_sec": round(len(outcomes) / elapsed, 2),
+                "failed": sum(1 for outcome in outcomes if outcome[3]),
+                "upstream_requests": stub.request_count - before
+            })
+    
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark coalescing of identical concurrent summary requests.
+
+Simulates a class uploading the same handout at once: ``--callers``
+threads call GeminiClient.generate_summary with the same document against
+the local stub, with and without single-flight coalescing, and with the
+MongoDB lease across several simulated processes (mongomock stands in
+for the database). The response cache is disabled for the in-process
+runs so only coalescing can save calls.
+
+Usage:
+    python benchmarks/bench_coalescing.py --callers 200 --latency 0.5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+
+from benchmarks.gemini_stub import GeminiStubServer
+from services.gemini_client import GeminiClient, create_session
+from services.response_cache import ResponseCache, MongoCacheBackend
+from services.single_flight import MongoLease
+
+def _run(stub, clients, callers: int):
+    """Have ``callers`` threads summarize the same document, spread over the clients."""
+    before = stub.request_count
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        list(pool.map(lambda index: clients[index % len(clients)].generate_summary("the shared handout"),
+                      range(callers)))
+    return {
+        "seconds": round(time.perf_counter() - start, 3),
+        "upstream_requests": stub.request_count - before,
+        "coalescing": [client.coalescing_stats() for client in clients]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--callers", type=int, default=200, help="Concurrent identical requests")
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub latency in seconds")
+    parser.add_argument("--processes", type=int, default=4, help="Simulated processes for the lease run")
+    args = parser.parse_args()
+    
+    results = {}
+    with GeminiStubServer(latency=args.latency) as stub:
+        session = create_session(pool_size=args.callers)
+        
+        uncoalesced = GeminiClient(session=session, api_base=stub.api_base)
+        uncoalesced.single_flight = None
+        results["no_coalescing"] = _run(stub, [uncoalesced], args.callers)
+        
+        results["single_flight"] = _run(stub, [GeminiClient(session=session, api_base=stub.api_base)], args.callers)
+        
+        import mongomock
+        import models
+        models.mongo.db = mongomock.MongoClient().db
+        cache = ResponseCache(MongoCacheBackend())
+        processes = [
+            GeminiClient(session=session, api_base=stub.api_base, cache=cache, lease=MongoLease(poll_interval=0.05))
+            for _ in range(args.processes)
+        ]
+        results["mongo_lease"] = _run(stub, processes, args.callers)
+    
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark DOCX extraction on a large synthetic document.
+
+Compares the previous python-docx path, which loads the whole document
+model and reads only ``doc.paragraphs``, with the streaming extractor in
+services/docx_extractor.py, which iterparses word/document.xml and also
+returns table text. Each mode runs in a fresh subprocess so its peak RSS
+is measured in isolation; the RSS after imports is reported as the
+baseline. Peak memory is read from /proc where available.
+
+Usage:
+    python benchmarks/bench_docx_extraction.py --paragraphs 20000 --tables 500
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+
+def _legacy_extract(path: str) -> int:
+    """The extraction path file_processor used before the streaming extractor."""
+    import docx
+    with open(path, 'rb') as handle:
+        doc = docx.Document(io.BytesIO(handle.read()))
+    text = "\n\n".join([paragraph.text for paragraph in doc.paragraphs])
+    return len(text)
+
+def _streaming_extract(path: str) -> int:
+    from services.docx_extractor import extract_docx
+    with open(path, 'rb') as handle:
+        return len(extract_docx(handle))
+
+def _status_kb(field: str) -> int:
+    """Read a memory figure of this process from /proc/self/status.
+    
+    Unlike ru_maxrss, VmHWM is not inherited from the parent across exec,
+    so the child's peak is not masked by the parent's generated document.
+    """
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _child(mode: str, path: str):
+    # Import before measuring the baseline so it covers the library code
+    if mode == "legacy":
+        import docx  # noqa: F401
+    else:
+        import services.docx_extractor  # noqa: F401
+    baseline = _status_kb("VmRSS")
+    start = time.perf_counter()
+    chars = _legacy_extract(path) if mode == "legacy" else _streaming_extract(path)
+    elapsed = time.perf_counter() - start
+    peak = _status_kb("VmHWM")
+    print(json.dumps({"seconds": elapsed, "chars": chars, "baseline_rss_kb": baseline,
+                      "peak_rss_kb": peak, "extraction_rss_kb": peak - baseline}))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--paragraphs", type=int, default=20000)
+    parser.add_argument("--tables", type=int, default=500, help="4x3 tables spread through the document")
+    parser.add_argument("--child", choices=["legacy", "streaming"], help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        _child(args.child, args.path)
+        return
+    
+    from benchmarks.synthetic_docs import make_docx
+    data = make_docx(args.paragraphs, tables=args.tables)
+    with tempfile.NamedTemporaryFile(suffix=".docx", delete=False) as handle:
+        handle.write(data)
+        path = handle.name
+    
+    results = {"paragraphs": args.paragraphs, "tables": args.tables, "file_bytes": len(data)}
+    try:
+        for mode in ("legacy", "streaming"):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", mode, "--path", path],
+                check=True, capture_output=True, text=True, cwd=ROOT
+            ).stdout
+            run = json.loads(output.strip().splitlines()[-1])
+            run["paragraphs_per_sec"] = round(args.paragraphs / run["seconds"], 1)
+            run["seconds"] = round(run["seconds"], 3)
+            results[mode] = run
+    finally:
+        os.unlink(path)
+    
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark the pooled Gemini transport against one connection per call.
+
+Runs GeminiClient.generate_summary against a local stub server twice:
+once over the shared keep-alive session, and once with a fresh session
+(and therefore a fresh TCP connection) for every call.
+
+Usage:
+    python benchmarks/bench_http_pool.py --requests 2000 --threads 8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+
+import requests
+from benchmarks.gemini_stub import GeminiStubServer
+from services.gemini_client import GeminiClient, create_session
+
+def _run(make_client, total: int, threads: int) -> float:
+    """Issue ``total`` summary calls across ``threads`` workers.
+    
+    Returns:
+        Elapsed wall-clock seconds
+    """
+    def call(_):
+        make_client().generate_summary("benchmark content")
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(call, range(total)))
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000, help="Calls per mode")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent callers")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub latency in seconds")
+    args = parser.parse_args()
+    
+    results = {}
+    with GeminiStubServer(latency=args.latency) as stub:
+        pooled_client = GeminiClient(session=create_session(pool_size=args.threads), api_base=stub.api_base)
+        
+        def unpooled_client():
+            # A brand-new session per call means a brand-new connection per call
+            session = requests.Session()
+            session.headers["Connection"] = "close"
+            return GeminiClient(session=session, api_base=stub.api_base)
+        
+        for name, factory in (("pooled", lambda: pooled_client), ("per_call", unpooled_client)):
+            connections_before = stub.connection_count
+            elapsed = _run(factory, args.requests, args.threads)
+            results[name] = {
+                "requests": args.requests,
+                "seconds": round(elapsed, 4),
+                "requests_per_sec": round(args.requests / elapsed, 1),
+                "connections_opened": stub.connection_count - connections_before
+            }
+    
+    results["speedup"] = round(results["pooled"]["requests_per_sec"] / results["per_call"]["requests_per_sec"], 2)
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
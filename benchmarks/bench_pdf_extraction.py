@@ -0,0 +1,104 @@
+"""Benchmark PDF extraction on a synthetic multi-page document.
+
+Compares the previous in-memory, serial extraction (BytesIO plus
+``text += ...``) with the spooled, memory-mapped, page-parallel pipeline
+in services/pdf_extractor.py. Each mode runs in a fresh subprocess so its
+peak RSS is measured in isolation. Pool start-up is reported separately,
+since a server starts the pool once and reuses it.
+
+Usage:
+    python benchmarks/bench_pdf_extraction.py --pages 500
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+
+def _legacy_extract(path: str) -> int:
+    """The extraction path file_processor used before the pipeline."""
+    import PyPDF2
+    with open(path, 'rb') as handle:
+        pdf_reader = PyPDF2.PdfReader(io.BytesIO(handle.read()))
+    text = ""
+    for page_num in range(len(pdf_reader.pages)):
+        text += pdf_reader.pages[page_num].extract_text() + "\n\n"
+    return len(text)
+
+def _warm_pool(workers: int) -> float:
+    """Start the extraction pool, as a long-running server would have already."""
+    from services.pdf_extractor import get_extraction_pool
+    start = time.perf_counter()
+    pool = get_extraction_pool()
+    for future in [pool.submit(os.getpid) for _ in range(workers)]:
+        future.result()
+    return time.perf_counter() - start
+
+def _pipeline_extract(path: str, workers: int) -> int:
+    from services.pdf_extractor import PAGE_SEPARATOR, iter_pdf_pages, spool_to_tempfile
+    # Spool from a stream just as an upload would be
+    with open(path, 'rb') as handle:
+        spooled = spool_to_tempfile(handle, suffix='.pdf')
+    try:
+        return len("".join(page + PAGE_SEPARATOR for page in iter_pdf_pages(spooled, workers=workers)))
+    finally:
+        os.unlink(spooled)
+
+def _peak_rss_kb() -> int:
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children)
+
+def _child(mode: str, path: str, workers: int):
+    warmup = _warm_pool(workers) if mode == "pipeline" and workers > 1 else 0.0
+    start = time.perf_counter()
+    chars = _legacy_extract(path) if mode == "legacy" else _pipeline_extract(path, workers)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"seconds": elapsed, "pool_startup_seconds": round(warmup, 3),
+                      "chars": chars, "peak_rss_kb": _peak_rss_kb()}))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--child", choices=["legacy", "pipeline"], help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        _child(args.child, args.path, args.workers)
+        return
+    
+    from benchmarks.synthetic_docs import make_pdf
+    data = make_pdf(args.pages)
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as handle:
+        handle.write(data)
+        path = handle.name
+    
+    results = {"pages": args.pages, "file_bytes": len(data), "workers": args.workers}
+    try:
+        for mode in ("legacy", "pipeline"):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", mode, "--path", path,
+                 "--workers", str(args.workers)],
+                check=True, capture_output=True, text=True, cwd=ROOT
+            ).stdout
+            run = json.loads(output.strip().splitlines()[-1])
+            run["pages_per_sec"] = round(args.pages / run["seconds"], 1)
+            run["seconds"] = round(run["seconds"], 3)
+            results[mode] = run
+    finally:
+        os.unlink(path)
+    
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
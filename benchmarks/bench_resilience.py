@@ -0,0 +1,131 @@
+"""Exercise retries, rate limiting and the circuit breaker against a faulty stub.
+
+Runs GeminiClient against the local stub server with injected faults:
+
+* flaky: a share of requests fail with 503; compares success rates with
+  and without retries
+* retry_after: every request is first throttled with 429 and Retry-After;
+  checks the wait is honored
+* outage: the stub fails every request; measures how many calls reach it
+  and how quickly callers fail once the breaker opens, then recovery
+* rate_limit: a burst of calls through a token bucket; reports the
+  achieved call rate
+
+Usage:
+    python benchmarks/bench_resilience.py --requests 200 --threads 8
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+
+from benchmarks.gemini_stub import GeminiStubServer
+from services.gemini_client import GeminiClient, create_session
+from services.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, TokenBucket
+
+def _make_client(stub, threads: int, attempts: int = 4, rate: float = 0.0, breaker=None) -> GeminiClient:
+    """Build a client with its own limiter and breaker so scenarios do not interact."""
+    return GeminiClient(
+        session=create_session(pool_size=threads),
+        api_base=stub.api_base,
+        retry_policy=RetryPolicy(max_attempts=attempts, base_delay=0.02, max_delay=0.2, max_retry_after=5),
+        rate_limiter=TokenBucket(rate=rate, capacity=1),
+        circuit_breaker=breaker or CircuitBreaker(failure_rate=0.5, min_calls=10, window=10, reset_timeout=1.0)
+    )
+
+def _run(client: GeminiClient, total: int, threads: int):
+    """Issue ``total`` calls across ``threads`` workers.
+    
+    Returns:
+        A list of (succeeded, error type name, seconds) per call
+    """
+    def call(index):
+        start = time.perf_counter()
+        try:
+            client._make_api_call(f"benchmark prompt {index}")
+            return True, None, time.perf_counter() - start
+        except Exception as e:
+            return False, type(e).__name__, time.perf_counter() - start
+    
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(call, range(total)))
+
+def _success_rate(outcomes) -> float:
+    return round(sum(ok for ok, _, _ in outcomes) / len(outcomes), 3)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="Calls per scenario")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent callers")
+    parser.add_argument("--error-rate", type=float, default=0.3, help="Share of failing requests when flaky")
+    parser.add_argument("--latency", type=float, default=0.01, help="Stub latency in seconds")
+    args = parser.parse_args()
+    
+    results = {}
+    with GeminiStubServer(latency=args.latency, error_rate=args.error_rate, seed=0) as stub:
+        # Flaky upstream, with and without retries
+        for name, attempts in (("flaky_no_retry", 1), ("flaky_with_retry", 4)):
+            # A lenient breaker keeps this scenario about retries alone
+            breaker = CircuitBreaker(failure_rate=1.1, min_calls=10, window=10, reset_timeout=1.0)
+            before = stub.request_count
+            outcomes = _run(_make_client(stub, args.threads, attempts, breaker=breaker), args.requests, args.threads)
+            results[name] = {
+                "success_rate": _success_rate(outcomes),
+                "upstream_requests": stub.request_count - before
+            }
+        stub.error_rate = 0.0
+        
+        # Throttled upstream with Retry-After
+        stub.retry_after = 1
+        stub.inject(429)
+        start = time.perf_counter()
+        _make_client(stub, 1)._make_api_call("throttled prompt")
+        results["retry_after"] = {"requested_s": 1, "waited_s": round(time.perf_counter() - start, 3)}
+        stub.retry_after = None
+        
+        # Full outage, then recovery once the breaker lets a trial call through
+        stub.outage = True
+        breaker = CircuitBreaker(failure_rate=0.5, min_calls=10, window=10, reset_timeout=1.0)
+        client = _make_client(stub, args.threads, breaker=breaker)
+        before = stub.request_count
+        outcomes = _run(client, args.requests, args.threads)
+        fast_failures = [seconds for ok, error, seconds in outcomes if error == CircuitOpenError.__name__]
+        results["outage"] = {
+            "calls": len(outcomes),
+            "upstream_requests": stub.request_count - before,
+            "failed_fast": len(fast_failures),
+            "failed_fast_p50_ms": round(statistics.median(fast_failures) * 1000, 3) if fast_failures else None,
+            "breaker": breaker.stats()
+        }
+        stub.outage = False
+        time.sleep(breaker.reset_timeout)
+        # One trial call closes the circuit; the calls after it flow normally
+        trial = _run(client, 1, 1)
+        recovered = _run(client, args.requests, args.threads)
+        results["recovery"] = {
+            "trial_succeeded": trial[0][0],
+            "breaker_state": breaker.state,
+            "success_rate": _success_rate(recovered)
+        }
+        
+        # Burst through a 50 calls/s token bucket
+        rate = 50.0
+        start = time.perf_counter()
+        outcomes = _run(_make_client(stub, args.threads, rate=rate), args.requests // 2, args.threads)
+        elapsed = time.perf_counter() - start
+        results["rate_limit"] = {
+            "configured_rps": rate,
+            "achieved_rps": round(len(outcomes) / elapsed, 1),
+            "success_rate": _success_rate(outcomes)
+        }
+    
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
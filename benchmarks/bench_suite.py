@@ -0,0 +1,253 @@
+"""Reproducible benchmark suite for extraction, endpoints and MongoDB helpers.
+
+Runs three groups of benchmarks and prints one JSON report with
+p50/p95/p99 latency and throughput for each, so results can be compared
+between releases:
+
+* extraction: the txt, pdf and docx segment readers in
+  services/file_processor.py on synthetic documents, plus
+  process_file_content() answering from the extraction cache
+* endpoints: /summarize/process, /quiz/generate and /explain/process
+  through the Flask test client against the local Gemini stub, with
+  configurable stub latency and token rate. The response cache is
+  disabled and every request sends distinct content, so each one reaches
+  the stub
+* mongo: the save and read helpers in models.py against mongomock, or a
+  real mongod when --mongo-uri is given
+
+Usage:
+    python benchmarks/bench_suite.py --output results.json
+    python benchmarks/bench_suite.py --only endpoints --latency 0.2 --token-delay 0.002
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+
+from benchmarks.gemini_stub import GeminiStubServer
+from benchmarks.stats import summarize_latencies
+from benchmarks.synthetic_docs import make_docx, make_paragraph, make_pdf, make_text
+
+GROUPS = ("extraction", "endpoints", "mongo")
+
+# A valid quiz, so /quiz/generate succeeds; the other endpoints use it as plain text
+STUB_RESPONSE = json.dumps({"questions": [
+    {"question": f"Question {index}?", "options": ["A", "B", "C", "D"], "correct_answer": "A",
+     "explanation": "Because the notes say so."}
+    for index in range(5)
+]})
+
+def _time_calls(func, iterations: int, concurrency: int = 1):
+    """Call func(index) ``iterations`` times across ``concurrency`` threads.
+    
+    Returns:
+        The latency summary of the calls
+    """
+    def call(index):
+        start = time.perf_counter()
+        func(index)
+        return time.perf_counter() - start
+    
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            durations = list(pool.map(call, range(iterations)))
+    else:
+        durations = [call(index) for index in range(iterations)]
+    return summarize_latencies(durations, time.perf_counter() - start)
+
+def bench_extraction(args):
+    """Benchmark the extractors on synthetic documents of each supported type."""
+    from werkzeug.datastructures import FileStorage
+    from services.file_processor import process_file_content, SEGMENT_READERS
+    from services.text_stream import ExtractedText
+    
+    documents = {
+        "txt": make_text(args.paragraphs).encode("utf-8"),
+        "pdf": make_pdf(max(1, args.paragraphs // 10)),
+        "docx": make_docx(args.paragraphs, tables=args.paragraphs // 20)
+    }
+    results = {}
+    for file_type, data in documents.items():
+        # The extractors read the spooled upload, which is a file on disk
+        with tempfile.NamedTemporaryFile(suffix=f".{file_type}", delete=False) as spooled:
+            spooled.write(data)
+        
+        def extract(_):
+            with open(spooled.name, "rb") as handle:
+                ExtractedText.from_segments(SEGMENT_READERS[file_type](handle))
+        
+        result = {"bytes": len(data)}
+        try:
+            result["cold"] = _time_calls(extract, args.extraction_iterations)
+        finally:
+            os.unlink(spooled.name)
+        result["cold"]["mb_per_s"] = round(
+            len(data) * result["cold"]["throughput_per_s"] / (1024 * 1024), 2
+        )
+        
+        def cached(_):
+            process_file_content(FileStorage(io.BytesIO(data), filename=f"bench.{file_type}"))
+        
+        cached(None)  # Fill the extraction cache
+        result["cached"] = _time_calls(cached, args.extraction_iterations)
+        results[file_type] = result
+    return results
+
+def bench_endpoints(args, app, stub):
+    """Benchmark the synchronous generation endpoints against the stub."""
+    import random
+    
+    rng = random.Random(0)
+    # Distinct content per request keeps the extraction and response caches out of the measurement
+    texts = [make_paragraph(rng, args.words) for _ in range(args.requests)]
+    
+    def post(path, data):
+        client = app.test_client()
+        response = client.post(path, data=data, content_type="multipart/form-data")
+        if response.status_code >= 400 or b"alert-danger" in response.data:
+            raise RuntimeError(f"{path} failed with status {response.status_code}")
+    
+    endpoints = {
+        "/summarize/process": lambda index: post("/summarize/process", {
+            "file": (io.BytesIO(f"{index} {texts[index]}".encode("utf-8")), f"notes-{index}.txt")
+        }),
+        "/quiz/generate": lambda index: post("/quiz/generate", {
+            "content": f"{index} {texts[index]}", "question_count": "5", "difficulty": "medium"
+        }),
+        "/explain/process": lambda index: post("/explain/process", {
+            "topic": f"energy {index}", "context": texts[index]
+        })
+    }
+    
+    results = {}
+    for path, call in endpoints.items():
+        errors = []
+        
+        def checked(index):
+            try:
+                call(index)
+            except Exception as e:
+                errors.append(str(e))
+        
+        before = stub.request_count
+        result = _time_calls(checked, args.requests, args.concurrency)
+        result["errors"] = len(errors)
+        result["upstream_requests"] = stub.request_count - before
+        results[path] = result
+    return results
+
+def bench_mongo(args):
+    """Benchmark the save and read helpers in models.py."""
+    import random
+    import models
+    
+    content = make_paragraph(random.Random(0), args.words)
+    saved = {"summaries": [], "quizzes": [], "explanations": []}
+    
+    def save(collection, saver, document):
+        document_id = saver(document)
+        if document_id is None:
+            raise RuntimeError(f"Saving to {collection} failed; is the database reachable?")
+        saved[collection].append(document_id)
+    
+    def saved_id(collection, index):
+        return saved[collection][index % len(saved[collection])]
+    
+    results = {
+        "save_summary": _time_calls(lambda index: save("summaries", models.save_summary, {
+            "title": f"Summary {index}", "original_content": content, "summary_content": content[:400],
+            "file_type": "txt", "word_count": args.words
+        }), args.requests),
+        "save_quiz": _time_calls(lambda index: save("quizzes", models.save_quiz, {
+            "title": f"Quiz {index}", "difficulty": "medium", "question_count": 5,
+            "quiz_data": json.loads(STUB_RESPONSE)
+        }), args.requests),
+        "save_explanation": _time_calls(lambda index: save("explanations", models.save_explanation, {
+            "topic": f"energy {index}", "context": content, "explanation_content": content[:400]
+        }), args.requests),
+        "get_summary": _time_calls(lambda index: models.get_summary(saved_id("summaries", index)), args.requests),
+        "get_summary_with_content": _time_calls(
+            lambda index: models.get_summary_content(models.get_summary(saved_id("summaries", index))), args.requests),
+        "get_quiz": _time_calls(lambda index: models.get_quiz(saved_id("quizzes", index)), args.requests),
+        "get_explanation": _time_calls(lambda index: models.get_explanation(saved_id("explanations", index)),
+                                       args.requests),
+        "get_recent_summaries": _time_calls(lambda _: models.get_recent_summaries(limit=5), args.requests),
+        "get_summaries_page": _time_calls(lambda _: models.get_summaries_page(limit=20), args.requests),
+        "log_activity": _time_calls(lambda index: models.log_activity({
+            "activity_type": "benchmark", "description": f"Benchmark activity {index}",
+            "reference_type": "summary", "reference_id": str(saved_id("summaries", index))
+        }), args.requests)
+    }
+    models.activity_writer.close()
+    # Every summary and explanation above shares one text, stored once
+    results["documents_stored"] = models.mongo.db.documents.count_documents({})
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=GROUPS, default=list(GROUPS), help="Groups to run")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint and Mongo helper")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent endpoint requests")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub latency before answering, in seconds")
+    parser.add_argument("--token-delay", type=float, default=0.0,
+                        help="Stub seconds per generated word; the inverse of the token rate")
+    parser.add_argument("--words", type=int, default=400, help="Words of content per request")
+    parser.add_argument("--paragraphs", type=int, default=200, help="Paragraphs in the extraction documents")
+    parser.add_argument("--extraction-iterations", type=int, default=20, help="Extractions per document type")
+    parser.add_argument("--mongo-uri", help="Benchmark against this mongod instead of mongomock")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+    
+    # Keep every request on the measured path: no response cache, a fresh extraction cache
+    os.environ["RESPONSE_CACHE_BACKEND"] = "none"
+    os.environ["EXTRACTION_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench-extractions-")
+    os.environ["MONGO_URI"] = args.mongo_uri or "mongodb://127.0.0.1:1/bench?serverSelectionTimeoutMS=200"
+    logging.disable(logging.CRITICAL)
+    
+    stub = GeminiStubServer(latency=args.latency, token_delay=args.token_delay, response_text=STUB_RESPONSE)
+    os.environ["GEMINI_API_BASE"] = stub.api_base
+    
+    import main as app_module
+    import models
+    if not args.mongo_uri:
+        import mongomock
+        models.mongo.db = mongomock.MongoClient().db
+    
+    report = {
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "mongo": "mongod" if args.mongo_uri else "mongomock"
+        },
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("output", "mongo_uri")}
+    }
+    if "extraction" in args.only:
+        report["extraction"] = bench_extraction(args)
+    if "endpoints" in args.only:
+        with stub:
+            report["endpoints"] = bench_endpoints(args, app_module.app, stub)
+    if "mongo" in args.only:
+        report["mongo"] = bench_mongo(args)
+    
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Local stand-in for the Gemini REST API used by the benchmarks.
+
+The stub speaks just enough of the ``generateContent`` and
+``streamGenerateContent?alt=sse`` protocols for GeminiClient to parse
+its responses. It runs on a background thread and
+supports HTTP/1.1 keep-alive so connection reuse can be measured.
+
+Faults can be injected to exercise retries and the circuit breaker: a
+random share of requests can fail with an error status (optionally with
+Retry-After), specific statuses can be queued for the next requests,
+and an outage can be switched on and off.
+"""
+import json
+import random
+import threading
+import time
+from typing import Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_TEXT = "This is a stub response from the local Gemini server."
+
+def make_response(text: str) -> dict:
+    """Build a generateContent-shaped response body.
+    
+    Args:
+        text: The generated text to return
+    
+    Returns:
+        A dictionary matching the Gemini response structure
+    """
+    return {
+        "candidates": [
+            {"content": {"parts": [{"text": text}], "role": "model"}}
+        ]
+    }
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Request handler that answers every POST with a canned generation."""
+    
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        
+        stub = self.server.stub
+        stub.record_request()
+        if stub.latency:
+            time.sleep(stub.latency)
+        streaming = ":streamGenerateContent" in self.path
+        if stub.token_delay and not streaming:
+            # Generation time at the configured token rate
+            time.sleep(stub.token_delay * len(stub.response_text.split(" ")))
+        
+        status = stub.next_fault()
+        if status:
+            self._error(stub, status)
+            return
+        
+        if streaming:
+            self._stream(stub)
+            return
+        
+        body = json.dumps(make_response(stub.response_text)).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _error(self, stub, status):
+        """Answer with an injected error status."""
+        body = json.dumps({"error": {"code": status, "message": "Injected fault"}}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if stub.retry_after is not None:
+            self.send_header("Retry-After", str(stub.retry_after))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _stream(self, stub):
+        """Send the response text word by word as chunked server-sent events."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for word in stub.response_text.split(" "):
+            event = f"data: {json.dumps(make_response(word + ' '))}\r\n\r\n".encode("utf-8")
+            self.wfile.write(f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n")
+            if stub.token_delay:
+                time.sleep(stub.token_delay)
+        self.wfile.write(b"0\r\n\r\n")
+    
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+class GeminiStubServer:
+    """A local Gemini stub served from a background thread.
+    
+    Usage::
+        
+        with GeminiStubServer(latency=0.05) as stub:
+            client = GeminiClient(api_base=stub.api_base)
+    """
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 response_text: str = DEFAULT_TEXT, token_delay: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, retry_after: Optional[float] = None, seed: Optional[int] = None):
+        """Create the stub server.
+        
+        Args:
+            host: Interface to bind to
+            port: Port to bind to; 0 picks a free port
+            latency: Seconds to sleep before answering each request
+            response_text: Text returned in every generation
+            token_delay: Seconds per generated word, between streamed
+                words or in total before a non-streamed response
+            error_rate: Share of requests answered with error_status
+            error_status: Status code of injected errors
+            retry_after: Retry-After seconds sent with injected errors, if any
+            seed: Random seed for choosing which requests fail
+        """
+        self.latency = latency
+        self.token_delay = token_delay
+        self.response_text = response_text
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.outage = False
+        self.request_count = 0
+        self.connection_count = 0
+        self.error_count = 0
+        self._queued_faults = []
+        self._random = random.Random(seed)
+        self._count_lock = threading.Lock()
+        
+        stub = self
+        
+        class _CountingServer(ThreadingHTTPServer):
+            daemon_threads = True
+            # Load tests open hundreds of connections at once
+            request_queue_size = 1024
+            
+            def process_request(self, request, client_address):
+                with stub._count_lock:
+                    stub.connection_count += 1
+                super().process_request(request, client_address)
+        
+        self._server = _CountingServer((host, port), _StubHandler)
+        self._server.stub = self
+        self._thread = None
+    
+    @property
+    def api_base(self) -> str:
+        """Base URL to pass to GeminiClient as ``api_base``."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1beta"
+    
+    def record_request(self):
+        """Count a handled request."""
+        with self._count_lock:
+            self.request_count += 1
+    
+    def inject(self, *statuses: int):
+        """Answer the next requests with these error statuses, in order."""
+        with self._count_lock:
+            self._queued_faults.extend(statuses)
+    
+    def next_fault(self) -> Optional[int]:
+        """Pick the error status for the current request, or None to answer normally."""
+        with self._count_lock:
+            if self._queued_faults:
+                status = self._queued_faults.pop(0)
+            elif self.outage or (self.error_rate and self._random.random() < self.error_rate):
+                status = self.error_status
+            else:
+                return None
+            self.error_count += 1
+            return status
+    
+    def start(self):
+        """Start serving on a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop the server and release its socket."""
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -0,0 +1,30 @@
+"""Latency summaries shared by the benchmarks."""
+import statistics
+from typing import Dict, Sequence
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of the values, e.g. fraction=0.95."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def summarize_latencies(seconds: Sequence[float], elapsed: float) -> Dict[str, float]:
+    """Summarize per-operation latencies as JSON-friendly numbers.
+    
+    Args:
+        seconds: Duration of each operation in seconds
+        elapsed: Wall-clock seconds for the whole run, for throughput
+    
+    Returns:
+        The operation count, p50/p95/p99 and mean in milliseconds, and
+        operations per second
+    """
+    if not seconds:
+        return {"count": 0}
+    return {
+        "count": len(seconds),
+        "p50_ms": round(percentile(seconds, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(seconds, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(seconds, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(seconds) * 1000, 3),
+        "throughput_per_s": round(len(seconds) / elapsed, 1) if elapsed > 0 else None
+    }
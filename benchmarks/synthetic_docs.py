@@ -0,0 +1,108 @@
+"""Generators for synthetic documents used by the benchmarks."""
+import random
+
+_WORDS = (
+    "cell energy membrane protein nucleus photosynthesis enzyme reaction "
+    "market demand supply equilibrium price elasticity revenue cost "
+    "force mass velocity acceleration momentum energy wave frequency "
+    "history empire revolution treaty economy culture society law"
+).split()
+
+def make_paragraph(rng: random.Random, words: int = 60) -> str:
+    """Build a paragraph of pseudo-random study vocabulary."""
+    sentences = []
+    remaining = words
+    while remaining > 0:
+        length = min(remaining, rng.randint(8, 16))
+        sentence = " ".join(rng.choice(_WORDS) for _ in range(length))
+        sentences.append(sentence.capitalize() + ".")
+        remaining -= length
+    return " ".join(sentences)
+
+def make_pdf(pages: int, lines_per_page: int = 40, seed: int = 0) -> bytes:
+    """Build a text-only PDF with the given number of pages.
+    
+    The file is written by hand with the standard Helvetica font, so no
+    PDF library is needed to generate it.
+    
+    Args:
+        pages: Number of pages
+        lines_per_page: Lines of text on each page
+        seed: Seed for the text generator
+    
+    Returns:
+        The PDF file contents
+    """
+    rng = random.Random(seed)
+    objects = []
+    
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+    
+    catalog_id = add(b"")  # Filled in once the page tree exists
+    pages_id = add(b"")
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    
+    page_ids = []
+    for _ in range(pages):
+        lines = [" ".join(rng.choice(_WORDS) for _ in range(10)) for _ in range(lines_per_page)]
+        text_ops = ["BT", "/F1 10 Tf", "12 TL", "50 780 Td"]
+        for line in lines:
+            text_ops.append(f"({line}) Tj T*")
+        text_ops.append("ET")
+        stream = "\n".join(text_ops).encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font_id, content_id)
+        ))
+    
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref_offset)
+    return bytes(out)
+
+def make_text(paragraphs: int, seed: int = 0) -> str:
+    """Build a plain-text document of blank-line separated paragraphs."""
+    rng = random.Random(seed)
+    return "\n\n".join(make_paragraph(rng) for _ in range(paragraphs))
+
+def make_docx(paragraphs: int, tables: int = 0, seed: int = 0) -> bytes:
+    """Build a DOCX document with python-docx.
+    
+    Args:
+        paragraphs: Number of body paragraphs
+        tables: Number of 4x3 tables spread through the body
+        seed: Seed for the text generator
+    
+    Returns:
+        The DOCX file contents
+    """
+    import io
+    import docx
+    
+    rng = random.Random(seed)
+    document = docx.Document()
+    table_every = paragraphs // tables if tables else 0
+    for index in range(paragraphs):
+        document.add_paragraph(make_paragraph(rng))
+        if table_every and (index + 1) % table_every == 0:
+            table = document.add_table(rows=4, cols=3)
+            for cell in table._cells:
+                cell.text = " ".join(rng.choice(_WORDS) for _ in range(3))
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
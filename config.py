@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env
@@ -6,7 +7,132 @@ load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI")
 
+# Logging level name (DEBUG, INFO, WARNING, ...)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# /metrics endpoint: answers requests carrying "Authorization: Bearer
+# <METRICS_TOKEN>", or without a token, requests from the allowed addresses
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_ALLOWED_ADDRESSES = [address.strip() for address in
+                             os.getenv("METRICS_ALLOWED_ADDRESSES", "127.0.0.1,::1").split(",") if address.strip()]
+
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
 if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY is not set in .env file")
\ No newline at end of file
+    raise ValueError("GEMINI_API_KEY is not set in .env file")
+
+# Gemini endpoint settings
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+
+# HTTP transport settings for the shared Gemini connection pool
+GEMINI_POOL_SIZE = int(os.getenv("GEMINI_POOL_SIZE", "20"))
+GEMINI_CONNECT_TIMEOUT = float(os.getenv("GEMINI_CONNECT_TIMEOUT", "5"))
+GEMINI_READ_TIMEOUT = float(os.getenv("GEMINI_READ_TIMEOUT", "120"))
+
+# Retries with jittered exponential backoff for throttled or failed Gemini calls
+GEMINI_RETRY_ATTEMPTS = int(os.getenv("GEMINI_RETRY_ATTEMPTS", "4"))
+GEMINI_RETRY_BASE_DELAY = float(os.getenv("GEMINI_RETRY_BASE_DELAY", "0.5"))
+GEMINI_RETRY_MAX_DELAY = float(os.getenv("GEMINI_RETRY_MAX_DELAY", "8"))
+# A Retry-After longer than this fails the call instead of holding a worker
+GEMINI_RETRY_AFTER_MAX = float(os.getenv("GEMINI_RETRY_AFTER_MAX", "30"))
+
+# Process-wide token bucket for Gemini calls; a rate of 0 disables it
+GEMINI_RATE_LIMIT_RPS = float(os.getenv("GEMINI_RATE_LIMIT_RPS", "0"))
+GEMINI_RATE_LIMIT_BURST = int(os.getenv("GEMINI_RATE_LIMIT_BURST", "20"))
+GEMINI_RATE_LIMIT_MAX_WAIT = float(os.getenv("GEMINI_RATE_LIMIT_MAX_WAIT", "10"))
+
+# Circuit breaker that fails fast while the Gemini error rate is high
+GEMINI_BREAKER_FAILURE_RATE = float(os.getenv("GEMINI_BREAKER_FAILURE_RATE", "0.5"))
+GEMINI_BREAKER_MIN_CALLS = int(os.getenv("GEMINI_BREAKER_MIN_CALLS", "10"))
+GEMINI_BREAKER_WINDOW = float(os.getenv("GEMINI_BREAKER_WINDOW", "30"))
+GEMINI_BREAKER_RESET_TIMEOUT = float(os.getenv("GEMINI_BREAKER_RESET_TIMEOUT", "15"))
+
+# Connection limits for the async Gemini client used by the ASGI app
+GEMINI_ASYNC_MAX_CONNECTIONS = int(os.getenv("GEMINI_ASYNC_MAX_CONNECTIONS", "500"))
+
+# Response cache for Gemini generations ("memory", "mongo" or "none")
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Coalescing of identical concurrent Gemini calls: "memory" within each
+# process, "mongo" also across processes through lease documents (needs the
+# mongo response cache), or "none"
+GEMINI_COALESCE_BACKEND = os.getenv("GEMINI_COALESCE_BACKEND", "memory").lower()
+GEMINI_LEASE_TTL = float(os.getenv("GEMINI_LEASE_TTL", "150"))
+GEMINI_LEASE_POLL_INTERVAL = float(os.getenv("GEMINI_LEASE_POLL_INTERVAL", "0.25"))
+
+# Prompt size budget; material over it is handled per kind of call with
+# "truncate", "sample", "chunk" (map-reduce, summaries only) or "reject"
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "32000"))
+PROMPT_BUDGET_POLICIES = os.getenv(
+    "PROMPT_BUDGET_POLICIES",
+    "summary=chunk,quiz=sample,explanation=truncate,key_points=sample,categories=sample,study_pack=sample"
+)
+
+# Retrieval of the most relevant chunks of large context for explanations
+RETRIEVAL_INDEX_DIR = os.getenv("RETRIEVAL_INDEX_DIR", os.path.join(tempfile.gettempdir(), "study-assistant-retrieval"))
+RETRIEVAL_INDEX_MAX_BYTES = int(os.getenv("RETRIEVAL_INDEX_MAX_BYTES", str(256 * 1024 * 1024)))
+RETRIEVAL_CHUNK_TOKENS = int(os.getenv("RETRIEVAL_CHUNK_TOKENS", "300"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "6"))
+# Context at or below this size is sent whole
+RETRIEVAL_MIN_TOKENS = int(os.getenv("RETRIEVAL_MIN_TOKENS", "2000"))
+
+# Map-reduce summarization of large documents
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "6000"))
+SUMMARY_MAX_WORKERS = int(os.getenv("SUMMARY_MAX_WORKERS", "4"))
+
+# Background job queue for generation requests
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "8"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "100"))
+# Seconds a job document, including its result, is kept after it last changed
+JOB_TTL = int(os.getenv("JOB_TTL", str(24 * 3600)))
+
+# PDF extraction pipeline
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 2)))
+PDF_PAGES_PER_BATCH = int(os.getenv("PDF_PAGES_PER_BATCH", "25"))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "50"))
+
+# Batch uploads: files extracted on the PDF extraction pool, summaries
+# generated with bounded concurrency and saved in bulk
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "200"))
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(500 * 1024 * 1024)))
+BATCH_SUMMARY_CONCURRENCY = int(os.getenv("BATCH_SUMMARY_CONCURRENCY", "4"))
+BATCH_INSERT_SIZE = int(os.getenv("BATCH_INSERT_SIZE", "20"))
+
+# On-disk cache of extracted document text, keyed by upload SHA-256
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", os.path.join(tempfile.gettempdir(), "study-assistant-extractions"))
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Server-side store for large per-session values ("disk" or "mongo")
+CONTENT_STORE_BACKEND = os.getenv("CONTENT_STORE_BACKEND", "disk").lower()
+CONTENT_STORE_DIR = os.getenv("CONTENT_STORE_DIR", os.path.join(tempfile.gettempdir(), "study-assistant-content"))
+CONTENT_STORE_TTL = int(os.getenv("CONTENT_STORE_TTL", str(24 * 3600)))
+
+# Number of items per page on the history views
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "20"))
+
+# Write-through cache of the "recent items" sidebar lists
+RECENT_CACHE_SIZE = int(os.getenv("RECENT_CACHE_SIZE", "10"))
+RECENT_CACHE_TTL = float(os.getenv("RECENT_CACHE_TTL", "5"))
+
+# Batched background writer for activity logs and quiz attempts
+ACTIVITY_BATCH_SIZE = int(os.getenv("ACTIVITY_BATCH_SIZE", "100"))
+ACTIVITY_FLUSH_INTERVAL = float(os.getenv("ACTIVITY_FLUSH_INTERVAL", "1.0"))
+ACTIVITY_QUEUE_SIZE = int(os.getenv("ACTIVITY_QUEUE_SIZE", "10000"))
+
+# zlib level for the deduplicated original content of summaries and explanations
+DOCUMENT_COMPRESSION_LEVEL = int(os.getenv("DOCUMENT_COMPRESSION_LEVEL", "6"))
+
+# Upload limits: larger request bodies are rejected with 413 before they are
+# read, and uploaded files are written straight to temporary files.
+# /summarize/batch accepts bodies up to BATCH_MAX_BYTES instead
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(64 * 1024 * 1024)))
+MAX_FORM_MEMORY_BYTES = int(os.getenv("MAX_FORM_MEMORY_BYTES", str(16 * 1024 * 1024)))
+
+# Largest request body the ASGI entry point hands to the WSGI app. It must
+# cover the batch limit; the Flask app then applies the limit of each route
+ASGI_MAX_BODY_BYTES = int(os.getenv("ASGI_MAX_BODY_BYTES", str(max(MAX_UPLOAD_BYTES, BATCH_MAX_BYTES))))
@@ -1,10 +1,10 @@
-from config import MONGO_URI
+from config import MONGO_URI, LOG_LEVEL
 import os
 import logging
 from flask import Flask, render_template
 
-# Setup logging for easier debugging
-logging.basicConfig(level=logging.DEBUG)
+# Setup logging; DEBUG output is costly on the hot path, so it is opt-in via LOG_LEVEL
+logging.basicConfig(level=LOG_LEVEL, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
 logger = logging.getLogger(__name__)
 
 # Initialize Flask app
@@ -16,7 +16,7 @@ mongo_uri = MONGO_URI
 app.config["MONGO_URI"] = mongo_uri
 
 # Initialize MongoDB
-from models import mongo
+from models import mongo, ensure_indexes
 mongo.init_app(app)
 
 # Try to connect to MongoDB
@@ -31,10 +31,12 @@ with app.app_context():
         app.config['MONGO_AVAILABLE'] = True
         
         # Create collections as needed when first documents are inserted
-        # MongoDB automatically creates collections
-        
+        # MongoDB automatically creates collections, but not our indexes
+        ensure_indexes()
+        logger.info("MongoDB indexes ensured")
+    
     except Exception as e:
-        logger.error(f"MongoDB connection error: {str(e)}")
+        logger.error("MongoDB connection error: %s", e)
         # Set flag to indicate MongoDB is not available
         app.config['MONGO_AVAILABLE'] = False
         logger.warning("Running without database persistence. Data will not be saved between sessions.")
@@ -43,10 +45,21 @@ with app.app_context():
 from routes.summarize import summarize_bp
 from routes.quiz import quiz_bp
 from routes.explain import explain_bp
+from routes.jobs import jobs_bp
+from routes.metrics import metrics_bp, init_request_metrics
 
 app.register_blueprint(summarize_bp)
 app.register_blueprint(quiz_bp)
 app.register_blueprint(explain_bp)
+app.register_blueprint(jobs_bp)
+app.register_blueprint(metrics_bp)
+
+# Stage timings, request latency histograms and the Server-Timing header
+init_request_metrics(app)
+
+# Reject oversized uploads early and spool large files to disk
+from services.upload import init_upload_limits
+init_upload_limits(app)
 
 @app.route('/')
 def index():
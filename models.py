@@ -1,6 +1,24 @@
 """Data models for the Study Assistant application using MongoDB."""
-from datetime import datetime
+import atexit
+import hashlib
+import logging
+import queue
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from bson.binary import Binary
+from bson.objectid import ObjectId
 from flask_pymongo import PyMongo
+from pymongo.errors import BulkWriteError
+from config import (
+    RECENT_CACHE_SIZE, RECENT_CACHE_TTL,
+    ACTIVITY_BATCH_SIZE, ACTIVITY_FLUSH_INTERVAL, ACTIVITY_QUEUE_SIZE,
+    DOCUMENT_COMPRESSION_LEVEL, JOB_TTL
+)
+from services.metrics import timed
+
+logger = logging.getLogger(__name__)
 
 # Initialize PyMongo
 mongo = PyMongo()
@@ -10,11 +28,15 @@ mongo = PyMongo()
 
 SUMMARY_SCHEMA = {
     "title": str,  # Title of the summary
-    "original_content": str,  # The original content that was summarized
+    "content_ref": str,  # _id in "documents" of the original content that was summarized
     "summary_content": str,  # The generated summary
     "created_at": datetime,  # When the summary was created
     "file_type": str,  # File extension (pdf, txt, docx)
-    "word_count": int  # Word count of the original content
+    "word_count": int,  # Word count of the original content
+    # Only on summaries generated as part of a study pack:
+    "key_points": list,  # Key points of the content
+    "categories": dict,  # Main topics, each with a summary and key points
+    "quiz_id": str  # ID of the quiz generated alongside the summary
 }
 
 QUIZ_SCHEMA = {
@@ -34,7 +56,7 @@ QUIZ_ATTEMPT_SCHEMA = {
 
 EXPLANATION_SCHEMA = {
     "topic": str,  # The topic that was explained
-    "context": str,  # Optional context provided
+    "context_ref": str,  # _id in "documents" of the optional context provided
     "explanation_content": str,  # The generated explanation
     "created_at": datetime  # When the explanation was created
 }
@@ -47,21 +69,408 @@ USER_ACTIVITY_SCHEMA = {
     "created_at": datetime  # When the activity happened
 }
 
+# MongoDB error code for an insert whose _id already exists
+DUPLICATE_KEY_ERROR = 11000
+
+# Original content is stored once per distinct text, however many summaries
+# and explanations refer to it
+DOCUMENT_SCHEMA = {
+    "_id": str,  # Hex SHA-256 of the UTF-8 encoded text
+    "data": bytes,  # The zlib-compressed UTF-8 text
+    "size": int,  # Length of the uncompressed UTF-8 text in bytes
+    "created_at": datetime  # When the text was first stored
+}
+
+JOB_SCHEMA = {
+    "_id": str,  # Job ID (UUID hex) returned to the client
+    "job_type": str,  # Type of work (summarize, quiz, explain)
+    "status": str,  # queued, running, succeeded or failed
+    "progress": int,  # Percentage complete (0-100)
+    "message": str,  # Human-readable progress message
+    "result": dict,  # Output of the job once it has succeeded
+    "error": str,  # Error message if the job failed
+    "created_at": datetime,  # When the job was enqueued
+    "updated_at": datetime,  # When the job last changed
+    "expires_at": datetime  # When the job is removed, JOB_TTL after it last changed
+}
+
+# Fields needed to render list views (history pages and "recent" sidebars).
+# Projecting to these avoids loading document text just to show a title.
+SUMMARY_LIST_FIELDS = ['title', 'created_at', 'file_type', 'word_count']
+QUIZ_LIST_FIELDS = ['title', 'difficulty', 'question_count', 'created_at']
+EXPLANATION_LIST_FIELDS = ['topic', 'created_at']
+
+def ensure_indexes():
+    """Create the indexes the query helpers rely on.
+    
+    Safe to call on every startup: creating an index that already exists
+    is a no-op in MongoDB.
+    """
+    for collection in ('summaries', 'quizzes', 'explanations', 'user_activities', 'quiz_attempts', 'jobs'):
+        # _id breaks ties between equal timestamps for keyset pagination
+        mongo.db[collection].create_index([('created_at', -1), ('_id', -1)])
+    mongo.db.user_activities.create_index([('reference_type', 1), ('reference_id', 1)])
+    mongo.db.quiz_attempts.create_index([('quiz_id', 1), ('created_at', -1)])
+    # Finished jobs hold whole results, so they are removed JOB_TTL after their last update
+    mongo.db.jobs.create_index('expires_at', expireAfterSeconds=0)
+
+class RecentItemsCache:
+    """Write-through cache of the newest few documents of each collection.
+    
+    Every page render shows a "recent" sidebar; this keeps those lists in
+    memory so the hot path does not query MongoDB. Saves in this process
+    update the cached list directly, and a short TTL picks up documents
+    written by other processes.
+    """
+    
+    def __init__(self, size=RECENT_CACHE_SIZE, ttl=RECENT_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.write_throughs = 0
+        self._lists = {}  # collection -> (expires_at, fields, items)
+        self._pending = {}  # collection -> documents pushed during each in-flight load
+        self._lock = threading.Lock()
+    
+    def get(self, collection, limit, fields, loader):
+        """Return the newest ``limit`` items, loading ``self.size`` on a miss.
+        
+        Documents pushed while the loader runs are merged into its result,
+        since its query may have run before they were inserted.
+        
+        Args:
+            collection: Name of the collection
+            limit: Number of items wanted
+            fields: Fields kept for each item
+            loader: Function (limit, projection) returning the newest documents
+        """
+        if limit > self.size:
+            return loader(limit, fields)
+        
+        now = time.monotonic()
+        pushed = []
+        with self._lock:
+            entry = self._lists.get(collection)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return list(entry[2][:limit])
+            self.misses += 1
+            self._pending.setdefault(collection, []).append(pushed)
+        
+        try:
+            items = loader(self.size, fields)
+        finally:
+            with self._lock:
+                self._pending[collection] = [other for other in self._pending[collection] if other is not pushed]
+        
+        with self._lock:
+            loaded_ids = {item.get('_id') for item in items}
+            for doc in pushed:
+                if doc.get('_id') not in loaded_ids:
+                    items = [self._item(doc, fields)] + items
+            items = items[:self.size]
+            self._lists[collection] = (now + self.ttl, fields, items)
+        return list(items[:limit])
+    
+    @staticmethod
+    def _item(doc, fields):
+        return {field: doc[field] for field in ['_id'] + fields if field in doc}
+    
+    def push(self, collection, doc):
+        """Add a newly saved document to the front of a cached list."""
+        with self._lock:
+            for pushed in self._pending.get(collection, ()):
+                pushed.append(doc)
+            entry = self._lists.get(collection)
+            if not entry:
+                return
+            expires_at, fields, items = entry
+            self._lists[collection] = (expires_at, fields, [self._item(doc, fields)] + items[:self.size - 1])
+            self.write_throughs += 1
+    
+    def stats(self):
+        """Return counters; ``hits`` is the number of MongoDB queries saved."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'write_throughs': self.write_throughs
+            }
+
+recent_items = RecentItemsCache()
+
+class BatchWriter:
+    """Buffer low-priority inserts and write them with insert_many off the request thread.
+    
+    Documents are queued by collection and flushed by a background thread
+    when ``batch_size`` documents are waiting or ``flush_interval`` seconds
+    have passed. The queue is bounded: if the writer falls behind, callers
+    wait at most ``put_timeout`` seconds and the document is then dropped
+    and counted. Pending documents are flushed at interpreter exit.
+    """
+    
+    def __init__(self, batch_size=ACTIVITY_BATCH_SIZE, flush_interval=ACTIVITY_FLUSH_INTERVAL,
+                 max_queue=ACTIVITY_QUEUE_SIZE, put_timeout=0.05):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.written = 0
+        self.flushes = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+    
+    def write(self, collection, doc):
+        """Queue a document for insertion.
+        
+        Returns:
+            True if the document was queued, False if it was dropped
+        """
+        self._ensure_started()
+        try:
+            self._queue.put((collection, doc), timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                dropped = self.dropped
+            if dropped == 1 or dropped % 100 == 0:
+                logger.warning("Write buffer full, dropped %s documents so far (latest: %s)", dropped, collection)
+            return False
+    
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='batch-writer', daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+    
+    def _run(self):
+        pending = []
+        deadline = time.monotonic() + self.flush_interval
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                pending.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0.01)))
+            except queue.Empty:
+                pass
+            if len(pending) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(pending)
+                pending = []
+                deadline = time.monotonic() + self.flush_interval
+        self._flush(pending)
+    
+    def _flush(self, pending):
+        if not pending:
+            return
+        by_collection = {}
+        for collection, doc in pending:
+            by_collection.setdefault(collection, []).append(doc)
+        for collection, docs in by_collection.items():
+            try:
+                with timed('mongo_batch_write'):
+                    mongo.db[collection].insert_many(docs, ordered=False)
+                with self._lock:
+                    self.written += len(docs)
+                    self.flushes += 1
+            except Exception as e:
+                with self._lock:
+                    self.failed += len(docs)
+                logger.warning("Failed to write %s %s documents: %s", len(docs), collection, e)
+    
+    def close(self, timeout=5.0):
+        """Flush everything still queued and stop the writer thread."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+    
+    def stats(self):
+        """Return written, flush, dropped and failed counts and the queue depth."""
+        with self._lock:
+            return {
+                'written': self.written,
+                'flushes': self.flushes,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'queued': self._queue.qsize()
+            }
+
+activity_writer = BatchWriter()
+
 # Helper functions for common database operations
 
-def get_summaries(limit=None, sort_field='created_at', sort_direction=-1):
+def _store_documents(docs, field, ref_field):
+    """Move the text in ``field`` of each document to the documents collection.
+    
+    The text is replaced by its document ID in ``ref_field``. A document
+    may already carry that ID, the SHA-256 of the text gathered during
+    extraction, so the text is not hashed again. Identical texts, within
+    the batch or already stored, are kept only once, and only texts not
+    stored yet are compressed and sent.
+    
+    Raises:
+        Exception: If the database is not available
+    """
+    texts = {}
+    for doc in docs:
+        text = doc.pop(field, None)
+        if text:
+            raw = text.encode('utf-8', 'surrogatepass')
+            document_id = doc.get(ref_field) or hashlib.sha256(raw).hexdigest()
+            texts.setdefault(document_id, raw)
+            doc[ref_field] = document_id
+    if not texts:
+        return
+    
+    stored = {doc['_id'] for doc in mongo.db.documents.find({'_id': {'$in': list(texts)}}, {'_id': 1})}
+    now = datetime.utcnow()
+    new_documents = [{
+        '_id': document_id,
+        'data': Binary(zlib.compress(raw, DOCUMENT_COMPRESSION_LEVEL)),
+        'size': len(raw),
+        'created_at': now
+    } for document_id, raw in texts.items() if document_id not in stored]
+    if not new_documents:
+        return
+    try:
+        # Unordered, so a text stored concurrently by another request does not stop the rest
+        mongo.db.documents.insert_many(new_documents, ordered=False)
+    except BulkWriteError as e:
+        if any(error.get('code') != DUPLICATE_KEY_ERROR for error in e.details.get('writeErrors', [])):
+            raise
+
+@timed('mongo_read')
+def get_document(document_id):
+    """Load and decompress a text from the documents collection.
+    
+    Args:
+        document_id: The hex SHA-256 of the text
+    
+    Returns:
+        The text, or None if it is missing or the database is not available
+    """
+    try:
+        doc = mongo.db.documents.find_one({'_id': document_id}, {'data': 1})
+        if doc is None:
+            return None
+        return zlib.decompress(doc['data']).decode('utf-8', 'surrogatepass')
+    except Exception as e:
+        logger.warning("Could not load document %s: %s", document_id, e)
+        return None
+
+def get_summary_content(summary_doc):
+    """Get the original content of a summary, loading it from the documents collection.
+    
+    Summaries saved before content was deduplicated hold it inline.
+    """
+    if 'original_content' in summary_doc:
+        return summary_doc['original_content']
+    if summary_doc.get('content_ref'):
+        return get_document(summary_doc['content_ref'])
+    return None
+
+def get_explanation_context(explanation_doc):
+    """Get the context of an explanation, loading it from the documents collection."""
+    if 'context' in explanation_doc:
+        return explanation_doc['context']
+    if explanation_doc.get('context_ref'):
+        return get_document(explanation_doc['context_ref'])
+    return None
+
+def encode_page_cursor(doc):
+    """Encode a document's (created_at, _id) position as an opaque cursor string."""
+    return f"{doc['created_at'].strftime('%Y%m%d%H%M%S%f')}-{doc['_id']}"
+
+def decode_page_cursor(cursor):
+    """Decode a cursor string into (created_at, ObjectId).
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    from bson.objectid import ObjectId
+    from bson.errors import InvalidId
+    try:
+        timestamp, object_id = cursor.split('-', 1)
+        return datetime.strptime(timestamp, '%Y%m%d%H%M%S%f'), ObjectId(object_id)
+    except (ValueError, InvalidId):
+        raise ValueError(f"Invalid page cursor: {cursor}")
+
+@timed('mongo_read')
+def get_page(collection, after=None, before=None, limit=20, projection=None):
+    """Get one page of a collection, newest first, using keyset pagination.
+    
+    Pages are addressed by the (created_at, _id) of a boundary document
+    rather than by offset, so every page costs one index range scan no
+    matter how deep it is.
+    
+    Args:
+        collection: Name of the collection
+        after: Cursor of the last item on the previous page (older items follow)
+        before: Cursor of the first item on the next page (newer items precede)
+        limit: Page size
+        projection: Optional list of fields to return
+    
+    Returns:
+        Dictionary with "items", "next_cursor" (older page, or None) and
+        "prev_cursor" (newer page, or None). Items are empty if the
+        database is not available.
+    """
+    page = {'items': [], 'next_cursor': None, 'prev_cursor': None}
+    try:
+        query = {}
+        newest_first = before is None
+        if after or before:
+            created_at, object_id = decode_page_cursor(after or before)
+            op = '$lt' if newest_first else '$gt'
+            query = {'$or': [
+                {'created_at': {op: created_at}},
+                {'created_at': created_at, '_id': {op: object_id}}
+            ]}
+        
+        direction = -1 if newest_first else 1
+        # Fetch one extra document to learn whether another page exists
+        docs = list(
+            mongo.db[collection].find(query, projection)
+            .sort([('created_at', direction), ('_id', direction)])
+            .limit(limit + 1)
+        )
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+        if not newest_first:
+            docs.reverse()
+        
+        page['items'] = docs
+        if docs:
+            # Paging back from an older page means older items always follow
+            if has_more or not newest_first:
+                page['next_cursor'] = encode_page_cursor(docs[-1])
+            if (after is not None) if newest_first else has_more:
+                page['prev_cursor'] = encode_page_cursor(docs[0])
+        return page
+    except ValueError:
+        raise
+    except Exception:
+        return page
+
+@timed('mongo_read')
+def get_summaries(limit=None, sort_field='created_at', sort_direction=-1, projection=None):
     """Get summaries from the database, newest first by default.
     
     Args:
         limit: Optional limit on number of results
         sort_field: Field to sort by
         sort_direction: 1 for ascending, -1 for descending
-        
+        projection: Optional list of fields to return, e.g. SUMMARY_LIST_FIELDS
+    
     Returns:
         List of summary documents or empty list if database not available
     """
     try:
-        query = mongo.db.summaries.find().sort(sort_field, sort_direction)
+        query = mongo.db.summaries.find({}, projection).sort(sort_field, sort_direction)
         if limit:
             query = query.limit(limit)
         return list(query)
@@ -69,12 +478,22 @@ def get_summaries(limit=None, sort_field='created_at', sort_direction=-1):
         # Return empty list if database is not available
         return []
 
+def get_recent_summaries(limit=5):
+    """Get the newest summaries for the sidebar, served from recent_items."""
+    return recent_items.get('summaries', limit, SUMMARY_LIST_FIELDS,
+                            lambda n, fields: get_summaries(limit=n, projection=fields))
+
+def get_summaries_page(after=None, before=None, limit=20, projection=SUMMARY_LIST_FIELDS):
+    """Get one page of summaries, newest first. See get_page."""
+    return get_page('summaries', after, before, limit, projection)
+
+@timed('mongo_read')
 def get_summary(summary_id):
     """Get a specific summary by ID.
     
     Args:
         summary_id: The ObjectId of the summary
-        
+    
     Returns:
         The summary document or None
     """
@@ -85,12 +504,16 @@ def get_summary(summary_id):
         # Return None if database is not available
         return None
 
+@timed('mongo_write')
 def save_summary(summary_data):
     """Save a new summary to the database.
     
+    The original content is moved to the documents collection and the
+    summary keeps a reference to it as content_ref.
+    
     Args:
         summary_data: Dictionary with summary data
-        
+    
     Returns:
         The inserted document ID or None if database is not available
     """
@@ -99,22 +522,62 @@ def save_summary(summary_data):
         if 'created_at' not in summary_data:
             summary_data['created_at'] = datetime.utcnow()
         
+        _store_documents([summary_data], 'original_content', 'content_ref')
         result = mongo.db.summaries.insert_one(summary_data)
+        recent_items.push('summaries', summary_data)
         return result.inserted_id
     except Exception:
         # Return None if database is not available
         return None
 
-def get_quizzes(limit=None, sort_field='created_at', sort_direction=-1):
+@timed('mongo_write')
+def save_summaries(summaries):
+    """Save several new summaries with a single bulk insert.
+    
+    Args:
+        summaries: List of summary dictionaries
+    
+    Returns:
+        The inserted document IDs in order, or an empty list if the
+        database is not available
+    """
+    if not summaries:
+        return []
+    try:
+        now = datetime.utcnow()
+        for summary_data in summaries:
+            summary_data.setdefault('created_at', now)
+        _store_documents(summaries, 'original_content', 'content_ref')
+        
+        # Unordered, so one bad document does not stop the rest
+        result = mongo.db.summaries.insert_many(summaries, ordered=False)
+        for summary_data in summaries:
+            recent_items.push('summaries', summary_data)
+        return result.inserted_ids
+    except Exception:
+        return []
+
+@timed('mongo_read')
+def get_quizzes(limit=None, sort_field='created_at', sort_direction=-1, projection=None):
     """Get quizzes from the database, newest first by default."""
     try:
-        query = mongo.db.quizzes.find().sort(sort_field, sort_direction)
+        query = mongo.db.quizzes.find({}, projection).sort(sort_field, sort_direction)
         if limit:
             query = query.limit(limit)
         return list(query)
     except Exception:
         return []
 
+def get_recent_quizzes(limit=5):
+    """Get the newest quizzes for the sidebar, served from recent_items."""
+    return recent_items.get('quizzes', limit, QUIZ_LIST_FIELDS,
+                            lambda n, fields: get_quizzes(limit=n, projection=fields))
+
+def get_quizzes_page(after=None, before=None, limit=20, projection=QUIZ_LIST_FIELDS):
+    """Get one page of quizzes, newest first. See get_page."""
+    return get_page('quizzes', after, before, limit, projection)
+
+@timed('mongo_read')
 def get_quiz(quiz_id):
     """Get a specific quiz by ID."""
     try:
@@ -123,6 +586,7 @@ def get_quiz(quiz_id):
     except Exception:
         return None
 
+@timed('mongo_write')
 def save_quiz(quiz_data):
     """Save a new quiz to the database."""
     try:
@@ -130,20 +594,32 @@ def save_quiz(quiz_data):
             quiz_data['created_at'] = datetime.utcnow()
         
         result = mongo.db.quizzes.insert_one(quiz_data)
+        recent_items.push('quizzes', quiz_data)
         return result.inserted_id
     except Exception:
         return None
 
-def get_explanations(limit=None, sort_field='created_at', sort_direction=-1):
+@timed('mongo_read')
+def get_explanations(limit=None, sort_field='created_at', sort_direction=-1, projection=None):
     """Get explanations from the database, newest first by default."""
     try:
-        query = mongo.db.explanations.find().sort(sort_field, sort_direction)
+        query = mongo.db.explanations.find({}, projection).sort(sort_field, sort_direction)
         if limit:
             query = query.limit(limit)
         return list(query)
     except Exception:
         return []
 
+def get_recent_explanations(limit=5):
+    """Get the newest explanations for the sidebar, served from recent_items."""
+    return recent_items.get('explanations', limit, EXPLANATION_LIST_FIELDS,
+                            lambda n, fields: get_explanations(limit=n, projection=fields))
+
+def get_explanations_page(after=None, before=None, limit=20, projection=EXPLANATION_LIST_FIELDS):
+    """Get one page of explanations, newest first. See get_page."""
+    return get_page('explanations', after, before, limit, projection)
+
+@timed('mongo_read')
 def get_explanation(explanation_id):
     """Get a specific explanation by ID."""
     try:
@@ -152,24 +628,83 @@ def get_explanation(explanation_id):
     except Exception:
         return None
 
+@timed('mongo_write')
 def save_explanation(explanation_data):
-    """Save a new explanation to the database."""
+    """Save a new explanation, moving its context to the documents collection."""
     try:
         if 'created_at' not in explanation_data:
             explanation_data['created_at'] = datetime.utcnow()
         
+        _store_documents([explanation_data], 'context', 'context_ref')
         result = mongo.db.explanations.insert_one(explanation_data)
+        recent_items.push('explanations', explanation_data)
         return result.inserted_id
     except Exception:
         return None
 
 def log_activity(activity_data):
-    """Log a user activity."""
+    """Log a user activity through the batched background writer.
+    
+    Returns:
+        The ID the activity will be stored under, or None if it was dropped
+    """
+    if 'created_at' not in activity_data:
+        activity_data['created_at'] = datetime.utcnow()
+    activity_data.setdefault('_id', ObjectId())
+    
+    if activity_writer.write('user_activities', activity_data):
+        return activity_data['_id']
+    return None
+
+def save_quiz_attempt(attempt_data):
+    """Record a quiz attempt through the batched background writer.
+    
+    Returns:
+        The ID the attempt will be stored under, or None if it was dropped
+    """
+    if 'created_at' not in attempt_data:
+        attempt_data['created_at'] = datetime.utcnow()
+    attempt_data.setdefault('_id', ObjectId())
+    
+    if activity_writer.write('quiz_attempts', attempt_data):
+        return attempt_data['_id']
+    return None
+
+@timed('mongo_write')
+def save_job(job_data):
+    """Insert or replace a background job document.
+    
+    The job expires JOB_TTL seconds after its updated_at; update_job()
+    pushes the expiry back on every change.
+    
+    Args:
+        job_data: Dictionary with job data, including its string _id
+    
+    Returns:
+        The job ID or None if database is not available
+    """
     try:
-        if 'created_at' not in activity_data:
-            activity_data['created_at'] = datetime.utcnow()
-        
-        result = mongo.db.user_activities.insert_one(activity_data)
-        return result.inserted_id
+        job_data['expires_at'] = job_data.get('updated_at', datetime.utcnow()) + timedelta(seconds=JOB_TTL)
+        mongo.db.jobs.replace_one({"_id": job_data["_id"]}, job_data, upsert=True)
+        return job_data["_id"]
     except Exception:
-        return None
\ No newline at end of file
+        return None
+
+@timed('mongo_write')
+def update_job(job_id, fields):
+    """Update fields of a background job document."""
+    try:
+        fields['updated_at'] = datetime.utcnow()
+        fields['expires_at'] = fields['updated_at'] + timedelta(seconds=JOB_TTL)
+        mongo.db.jobs.update_one({"_id": job_id}, {"$set": fields})
+        return job_id
+    except Exception:
+        return None
+
+@timed('mongo_read')
+def get_job(job_id):
+    """Get a background job by ID."""
+    try:
+        return mongo.db.jobs.find_one({"_id": job_id})
+    except Exception:
+        return None
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+from typing import Optional, Tuple
+from quart import Blueprint, request, jsonify, Response
+from services.async_gemini_client import get_async_gemini_client
+from services.file_processor import process_upload
+from services.text_stream import ExtractedText
+from services.retrieval import select_context
+from routes.sse import sse_event, sse_comment
+from routes.summarize import _store_summary, _store_study_pack
+from routes.quiz import _store_quiz
+from routes.explain import _store_explanation
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Async counterparts of the summarize/quiz/explain handlers, served over ASGI.
+# Gemini calls are awaited on the event loop; file parsing and MongoDB
+# writes are blocking, so they run on worker threads.
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+async def _read_content(text_field: str) -> Tuple[Optional[ExtractedText], str, str]:
+    """Get the material for a request from an uploaded file or a text field.
+    
+    Args:
+        text_field: Name of the form field holding pasted text
+    
+    Returns:
+        An (extracted text, filename, file type) tuple, the type of an
+        uploaded file being sniffed from its content; the extracted text
+        is None if the request carries neither
+    
+    Raises:
+        ValueError: If an uploaded file is unsupported or cannot be processed
+    """
+    files = await request.files
+    form = await request.form
+    
+    file = files.get('file')
+    if file and file.filename:
+        return await asyncio.to_thread(process_upload, file)
+    
+    pasted = form.get(text_field)
+    return ExtractedText.from_text(pasted) if pasted else None, 'User Input', 'txt'
+
+def _sse_response(events) -> Response:
+    """Wrap an async event generator in an unbuffered text/event-stream response."""
+    response = Response(events, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.timeout = None
+    return response
+
+@api_bp.route('/summarize', methods=['POST'])
+async def summarize():
+    """Summarize an uploaded file or pasted text and return the result as JSON."""
+    try:
+        document, filename, file_extension = await _read_content('content')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    content = document.text if document else None
+    if not content:
+        return jsonify({'error': 'Please upload a file or provide text to summarize'}), 400
+    
+    try:
+        # Map-reduce is used only for documents over the prompt budget
+        summary = await get_async_gemini_client().generate_summary(content)
+    except Exception as e:
+        logger.error("Error generating summary: %s", e)
+        return jsonify({'error': f'Error generating summary: {str(e)}'}), 502
+    
+    summary_id = await asyncio.to_thread(_store_summary, filename, file_extension, document, summary)
+    return jsonify({
+        'summary': summary,
+        'filename': filename,
+        'summary_id': str(summary_id) if summary_id else None
+    })
+
+@api_bp.route('/summarize/stream', methods=['POST'])
+async def stream_summary():
+    """Summarize an uploaded file or pasted text as server-sent events.
+    
+    Uses the same events as /summarize/stream on the WSGI app: ``message``
+    events with text, then ``done`` with the saved summary ID or ``error``.
+    """
+    try:
+        document, filename, file_extension = await _read_content('content')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    content = document.text if document else None
+    if not content:
+        return jsonify({'error': 'Please upload a file or provide text to summarize'}), 400
+    
+    async def generate():
+        yield sse_comment('generating')
+        pieces = []
+        try:
+            # Only documents over the prompt budget go through map-reduce and arrive in one piece
+            async for piece in get_async_gemini_client().stream_summary(content):
+                pieces.append(piece)
+                yield sse_event({'text': piece})
+        except Exception as e:
+            logger.error("Error streaming summary: %s", e)
+            yield sse_event({'error': f'Error generating summary: {str(e)}'}, event='error')
+            return
+        
+        summary_id = await asyncio.to_thread(_store_summary, filename, file_extension, document, ''.join(pieces))
+        yield sse_event({'summary_id': str(summary_id) if summary_id else None}, event='done')
+    
+    return _sse_response(generate())
+
+@api_bp.route('/quiz', methods=['POST'])
+async def generate_quiz():
+    """Generate a quiz from an uploaded file or pasted text and return it as JSON."""
+    try:
+        document, filename, _ = await _read_content('content')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    content = document.text if document else None
+    if not content:
+        return jsonify({'error': 'Please upload a file or provide text to generate a quiz'}), 400
+    
+    form = await request.form
+    try:
+        question_count = int(form.get('question_count', 5))
+    except ValueError:
+        return jsonify({'error': 'question_count must be a number'}), 400
+    difficulty = form.get('difficulty', 'medium')
+    
+    try:
+        quiz_data = await get_async_gemini_client().generate_quiz(content, question_count, difficulty)
+    except Exception as e:
+        logger.error("Error generating quiz: %s", e)
+        return jsonify({'error': f'Error generating quiz: {str(e)}'}), 502
+    
+    title, quiz_id = await asyncio.to_thread(_store_quiz, filename, quiz_data, question_count, difficulty)
+    return jsonify({
+        'quiz': quiz_data,
+        'quiz_title': title,
+        'difficulty': difficulty,
+        'quiz_id': str(quiz_id) if quiz_id else None
+    })
+
+@api_bp.route('/study-pack', methods=['POST'])
+async def study_pack():
+    """Generate a summary, key points, categories and a quiz in one call and return them as JSON."""
+    try:
+        document, filename, file_extension = await _read_content('content')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    content = document.text if document else None
+    if not content:
+        return jsonify({'error': 'Please upload a file or provide text for the study pack'}), 400
+    
+    form = await request.form
+    try:
+        question_count = int(form.get('question_count', 5))
+    except ValueError:
+        return jsonify({'error': 'question_count must be a number'}), 400
+    difficulty = form.get('difficulty', 'medium')
+    
+    try:
+        pack = await get_async_gemini_client().generate_study_pack(content, question_count, difficulty)
+    except Exception as e:
+        logger.error("Error generating study pack: %s", e)
+        return jsonify({'error': f'Error generating study pack: {str(e)}'}), 502
+    
+    return jsonify(await asyncio.to_thread(
+        _store_study_pack, filename, file_extension, document, pack, question_count, difficulty
+    ))
+
+@api_bp.route('/explain', methods=['POST'])
+async def explain():
+    """Explain a topic, with optional uploaded or pasted context, and return JSON."""
+    form = await request.form
+    topic = form.get('topic')
+    if not topic:
+        return jsonify({'error': 'Please provide a topic to explain'}), 400
+    
+    try:
+        document, _, _ = await _read_content('context')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    context = document.text if document else None
+    
+    try:
+        # Ranking chunks is CPU work, so it runs off the event loop
+        grounded = await asyncio.to_thread(select_context, topic, context)
+        explanation = await get_async_gemini_client().generate_explanation(topic, grounded)
+    except Exception as e:
+        logger.error("Error generating explanation: %s", e)
+        return jsonify({'error': f'Error generating explanation: {str(e)}'}), 502
+    
+    explanation_id = await asyncio.to_thread(_store_explanation, topic, context, explanation)
+    return jsonify({
+        'topic': topic,
+        'explanation': explanation,
+        'explanation_id': str(explanation_id) if explanation_id else None
+    })
+
+@api_bp.route('/explain/stream', methods=['POST'])
+async def stream_explanation():
+    """Explain a topic as server-sent events, using the same events as /api/summarize/stream."""
+    form = await request.form
+    topic = form.get('topic')
+    if not topic:
+        return jsonify({'error': 'Please provide a topic to explain'}), 400
+    
+    try:
+        document, _, _ = await _read_content('context')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    context = document.text if document else None
+    
+    async def generate():
+        yield sse_comment('generating')
+        pieces = []
+        try:
+            grounded = await asyncio.to_thread(select_context, topic, context)
+            async for piece in get_async_gemini_client().stream_explanation(topic, grounded):
+                pieces.append(piece)
+                yield sse_event({'text': piece})
+        except Exception as e:
+            logger.error("Error streaming explanation: %s", e)
+            yield sse_event({'error': f'Error generating explanation: {str(e)}'}, event='error')
+            return
+        
+        explanation_id = await asyncio.to_thread(_store_explanation, topic, context, ''.join(pieces))
+        yield sse_event({'explanation_id': str(explanation_id) if explanation_id else None}, event='done')
+    
+    return _sse_response(generate())
@@ -1,11 +1,16 @@
 import logging
 from datetime import datetime
-from flask import Blueprint, render_template, request, flash, session
-from services.gemini_client import GeminiClient
-from services.file_processor import process_file_content
+from flask import Blueprint, render_template, request, flash, session, jsonify, redirect, url_for
+from services.gemini_client import get_gemini_client
+from services.file_processor import process_upload
 from models import (
-    mongo, get_explanations, get_explanation, save_explanation, log_activity
+    mongo, get_recent_explanations, get_explanations_page, get_explanation, save_explanation, log_activity
 )
+from config import HISTORY_PAGE_SIZE
+from routes.sse import sse_event, sse_comment, sse_response
+from routes.jobs import wants_async, enqueue_job
+from services.content_store import remember, recall
+from services.retrieval import select_context
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -13,85 +18,138 @@ logger = logging.getLogger(__name__)
 # Initialize the blueprint
 explain_bp = Blueprint('explain', __name__, url_prefix='/explain')
 
-# Initialize Gemini Client
-gemini_client = GeminiClient()
+# Shared Gemini client backed by the pooled keep-alive session
+gemini_client = get_gemini_client()
+
+def _resolve_context():
+    """Work out the context material for an explanation request.
+    
+    An uploaded file takes priority, then content remembered in the
+    session, then text entered directly in the form.
+    
+    Returns:
+        The context text, or None if there is none
+    
+    Raises:
+        ValueError: If an uploaded file is unsupported or cannot be processed
+    """
+    # Check if we have a file upload for context
+    if 'file' in request.files and request.files['file'].filename != '':
+        # Process the file content for context; raises ValueError for unusable files
+        document, _, _ = process_upload(request.files['file'])
+        remember('last_content', document.text)
+        return document.text
+    
+    # If no file was uploaded, check if we have content in the session
+    context = recall('last_content')
+    if context:
+        return context
+    
+    # If we have text input directly in the form
+    if request.form.get('context'):
+        context = request.form.get('context')
+        remember('last_content', context)
+        return context
+    
+    return None
+
+def _store_explanation(topic, context, explanation):
+    """Save a generated explanation and log the activity.
+    
+    Returns:
+        The inserted explanation ID, or None if the database is not available
+    """
+    explanation_data = {
+        'topic': topic,
+        'context': context,
+        'explanation_content': explanation,
+        'created_at': datetime.utcnow()
+    }
+    explanation_id = save_explanation(explanation_data)
+    
+    # Log the activity
+    activity_data = {
+        'activity_type': 'explain',
+        'description': f'Generated explanation for topic: {topic}',
+        'reference_id': str(explanation_id),
+        'reference_type': 'explanation',
+        'created_at': datetime.utcnow()
+    }
+    log_activity(activity_data)
+    
+    return explanation_id
+
+def _explain_job(progress, topic, context):
+    """Background job body for an asynchronous explanation request."""
+    explanation = gemini_client.generate_explanation(topic, select_context(topic, context))
+    progress(90, 'Saving explanation')
+    explanation_id = _store_explanation(topic, context, explanation)
+    return {
+        'topic': topic,
+        'explanation': explanation,
+        'explanation_id': str(explanation_id) if explanation_id else None
+    }
+
+def _error_response(message):
+    """Report a request error as JSON for async clients, or as a flashed page."""
+    if wants_async():
+        return jsonify({'error': message}), 400
+    flash(message, 'danger')
+    recent_explanations = get_recent_explanations(limit=5)
+    return render_template('explain.html', recent_explanations=recent_explanations)
 
 @explain_bp.route('/', methods=['GET'])
 def explain_page():
     """Render the explain page."""
     # Get recent explanations
-    recent_explanations = get_explanations(limit=5)
+    recent_explanations = get_recent_explanations(limit=5)
     return render_template('explain.html', recent_explanations=recent_explanations)
 
+@explain_bp.route('/history', methods=['GET'])
+def explanation_history():
+    """Show history of explanations, one keyset-paginated page at a time."""
+    try:
+        page = get_explanations_page(
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            limit=HISTORY_PAGE_SIZE
+        )
+    except ValueError:
+        flash('Invalid page link', 'warning')
+        return redirect(url_for('explain.explanation_history'))
+    
+    return render_template(
+        'explanation_history.html',
+        explanations=page['items'],
+        next_cursor=page['next_cursor'],
+        prev_cursor=page['prev_cursor']
+    )
+
 @explain_bp.route('/process', methods=['POST'])
 def process_for_explanation():
     """Process a topic or concept for detailed explanation."""
     topic = request.form.get('topic')
-    context = None
     
-    # Check if we have a file upload for context
-    if 'file' in request.files and request.files['file'].filename != '':
-        file = request.files['file']
-        
-        # Check file extension
-        allowed_extensions = {'txt', 'pdf', 'docx'}
-        filename = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
-        
-        if filename not in allowed_extensions:
-            flash(f'File type not supported. Please upload {", ".join(allowed_extensions)} files', 'danger')
-            recent_explanations = get_explanations(limit=5)
-            return render_template('explain.html', recent_explanations=recent_explanations)
-        
-        try:
-            # Process the file content for context
-            context = process_file_content(file)
-            session['last_content'] = context
-        except Exception as e:
-            logger.error(f"Error processing file: {str(e)}")
-            flash(f'Error processing file: {str(e)}', 'danger')
-            recent_explanations = get_explanations(limit=5)
-            return render_template('explain.html', recent_explanations=recent_explanations)
-    
-    # If no file was uploaded, check if we have content in the session
-    elif 'last_content' in session and session['last_content']:
-        context = session['last_content']
-    
-    # If we have text input directly in the form
-    elif request.form.get('context'):
-        context = request.form.get('context')
-        session['last_content'] = context
+    try:
+        context = _resolve_context()
+    except ValueError as e:
+        return _error_response(str(e))
     
     # Make sure we have a topic to explain
     if not topic:
-        flash('Please provide a topic or concept to explain', 'danger')
-        recent_explanations = get_explanations(limit=5)
-        return render_template('explain.html', recent_explanations=recent_explanations)
+        return _error_response('Please provide a topic or concept to explain')
+    
+    if wants_async():
+        return enqueue_job('explain', _explain_job, topic, context)
     
     try:
-        # Generate explanation with Gemini AI
-        explanation = gemini_client.generate_explanation(topic, context)
+        # Generate explanation with Gemini AI, grounded in the most relevant parts of the context
+        explanation = gemini_client.generate_explanation(topic, select_context(topic, context))
         
-        # Save to database
-        explanation_data = {
-            'topic': topic,
-            'context': context,
-            'explanation_content': explanation,
-            'created_at': datetime.utcnow()
-        }
-        explanation_id = save_explanation(explanation_data)
-        
-        # Log the activity
-        activity_data = {
-            'activity_type': 'explain',
-            'description': f'Generated explanation for topic: {topic}',
-            'reference_id': str(explanation_id),
-            'reference_type': 'explanation',
-            'created_at': datetime.utcnow()
-        }
-        log_activity(activity_data)
+        explanation_id = _store_explanation(topic, context, explanation)
         
         # Get recent explanations
-        recent_explanations = get_explanations(limit=5)
+        recent_explanations = get_recent_explanations(limit=5)
         
         return render_template(
             'explain.html', 
@@ -102,7 +160,39 @@ def process_for_explanation():
         )
     
     except Exception as e:
-        logger.error(f"Error generating explanation: {str(e)}")
-        flash(f'Error generating explanation: {str(e)}', 'danger')
-        recent_explanations = get_explanations(limit=5)
-        return render_template('explain.html', recent_explanations=recent_explanations)
+        logger.error("Error generating explanation: %s", e)
+        return _error_response(f'Error generating explanation: {str(e)}')
+
+@explain_bp.route('/stream', methods=['POST'])
+def stream_explanation():
+    """Stream a detailed explanation of a topic as server-sent events.
+    
+    Text is pushed as ``message`` events while Gemini generates it. A final
+    ``done`` event carries the saved explanation ID, or an ``error`` event
+    reports a failure.
+    """
+    topic = request.form.get('topic')
+    if not topic:
+        return jsonify({'error': 'Please provide a topic or concept to explain'}), 400
+    
+    try:
+        context = _resolve_context()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def generate():
+        yield sse_comment('generating')
+        pieces = []
+        try:
+            for piece in gemini_client.stream_explanation(topic, select_context(topic, context)):
+                pieces.append(piece)
+                yield sse_event({'text': piece})
+        except Exception as e:
+            logger.error("Error streaming explanation: %s", e)
+            yield sse_event({'error': f'Error generating explanation: {str(e)}'}, event='error')
+            return
+        
+        explanation_id = _store_explanation(topic, context, ''.join(pieces))
+        yield sse_event({'explanation_id': str(explanation_id) if explanation_id else None}, event='done')
+    
+    return sse_response(generate())
@@ -0,0 +1,50 @@
+import logging
+from flask import Blueprint, jsonify, request, url_for
+from services.job_queue import job_queue, QueueFullError
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Initialize the blueprint
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/jobs')
+
+def wants_async():
+    """Return True if the client asked for the request to run as a background job.
+    
+    Clients opt in with ``?async=1`` or the ``Prefer: respond-async`` header.
+    """
+    if request.args.get('async', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return 'respond-async' in request.headers.get('Prefer', '')
+
+def enqueue_job(job_type, func, *args):
+    """Enqueue a generation job and build the 202 response for it."""
+    try:
+        job_id = job_queue.submit(job_type, func, *args)
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+    
+    return jsonify({
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': url_for('jobs.job_status', job_id=job_id)
+    }), 202
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Report the status, progress and (when finished) result of a job."""
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify({
+        'job_id': job['_id'],
+        'job_type': job['job_type'],
+        'status': job['status'],
+        'progress': job.get('progress', 0),
+        'message': job.get('message'),
+        'result': job.get('result'),
+        'error': job.get('error'),
+        'created_at': job['created_at'].isoformat(),
+        'updated_at': job['updated_at'].isoformat()
+    })
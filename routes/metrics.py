@@ -0,0 +1,105 @@
+import hmac
+import time
+import logging
+from flask import Blueprint, Response, abort, g, request, before_render_template, template_rendered
+from config import METRICS_ENABLED, METRICS_TOKEN, METRICS_ALLOWED_ADDRESSES
+from services.metrics import (
+    registry, REQUEST_SECONDS, record_stage, start_request_timing, finish_request_timing, server_timing_header
+)
+from services.gemini_client import get_gemini_client
+from services.resilience import gemini_circuit_breaker, gemini_rate_limiter
+from services.extraction_cache import extraction_cache
+from services.retrieval import retrieval_store
+from models import activity_writer, recent_items
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Initialize the blueprint
+metrics_bp = Blueprint('metrics', __name__)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _register_component_stats():
+    """Expose the counters kept by the caches, writers and Gemini transport."""
+    client = get_gemini_client()
+    registry.register_stats('response_cache', 'Gemini response cache statistics',
+                            lambda: client.cache.stats() if client.cache is not None else {})
+    registry.register_stats('gemini_tokens', 'Gemini calls and tokens by kind of call',
+                            client.usage.stats, label_name='kind')
+    registry.register_stats('gemini_coalescing', 'Identical Gemini calls coalesced into one request',
+                            client.coalescing_stats)
+    registry.register_stats('gemini_circuit', 'Gemini circuit breaker state and counters',
+                            gemini_circuit_breaker.stats)
+    registry.register_stats('gemini_rate_limiter', 'Gemini rate limiter counters', gemini_rate_limiter.stats)
+    registry.register_stats('extraction_cache', 'Extracted document text cache statistics', extraction_cache.stats)
+    registry.register_stats('retrieval', 'Retrieval index queries and builds', retrieval_store.stats)
+    registry.register_stats('activity_writer', 'Batched activity writer counters', activity_writer.stats)
+    registry.register_stats('recent_items', 'Recent items cache statistics', recent_items.stats)
+
+_register_component_stats()
+
+def _observe_request(response, method: str, endpoint: str):
+    """Record request latency and attach the Server-Timing header."""
+    total, timings = finish_request_timing()
+    REQUEST_SECONDS.observe(total, method, endpoint, str(response.status_code))
+    response.headers['Server-Timing'] = server_timing_header(total, timings)
+    return response
+
+def init_request_metrics(app):
+    """Time every request of a Flask app, including template rendering.
+    
+    Streaming responses are measured up to the start of the body.
+    """
+    @app.before_request
+    def _start_timing():
+        start_request_timing()
+    
+    @app.after_request
+    def _finish_timing(response):
+        return _observe_request(response, request.method, request.endpoint or 'unmatched')
+    
+    def _template_started(sender, template, context, **extra):
+        g._template_start = time.perf_counter()
+    
+    def _template_done(sender, template, context, **extra):
+        start = g.pop('_template_start', None)
+        if start is not None:
+            record_stage('template_render', time.perf_counter() - start)
+    
+    before_render_template.connect(_template_started, app, weak=False)
+    template_rendered.connect(_template_done, app, weak=False)
+
+def init_async_request_metrics(app):
+    """Time every request of a Quart app; see init_request_metrics()."""
+    from quart import request as async_request
+    
+    @app.before_request
+    async def _start_timing():
+        start_request_timing()
+    
+    @app.after_request
+    async def _finish_timing(response):
+        return _observe_request(response, async_request.method, async_request.endpoint or 'unmatched')
+
+def _metrics_allowed() -> bool:
+    """Return True if the request may read /metrics.
+    
+    With METRICS_TOKEN set, the request must carry it as a bearer token.
+    Otherwise only METRICS_ALLOWED_ADDRESSES may read it; behind a reverse
+    proxy every request comes from the proxy, so set a token there.
+    """
+    if METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '')
+        return hmac.compare_digest(supplied.encode(), f'Bearer {METRICS_TOKEN}'.encode())
+    return request.remote_addr in METRICS_ALLOWED_ADDRESSES
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose latency histograms and component counters in Prometheus text format."""
+    if not METRICS_ENABLED:
+        abort(404)
+    if not _metrics_allowed():
+        logger.info("Refused /metrics request from %s", request.remote_addr)
+        abort(403)
+    return Response(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,11 +1,14 @@
 import logging
 from datetime import datetime
-from flask import Blueprint, render_template, request, jsonify, flash, session
-from services.gemini_client import GeminiClient
-from services.file_processor import process_file_content
+from flask import Blueprint, render_template, request, jsonify, flash, session, redirect, url_for
+from services.gemini_client import get_gemini_client
+from services.file_processor import process_upload
 from models import (
-    mongo, get_quizzes, get_quiz, save_quiz, log_activity
+    mongo, get_recent_quizzes, get_quizzes_page, get_quiz, save_quiz, log_activity, save_quiz_attempt
 )
+from config import HISTORY_PAGE_SIZE
+from routes.jobs import wants_async, enqueue_job
+from services.content_store import remember, recall
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -13,16 +16,87 @@ logger = logging.getLogger(__name__)
 # Initialize the blueprint
 quiz_bp = Blueprint('quiz', __name__, url_prefix='/quiz')
 
-# Initialize Gemini Client
-gemini_client = GeminiClient()
+# Shared Gemini client backed by the pooled keep-alive session
+gemini_client = get_gemini_client()
+
+def _store_quiz(filename, quiz_data, question_count, difficulty):
+    """Save a generated quiz and log the activity.
+    
+    Returns:
+        A (title, quiz_id) tuple; quiz_id is None if the database is not available
+    """
+    # Create quiz title
+    title = f"Quiz on {filename}"
+    
+    # Save quiz to database
+    quiz_obj = {
+        'title': title,
+        'difficulty': difficulty,
+        'question_count': question_count,
+        'quiz_data': quiz_data,
+        'created_at': datetime.utcnow()
+    }
+    quiz_id = save_quiz(quiz_obj)
+    
+    # Log the activity
+    activity_data = {
+        'activity_type': 'quiz',
+        'description': f'Generated quiz based on {filename}',
+        'reference_id': str(quiz_id),
+        'reference_type': 'quiz',
+        'created_at': datetime.utcnow()
+    }
+    log_activity(activity_data)
+    
+    return title, quiz_id
+
+def _quiz_job(progress, content, filename, question_count, difficulty):
+    """Background job body for an asynchronous quiz request."""
+    quiz_data = gemini_client.generate_quiz(content, question_count, difficulty)
+    progress(90, 'Saving quiz')
+    title, quiz_id = _store_quiz(filename, quiz_data, question_count, difficulty)
+    # Submitted to /quiz/submit with this quiz_id, since the session cannot be set from here
+    return {
+        'quiz': quiz_data,
+        'quiz_title': title,
+        'difficulty': difficulty,
+        'quiz_id': str(quiz_id) if quiz_id else None
+    }
+
+def _error_response(message):
+    """Report a request error as JSON for async clients, or as a flashed page."""
+    if wants_async():
+        return jsonify({'error': message}), 400
+    flash(message, 'danger')
+    return render_template('quiz.html', recent_quizzes=get_recent_quizzes(limit=5))
 
 @quiz_bp.route('/', methods=['GET'])
 def quiz_page():
     """Render the quiz page."""
     # Get recent quizzes
-    recent_quizzes = get_quizzes(limit=5)
+    recent_quizzes = get_recent_quizzes(limit=5)
     return render_template('quiz.html', recent_quizzes=recent_quizzes)
 
+@quiz_bp.route('/history', methods=['GET'])
+def quiz_history():
+    """Show history of quizzes, one keyset-paginated page at a time."""
+    try:
+        page = get_quizzes_page(
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            limit=HISTORY_PAGE_SIZE
+        )
+    except ValueError:
+        flash('Invalid page link', 'warning')
+        return redirect(url_for('quiz.quiz_history'))
+    
+    return render_template(
+        'quiz_history.html',
+        quizzes=page['items'],
+        next_cursor=page['next_cursor'],
+        prev_cursor=page['prev_cursor']
+    )
+
 @quiz_bp.route('/generate', methods=['POST'])
 def generate_quiz():
     """Generate a quiz based on uploaded content or previously processed content."""
@@ -31,81 +105,50 @@ def generate_quiz():
     
     # Check if we have a file upload
     if 'file' in request.files and request.files['file'].filename != '':
-        file = request.files['file']
-        filename = file.filename
-        
-        # Check file extension
-        allowed_extensions = {'txt', 'pdf', 'docx'}
-        file_ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
-        
-        if file_ext not in allowed_extensions:
-            flash(f'File type not supported. Please upload {", ".join(allowed_extensions)} files', 'danger')
-            return render_template('quiz.html', recent_quizzes=get_quizzes(limit=5))
-        
         try:
-            # Process the file content
-            content = process_file_content(file)
-            session['last_content'] = content
-            session['last_filename'] = filename
-        except Exception as e:
-            logger.error(f"Error processing file: {str(e)}")
-            flash(f'Error processing file: {str(e)}', 'danger')
-            return render_template('quiz.html', recent_quizzes=get_quizzes(limit=5))
+            # Process the file content; its type is sniffed, not taken from the name
+            document, filename, _ = process_upload(request.files['file'])
+        except ValueError as e:
+            return _error_response(str(e))
+        content = document.text
+        remember('last_content', content)
+        session['last_filename'] = filename
     
     # If no file was uploaded, check if we have content in the session
-    elif 'last_content' in session and session['last_content']:
-        content = session['last_content']
-        if 'last_filename' in session:
+    if content is None and 'last_content_ref' in session:
+        content = recall('last_content')
+        if content and 'last_filename' in session:
             filename = session['last_filename']
     
     # If we have text input directly in the form
-    elif request.form.get('content'):
+    if content is None and request.form.get('content'):
         content = request.form.get('content')
-        session['last_content'] = content
+        remember('last_content', content)
     
     # If we still don't have content, show an error
     if not content:
-        flash('Please upload a file or provide text to generate a quiz', 'danger')
-        return render_template('quiz.html', recent_quizzes=get_quizzes(limit=5))
+        return _error_response('Please upload a file or provide text to generate a quiz')
     
     # Get quiz options
     question_count = int(request.form.get('question_count', 5))
     difficulty = request.form.get('difficulty', 'medium')
     
+    if wants_async():
+        return enqueue_job('quiz', _quiz_job, content, filename, question_count, difficulty)
+    
     try:
         # Generate quiz with Gemini AI
         quiz_data = gemini_client.generate_quiz(content, question_count, difficulty)
         
-        # Create quiz title
-        title = f"Quiz on {filename}"
-        
-        # Save quiz to database
-        quiz_obj = {
-            'title': title,
-            'difficulty': difficulty,
-            'question_count': question_count,
-            'quiz_data': quiz_data,
-            'created_at': datetime.utcnow()
-        }
-        quiz_id = save_quiz(quiz_obj)
-        
-        # Log the activity
-        activity_data = {
-            'activity_type': 'quiz',
-            'description': f'Generated quiz based on {filename}',
-            'reference_id': str(quiz_id),
-            'reference_type': 'quiz',
-            'created_at': datetime.utcnow()
-        }
-        log_activity(activity_data)
+        title, quiz_id = _store_quiz(filename, quiz_data, question_count, difficulty)
         
         # Store in session for display
-        session['current_quiz'] = quiz_data
+        remember('current_quiz', quiz_data)
         session['current_quiz_id'] = str(quiz_id)
         session['current_quiz_title'] = title
         
         # Get recent quizzes
-        recent_quizzes = get_quizzes(limit=5)
+        recent_quizzes = get_recent_quizzes(limit=5)
         
         return render_template(
             'quiz.html', 
@@ -116,13 +159,16 @@ def generate_quiz():
         )
     
     except Exception as e:
-        logger.error(f"Error generating quiz: {str(e)}")
-        flash(f'Error generating quiz: {str(e)}', 'danger')
-        return render_template('quiz.html', recent_quizzes=get_quizzes(limit=5))
+        logger.error("Error generating quiz: %s", e)
+        return _error_response(f'Error generating quiz: {str(e)}')
 
 @quiz_bp.route('/submit', methods=['POST'])
 def submit_quiz():
-    """Handle quiz submission and score calculation."""
+    """Handle quiz submission and score calculation.
+    
+    The quiz is the one last generated in this session, or the one named
+    by a ``quiz_id`` form field, e.g. a quiz generated as a background job.
+    """
     try:
         # Get user answers from form
         user_answers = {}
@@ -131,13 +177,21 @@ def submit_quiz():
                 question_id = key.replace('question-', '')
                 user_answers[question_id] = value
         
-        # Get current quiz data from session
-        quiz_data = session.get('current_quiz')
-        quiz_id = session.get('current_quiz_id')
+        if request.form.get('quiz_id'):
+            # Async jobs run outside the request, so their quiz is loaded by ID
+            quiz_doc = get_quiz(request.form['quiz_id'])
+            quiz_data = quiz_doc['quiz_data'] if quiz_doc else None
+            quiz_id = str(quiz_doc['_id']) if quiz_doc else None
+            quiz_title = quiz_doc['title'] if quiz_doc else None
+        else:
+            # Get current quiz data from session
+            quiz_data = recall('current_quiz')
+            quiz_id = session.get('current_quiz_id')
+            quiz_title = session.get('current_quiz_title')
         
         if not quiz_data or not quiz_id:
             flash('Quiz data not found. Please generate a new quiz.', 'warning')
-            return render_template('quiz.html', recent_quizzes=get_quizzes(limit=5))
+            return render_template('quiz.html', recent_quizzes=get_recent_quizzes(limit=5))
         
         # Calculate score
         correct_count = 0
@@ -164,17 +218,15 @@ def submit_quiz():
         # Calculate percentage
         score_percent = int((correct_count / total_questions) * 100) if total_questions > 0 else 0
         
-        # Save quiz attempt
-        try:
-            quiz_attempt = {
-                'quiz_id': quiz_id,
-                'score': correct_count,
-                'max_score': total_questions,
-                'created_at': datetime.utcnow()
-            }
-            mongo.db.quiz_attempts.insert_one(quiz_attempt)
-        except Exception as e:
-            logger.warning(f"Failed to save quiz attempt: {str(e)}")
+        # Save quiz attempt (written in the background in batches)
+        quiz_attempt = {
+            'quiz_id': quiz_id,
+            'score': correct_count,
+            'max_score': total_questions,
+            'created_at': datetime.utcnow()
+        }
+        if not save_quiz_attempt(quiz_attempt):
+            logger.warning("Failed to queue quiz attempt for saving")
         
         # Return results
         return render_template(
@@ -183,11 +235,11 @@ def submit_quiz():
             score=correct_count,
             total=total_questions,
             percent=score_percent,
-            quiz_title=session.get('current_quiz_title'),
-            recent_quizzes=get_quizzes(limit=5)
+            quiz_title=quiz_title,
+            recent_quizzes=get_recent_quizzes(limit=5)
         )
     
     except Exception as e:
-        logger.error(f"Error processing quiz submission: {str(e)}")
+        logger.error("Error processing quiz submission: %s", e)
         flash(f'Error processing your quiz submission: {str(e)}', 'danger')
-        return render_template('quiz.html', recent_quizzes=get_quizzes(limit=5))
+        return render_template('quiz.html', recent_quizzes=get_recent_quizzes(limit=5))
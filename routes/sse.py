@@ -0,0 +1,33 @@
+"""Helpers for streaming server-sent events from the blueprints."""
+import json
+from typing import Any, Dict, Iterator, Optional
+from flask import Response, stream_with_context
+
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Format one server-sent event.
+    
+    Args:
+        data: JSON-serializable event payload
+        event: Optional event name; unnamed events arrive as "message"
+        
+    Returns:
+        The event in text/event-stream wire format
+    """
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+def sse_comment(text: str) -> str:
+    """Format an SSE comment, which clients ignore but which flushes headers early."""
+    return f": {text}\n\n"
+
+def sse_response(events: Iterator[str]) -> Response:
+    """Wrap an event generator in an unbuffered text/event-stream response.
+    
+    The request context is kept alive for the generator so it can still
+    use the session and database after the view has returned.
+    """
+    response = Response(stream_with_context(events), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Ask reverse proxies such as nginx not to buffer the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
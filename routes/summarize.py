@@ -2,12 +2,21 @@ import os
 import logging
 from datetime import datetime
 from flask import Blueprint, render_template, request, jsonify, flash, session, redirect, url_for
-from werkzeug.utils import secure_filename
-from services.gemini_client import GeminiClient
-from services.file_processor import process_file_content, get_file_content_summary
+from services.gemini_client import get_gemini_client
+from services.file_processor import process_upload, get_file_content_summary
+from services.text_stream import ExtractedText
+from services.batch_processor import BatchCollector, process_batch, remove_batch_items
+from services.summarizer import Summarizer
+from services.upload import upload_limit
 from models import (
-    mongo, get_summaries, get_summary, save_summary, log_activity
+    mongo, get_recent_summaries, get_summaries_page, get_summary, get_summary_content,
+    save_summary, save_summaries, log_activity
 )
+from config import HISTORY_PAGE_SIZE, BATCH_INSERT_SIZE, BATCH_MAX_BYTES
+from routes.sse import sse_event, sse_comment, sse_response
+from routes.jobs import wants_async, enqueue_job
+from routes.quiz import _store_quiz
+from services.content_store import remember
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -15,76 +24,188 @@ logger = logging.getLogger(__name__)
 # Initialize the blueprint
 summarize_bp = Blueprint('summarize', __name__, url_prefix='/summarize')
 
-# Initialize Gemini Client
-gemini_client = GeminiClient()
+# Shared Gemini client backed by the pooled keep-alive session
+gemini_client = get_gemini_client()
+
+# Summarizer switches to chunked map-reduce for large documents
+summarizer = Summarizer()
+
+def _summary_document(filename, file_extension, document, summary, extra=None):
+    """Build the database document for a generated summary.
+    
+    The word count and document ID come from the ExtractedText, so the
+    content is not counted or hashed again.
+    """
+    summary_data = {
+        'title': filename,
+        'original_content': document.text,
+        'content_ref': document.sha256,
+        'summary_content': summary,
+        'file_type': file_extension,
+        'word_count': document.word_count,
+        'created_at': datetime.utcnow()
+    }
+    if extra:
+        summary_data.update(extra)
+    return summary_data
+
+def _log_summary_activity(filename, summary_id):
+    """Log the activity for a saved summary."""
+    activity_data = {
+        'activity_type': 'summarize',
+        'description': f'Generated summary for {filename}',
+        'reference_id': str(summary_id),
+        'reference_type': 'summary',
+        'created_at': datetime.utcnow()
+    }
+    log_activity(activity_data)
+
+def _store_summary(filename, file_extension, document, summary, extra=None):
+    """Save a generated summary and log the activity.
+    
+    Args:
+        document: ExtractedText of the summarized content
+        extra: Optional additional fields to store with the summary
+    
+    Returns:
+        The inserted summary ID, or None if the database is not available
+    """
+    summary_id = save_summary(_summary_document(filename, file_extension, document, summary, extra))
+    
+    # Log the activity if database is available
+    if summary_id:
+        _log_summary_activity(filename, summary_id)
+    
+    return summary_id
+
+def _summarize_job(progress, filename, file_extension, document):
+    """Background job body for an asynchronous summary request."""
+    summary = summarizer.summarize_text(document.text)
+    progress(90, 'Saving summary')
+    summary_id = _store_summary(filename, file_extension, document, summary)
+    return {
+        'summary': summary,
+        'filename': filename,
+        'summary_id': str(summary_id) if summary_id else None
+    }
+
+def _batch_job(progress, items, skipped):
+    """Extract, summarize and save a batch of documents, reporting progress per file.
+    
+    Summaries are saved with bulk inserts of BATCH_INSERT_SIZE documents as
+    they complete. The spooled files are removed when the batch is done.
+    """
+    results = list(skipped)
+    pending_docs, pending_results = [], []
+    
+    def flush():
+        summary_ids = save_summaries(pending_docs) or [None] * len(pending_docs)
+        for result, summary_id in zip(pending_results, summary_ids):
+            result['summary_id'] = str(summary_id) if summary_id else None
+            if summary_id:
+                _log_summary_activity(result['filename'], summary_id)
+        pending_docs.clear()
+        pending_results.clear()
+    
+    try:
+        for done, (item, extracted, summary, error) in enumerate(
+                process_batch(items, summarizer.summarize_text), start=1):
+            result = {'index': item.index, 'filename': item.filename}
+            if error:
+                result.update({'status': 'failed', 'error': error})
+            else:
+                result.update({'status': 'succeeded', 'summary': summary, 'word_count': extracted.word_count})
+                pending_docs.append(_summary_document(item.filename, item.file_type, extracted, summary))
+                pending_results.append(result)
+                if len(pending_docs) >= BATCH_INSERT_SIZE:
+                    flush()
+            results.append(result)
+            progress(int(95 * done / len(items)), f'Processed {done} of {len(items)} files: {item.filename}')
+        flush()
+    finally:
+        remove_batch_items(items)
+    
+    results.sort(key=lambda result: result['index'])
+    counts = {status: sum(1 for result in results if result['status'] == status)
+              for status in ('succeeded', 'failed', 'skipped')}
+    return {'files': results, **counts}
+
+def _store_study_pack(filename, file_extension, document, pack, question_count, difficulty):
+    """Save each part of a study pack through the summary and quiz helpers.
+    
+    Returns:
+        A JSON-ready dictionary with the pack and the saved IDs
+    """
+    quiz_title, quiz_id = _store_quiz(filename, pack['quiz'], question_count, difficulty)
+    summary_id = _store_summary(filename, file_extension, document, pack['summary'], extra={
+        'key_points': pack['key_points'],
+        'categories': pack['categories'],
+        'quiz_id': str(quiz_id) if quiz_id else None
+    })
+    return {
+        **pack,
+        'filename': filename,
+        'quiz_title': quiz_title,
+        'difficulty': difficulty,
+        'summary_id': str(summary_id) if summary_id else None,
+        'quiz_id': str(quiz_id) if quiz_id else None
+    }
+
+def _study_pack_job(progress, filename, file_extension, document, question_count, difficulty):
+    """Background job body for an asynchronous study pack request."""
+    pack = gemini_client.generate_study_pack(document.text, question_count, difficulty)
+    progress(90, 'Saving study pack')
+    return _store_study_pack(filename, file_extension, document, pack, question_count, difficulty)
+
+def _error_response(message):
+    """Report a request error as JSON for async clients, or as a flashed page."""
+    if wants_async():
+        return jsonify({'error': message}), 400
+    flash(message, 'danger')
+    recent_summaries = get_recent_summaries(limit=5)
+    return render_template('summarize.html', recent_summaries=recent_summaries)
 
 @summarize_bp.route('/', methods=['GET'])
 def summarize_page():
     """Render the summarize page."""
     # Get the most recent summaries for display
-    recent_summaries = get_summaries(limit=5)
+    recent_summaries = get_recent_summaries(limit=5)
     return render_template('summarize.html', recent_summaries=recent_summaries)
 
 @summarize_bp.route('/process', methods=['POST'])
 def process_for_summary():
     """Process uploaded file and generate a summary."""
     if 'file' not in request.files:
-        flash('No file part', 'danger')
-        recent_summaries = get_summaries(limit=5)
-        return render_template('summarize.html', recent_summaries=recent_summaries)
+        return _error_response('No file part')
     
     file = request.files['file']
     
     if file.filename == '':
-        flash('No file selected', 'danger')
-        recent_summaries = get_summaries(limit=5)
-        return render_template('summarize.html', recent_summaries=recent_summaries)
+        return _error_response('No file selected')
     
-    # Check file extension
-    allowed_extensions = {'txt', 'pdf', 'docx'}
-    filename = secure_filename(file.filename)
-    file_extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
-    
-    if file_extension not in allowed_extensions:
-        flash(f'File type not supported. Please upload {", ".join(allowed_extensions)} files', 'danger')
-        recent_summaries = get_summaries(limit=5)
-        return render_template('summarize.html', recent_summaries=recent_summaries)
+    try:
+        # The file type is sniffed from the content, whatever the extension says
+        document, filename, file_extension = process_upload(file)
+    except ValueError as e:
+        return _error_response(str(e))
+    content = document.text
     
     try:
-        # Process file content
-        content = process_file_content(file)
+        if wants_async():
+            remember('last_content', content)
+            return enqueue_job('summarize', _summarize_job, filename, file_extension, document)
         
         # Generate summary with Gemini AI
-        summary = gemini_client.generate_summary(content)
+        summary = summarizer.summarize_text(content)
         
-        # Store in session for potential later use
-        session['last_content'] = content
-        session['last_summary'] = summary
+        # Keep server-side for potential later use; the cookie only holds references
+        remember('last_content', content)
+        remember('last_summary', summary)
         
-        # Save to database
-        summary_data = {
-            'title': filename,
-            'original_content': content,
-            'summary_content': summary,
-            'file_type': file_extension,
-            'word_count': len(content.split()),
-            'created_at': datetime.utcnow()
-        }
-        summary_id = save_summary(summary_data)
-        
-        # Log the activity if database is available
-        if summary_id:
-            activity_data = {
-                'activity_type': 'summarize',
-                'description': f'Generated summary for {filename}',
-                'reference_id': str(summary_id),
-                'reference_type': 'summary',
-                'created_at': datetime.utcnow()
-            }
-            log_activity(activity_data)
+        summary_id = _store_summary(filename, file_extension, document, summary)
         
         # Get recent summaries for display
-        recent_summaries = get_summaries(limit=5)
+        recent_summaries = get_recent_summaries(limit=5)
         
         template_args = {
             'summary': summary,
@@ -95,20 +216,149 @@ def process_for_summary():
         # Only add summary_id if database save was successful
         if summary_id:
             template_args['summary_id'] = str(summary_id)
-            
+        
         return render_template('summarize.html', **template_args)
     
     except Exception as e:
-        logger.error(f"Error processing file: {str(e)}")
-        flash(f'Error processing file: {str(e)}', 'danger')
-        recent_summaries = get_summaries(limit=5)
-        return render_template('summarize.html', recent_summaries=recent_summaries)
+        logger.error("Error processing file: %s", e)
+        return _error_response(f'Error processing file: {str(e)}')
+
+@summarize_bp.route('/study-pack', methods=['POST'])
+def study_pack():
+    """Generate a summary, key points, categories and a quiz in one Gemini call.
+    
+    Takes an uploaded ``file`` or pasted ``content``, plus optional
+    ``question_count`` and ``difficulty``, and returns the whole pack as
+    JSON. The summary and quiz are saved like those made separately.
+    """
+    file = request.files.get('file')
+    if file and file.filename:
+        try:
+            document, filename, file_extension = process_upload(file)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    else:
+        pasted = request.form.get('content')
+        document = ExtractedText.from_text(pasted) if pasted else None
+        filename, file_extension = 'User Input', 'txt'
+    
+    if not document or not document.text:
+        return jsonify({'error': 'Please upload a file or provide text for the study pack'}), 400
+    content = document.text
+    
+    try:
+        question_count = int(request.form.get('question_count', 5))
+    except ValueError:
+        return jsonify({'error': 'question_count must be a number'}), 400
+    difficulty = request.form.get('difficulty', 'medium')
+    
+    remember('last_content', content)
+    if wants_async():
+        return enqueue_job('study_pack', _study_pack_job, filename, file_extension, document, question_count, difficulty)
+    
+    try:
+        pack = gemini_client.generate_study_pack(content, question_count, difficulty)
+    except Exception as e:
+        logger.error("Error generating study pack: %s", e)
+        return jsonify({'error': f'Error generating study pack: {str(e)}'}), 502
+    
+    return jsonify(_store_study_pack(filename, file_extension, document, pack, question_count, difficulty))
+
+@summarize_bp.route('/batch', methods=['POST'])
+@upload_limit(BATCH_MAX_BYTES)
+def batch_summary():
+    """Summarize many files at once, e.g. a whole course folder.
+    
+    Takes several ``files`` uploads, any of which may be a zip archive of
+    documents. With ``?async=1`` the batch runs as a background job whose
+    status reports per-file progress; otherwise the response waits for it.
+    Either way the result lists each file's status, summary and saved ID.
+    """
+    uploads = [upload for upload in request.files.getlist('files') if upload.filename]
+    if not uploads:
+        return jsonify({'error': 'Please upload one or more files or zip archives'}), 400
+    
+    collector = BatchCollector()
+    try:
+        for upload in uploads:
+            collector.add_upload(upload)
+    except Exception as e:
+        collector.cleanup()
+        logger.error("Error reading batch upload: %s", e)
+        return jsonify({'error': f'Error reading upload: {str(e)}'}), 400
+    
+    if not collector.items:
+        return jsonify({'error': 'No supported files in the upload', 'files': collector.skipped}), 400
+    
+    if wants_async():
+        response = enqueue_job('summarize_batch', _batch_job, collector.items, collector.skipped)
+        if response[1] != 202:
+            collector.cleanup()
+        return response
+    
+    return jsonify(_batch_job(lambda percent, message: None, collector.items, collector.skipped))
+
+@summarize_bp.route('/stream', methods=['POST'])
+def stream_summary():
+    """Process an uploaded file and stream its summary as server-sent events.
+    
+    Text is pushed as ``message`` events while Gemini generates it. A final
+    ``done`` event carries the saved summary ID, or an ``error`` event
+    reports a failure.
+    """
+    file = request.files.get('file')
+    if not file or file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+    
+    try:
+        document, filename, file_extension = process_upload(file)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    content = document.text
+    
+    # The session cookie is written before the body streams, so set it now
+    remember('last_content', content)
+    
+    def generate():
+        yield sse_comment('generating')
+        pieces = []
+        try:
+            # Only documents over the prompt budget go through map-reduce and arrive in one piece
+            for piece in gemini_client.stream_summary(content):
+                pieces.append(piece)
+                yield sse_event({'text': piece})
+        except Exception as e:
+            logger.error("Error streaming summary: %s", e)
+            yield sse_event({'error': f'Error generating summary: {str(e)}'}, event='error')
+            return
+        
+        summary_id = _store_summary(filename, file_extension, document, ''.join(pieces))
+        done = {'summary_id': str(summary_id) if summary_id else None}
+        if summary_id:
+            done['view_url'] = url_for('summarize.view_summary', summary_id=str(summary_id))
+        yield sse_event(done, event='done')
+    
+    return sse_response(generate())
 
 @summarize_bp.route('/history', methods=['GET'])
 def summary_history():
-    """Show history of summaries."""
-    summaries = get_summaries()
-    return render_template('summary_history.html', summaries=summaries)
+    """Show history of summaries, one keyset-paginated page at a time."""
+    try:
+        page = get_summaries_page(
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            limit=HISTORY_PAGE_SIZE
+        )
+    except ValueError:
+        flash('Invalid page link', 'warning')
+        return redirect(url_for('summarize.summary_history'))
+    
+    return render_template(
+        'summary_history.html',
+        summaries=page['items'],
+        next_cursor=page['next_cursor'],
+        prev_cursor=page['prev_cursor']
+    )
 
 @summarize_bp.route('/view/<summary_id>', methods=['GET'])
 def view_summary(summary_id):
@@ -122,6 +372,6 @@ def view_summary(summary_id):
         'view_summary.html', 
         summary=summary_doc['summary_content'], 
         filename=summary_doc['title'],
-        original_content=summary_doc['original_content'],
+        original_content=get_summary_content(summary_doc) or '',
         created_at=summary_doc['created_at']
     )
@@ -0,0 +1,342 @@
+"""Asyncio variant of GeminiClient for the ASGI serving path."""
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import aiohttp
+
+from config import (
+    GEMINI_API_BASE, GEMINI_MODEL, GEMINI_CONNECT_TIMEOUT, GEMINI_READ_TIMEOUT,
+    GEMINI_ASYNC_MAX_CONNECTIONS
+)
+from services.gemini_client import (
+    GeminiClient, STUDY_PACK_GENERATION_CONFIG, extract_text, make_text_response, get_gemini_client
+)
+from services.response_cache import ResponseCache, MemoryCacheBackend, make_cache_key
+from services.token_budget import TokenBudget
+from services.resilience import CircuitBreaker, RetryPolicy, TokenBucket
+from services.single_flight import AsyncSingleFlight, MongoLease
+from services.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Process-wide async client shared by the ASGI handlers
+_shared_async_client = None
+
+def create_async_http_session(max_connections: int = GEMINI_ASYNC_MAX_CONNECTIONS) -> aiohttp.ClientSession:
+    """Create a keep-alive aiohttp session with a bounded connection pool.
+    
+    Must be called from a running event loop.
+    
+    Args:
+        max_connections: Maximum concurrent connections; further requests wait for one
+    
+    Returns:
+        A configured aiohttp client session
+    """
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=max_connections, limit_per_host=max_connections),
+        timeout=aiohttp.ClientTimeout(total=None, connect=GEMINI_CONNECT_TIMEOUT, sock_read=GEMINI_READ_TIMEOUT),
+        headers={"Content-Type": "application/json"}
+    )
+
+def get_async_gemini_client() -> "AsyncGeminiClient":
+    """Get the process-wide AsyncGeminiClient, creating it on first use.
+    
+    It shares the response cache and cross-process lease of the
+    synchronous client, so generations made on either serving path are
+    reused by the other.
+    
+    Returns:
+        The shared AsyncGeminiClient instance
+    """
+    global _shared_async_client
+    if _shared_async_client is None:
+        sync_client = get_gemini_client()
+        _shared_async_client = AsyncGeminiClient(cache=sync_client.cache, lease=sync_client.lease)
+    return _shared_async_client
+
+async def close_async_gemini_client():
+    """Close the shared async client's connections, if it was created."""
+    global _shared_async_client
+    if _shared_async_client is not None:
+        await _shared_async_client.aclose()
+        _shared_async_client = None
+
+class AsyncGeminiClient(GeminiClient):
+    """Client for the Gemini API built on an asyncio HTTP client.
+    
+    Prompt construction and response parsing are inherited from
+    GeminiClient; the generation methods are coroutines (or async
+    generators for streaming) so one event loop can hold hundreds of
+    generations in flight without a thread per request.
+    """
+    
+    def __init__(self, http_session: Optional[aiohttp.ClientSession] = None, api_base: str = GEMINI_API_BASE,
+                 model: str = GEMINI_MODEL, cache: Optional[ResponseCache] = None,
+                 budget: Optional[TokenBudget] = None, retry_policy: Optional[RetryPolicy] = None,
+                 rate_limiter: Optional[TokenBucket] = None, circuit_breaker: Optional[CircuitBreaker] = None,
+                 lease: Optional[MongoLease] = None):
+        """Initialize the client.
+        
+        Args:
+            http_session: Optional aiohttp session; defaults to a pooled session
+                created on first use
+            api_base: Base URL of the Gemini REST API
+            model: Name of the Gemini model to call
+            cache: Optional response cache consulted before each API call
+            budget: Optional prompt size policy; defaults to the configured limits
+            retry_policy: Optional backoff policy; defaults to the configured retries
+            rate_limiter: Optional token bucket; defaults to the process-wide limiter
+            circuit_breaker: Optional breaker; defaults to the process-wide breaker
+            lease: Optional MongoDB lease for coalescing calls across processes
+        """
+        super().__init__(session=None, api_base=api_base, model=model, cache=cache, budget=budget,
+                         retry_policy=retry_policy, rate_limiter=rate_limiter, circuit_breaker=circuit_breaker,
+                         lease=lease)
+        self.session = None
+        self.http_session = http_session
+        # Lookups in the Mongo backend block, so they run on a worker thread
+        self._cache_blocks = cache is not None and not isinstance(cache.backend, MemoryCacheBackend)
+    
+    def _create_single_flight(self) -> AsyncSingleFlight:
+        return AsyncSingleFlight()
+    
+    def _get_http_session(self) -> aiohttp.ClientSession:
+        # aiohttp sessions belong to the loop they are created on
+        if self.http_session is None:
+            self.http_session = create_async_http_session()
+        return self.http_session
+    
+    async def aclose(self):
+        """Close the underlying HTTP connections."""
+        if self.http_session is not None:
+            await self.http_session.close()
+    
+    async def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self._cache_blocks:
+            return await asyncio.to_thread(self.cache.get, key)
+        return self.cache.get(key)
+    
+    async def _cache_set(self, key: str, response: Dict[str, Any]):
+        if self._cache_blocks:
+            await asyncio.to_thread(self.cache.set, key, response)
+        else:
+            self.cache.set(key, response)
+    
+    async def _post(self, url: str, params: Dict[str, str], payload: Dict[str, Any]) -> aiohttp.ClientResponse:
+        """POST to the Gemini API through the rate limiter, circuit breaker and retries.
+        
+        Follows the same policy as GeminiClient._post; waits are awaited
+        rather than slept.
+        
+        Returns:
+            The successful (200) response, with its body unread; use it as
+            an async context manager to release the connection
+        """
+        attempt = 0
+        while True:
+            wait = self._before_attempt()
+            if wait:
+                await asyncio.sleep(wait)
+            attempt += 1
+            try:
+                response = await self._get_http_session().post(url, params=params, json=payload)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # A read timeout already held the request for the whole timeout, so it is not retried
+                await asyncio.sleep(self._after_failure(attempt, e, retryable=not isinstance(e, aiohttp.SocketTimeoutError)))
+                continue
+            
+            if response.status == 200:
+                self.circuit_breaker.record_success()
+                return response
+            
+            async with response:
+                error = self._check_status(response.status, await response.text(), response.headers.get('Retry-After'))
+            await asyncio.sleep(self._after_failure(attempt, error, error.retry_after))
+    
+    async def _make_api_call(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+                             kind: str = 'generic') -> Dict[str, Any]:
+        """Make a request to the Gemini API, serving repeats from the response cache.
+        
+        Args:
+            prompt: The text prompt to send to the API
+            generation_config: Optional Gemini generation parameters
+            kind: The kind of call, used to group token usage
+        
+        Returns:
+            The JSON response from the API
+        
+        Raises:
+            Exception: If the API call fails
+        """
+        if not self.api_key:
+            raise ValueError("Gemini API key not configured. Please set the GEMINI_API_KEY environment variable.")
+        
+        cache_key = make_cache_key(prompt, self.model, generation_config)
+        if self.cache is not None:
+            cached = await self._cache_get(cache_key)
+            if cached is not None:
+                logger.debug("Response cache hit for %s", cache_key[:12])
+                return cached
+        
+        if self.single_flight is None:
+            return await self._fetch(prompt, generation_config, kind, cache_key)
+        return await self.single_flight.do(cache_key, lambda: self._fetch(prompt, generation_config, kind, cache_key))
+    
+    async def _fetch(self, prompt: str, generation_config: Optional[Dict[str, Any]], kind: str,
+                     cache_key: str) -> Dict[str, Any]:
+        """Call the API for a prompt and cache the response; see GeminiClient._fetch()."""
+        token = None
+        if self.lease is not None and self.cache is not None:
+            token = await asyncio.to_thread(self.lease.acquire, cache_key)
+            if token is None:
+                result = await self.lease.await_result(cache_key, lambda: self.cache.peek(cache_key))
+                if result is not None:
+                    return result
+                token = await asyncio.to_thread(self.lease.acquire, cache_key)
+        
+        try:
+            with timed('gemini_request'):
+                response = await self._post(
+                    self.api_url, {"key": self.api_key}, self._build_payload(prompt, generation_config)
+                )
+                async with response:
+                    result = await response.json(content_type=None)
+            
+            self._record_usage(kind, prompt, result)
+            if self.cache is not None:
+                await self._cache_set(cache_key, result)
+            return result
+        finally:
+            if token is not None:
+                await asyncio.to_thread(self.lease.release, cache_key, token)
+    
+    async def _stream_api_call(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+                               kind: str = 'generic') -> AsyncIterator[str]:
+        """Stream a generation from the Gemini API as server-sent events.
+        
+        Args:
+            prompt: The text prompt to send to the API
+            generation_config: Optional Gemini generation parameters
+            kind: The kind of call, used to group token usage
+        
+        Yields:
+            Pieces of generated text in order
+        
+        Raises:
+            Exception: If the API call fails
+        """
+        if not self.api_key:
+            raise ValueError("Gemini API key not configured. Please set the GEMINI_API_KEY environment variable.")
+        
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_cache_key(prompt, self.model, generation_config)
+            cached = await self._cache_get(cache_key)
+            if cached is not None:
+                yield extract_text(cached)
+                return
+        
+        pieces = []
+        usage_metadata = None
+        with timed('gemini_stream_open'):
+            response = await self._post(
+                self.stream_url, {"alt": "sse", "key": self.api_key}, self._build_payload(prompt, generation_config)
+            )
+        async with response:
+            # The body is read line by line as events arrive
+            async for raw_line in response.content:
+                line = raw_line.decode('utf-8').strip()
+                if not line.startswith('data:'):
+                    continue
+                event = json.loads(line[5:])
+                usage_metadata = event.get('usageMetadata', usage_metadata)
+                text = extract_text(event)
+                if text:
+                    pieces.append(text)
+                    yield text
+        
+        result = make_text_response(''.join(pieces))
+        if usage_metadata:
+            result['usageMetadata'] = usage_metadata
+        self._record_usage(kind, prompt, result)
+        if cache_key is not None and pieces:
+            await self._cache_set(cache_key, result)
+    
+    async def _generate_text(self, prompt: str, what: str, kind: str) -> str:
+        """Run a prompt and return its non-empty generated text."""
+        try:
+            text = extract_text(await self._make_api_call(prompt, kind=kind))
+            if not text:
+                raise ValueError(f"Received empty {what} from API")
+            return text
+        except Exception as e:
+            logger.error("Error generating %s: %s", what, e)
+            raise
+    
+    async def generate_summary(self, content: str) -> str:
+        """Generate a summary of the provided content, within the prompt budget."""
+        fitted = self._fit_summary_content(content)
+        if fitted is None:
+            return await self._summarize_in_chunks(content)
+        return await self._generate_text(self._build_summary_prompt(fitted), 'summary', 'summary')
+    
+    def stream_summary(self, content: str) -> AsyncIterator[str]:
+        """Stream a summary of the provided content as it is generated."""
+        fitted = self._fit_summary_content(content)
+        if fitted is None:
+            return self._stream_in_chunks(content)
+        return self._stream_api_call(self._build_summary_prompt(fitted), kind='summary')
+    
+    async def _summarize_in_chunks(self, content: str) -> str:
+        """Summarize over-budget content with the shared async map-reduce summarizer."""
+        from services.chunked_summarizer import get_async_chunked_summarizer
+        return await get_async_chunked_summarizer(self).summarize(content)
+    
+    async def _stream_in_chunks(self, content: str) -> AsyncIterator[str]:
+        yield await self._summarize_in_chunks(content)
+    
+    async def generate_combined_summary(self, partial_summaries: List[str]) -> str:
+        """Merge summaries of consecutive sections into one summary."""
+        prompt = self._build_combined_summary_prompt(partial_summaries)
+        return await self._generate_text(prompt, 'summary', 'combined_summary')
+    
+    async def generate_quiz(self, content: str, question_count: int = 5, difficulty: str = "medium") -> Dict[str, Any]:
+        """Generate a quiz based on the content, within the prompt budget."""
+        content = self.fit_content('quiz', content, self._build_quiz_prompt("", question_count, difficulty))
+        try:
+            response = await self._make_api_call(
+                self._build_quiz_prompt(content, question_count, difficulty), kind='quiz'
+            )
+            return self._parse_quiz_response(extract_text(response))
+        except Exception as e:
+            logger.error("Error generating quiz: %s", e)
+            raise
+    
+    async def generate_study_pack(self, content: str, question_count: int = 5, difficulty: str = "medium",
+                                  max_points: int = 5) -> Dict[str, Any]:
+        """Generate a summary, key points, categories and a quiz in one call."""
+        content = self.fit_content(
+            'study_pack', content, self._build_study_pack_prompt("", question_count, difficulty, max_points)
+        )
+        try:
+            response = await self._make_api_call(
+                self._build_study_pack_prompt(content, question_count, difficulty, max_points),
+                STUDY_PACK_GENERATION_CONFIG, kind='study_pack'
+            )
+            return self._parse_study_pack_response(extract_text(response), max_points)
+        except Exception as e:
+            logger.error("Error generating study pack: %s", e)
+            raise
+    
+    async def generate_explanation(self, topic: str, context: Optional[str] = None) -> str:
+        """Generate a detailed explanation of a topic, within the prompt budget."""
+        prompt = self._build_explanation_prompt(topic, self._fit_context(topic, context))
+        return await self._generate_text(prompt, 'explanation', 'explanation')
+    
+    def stream_explanation(self, topic: str, context: Optional[str] = None) -> AsyncIterator[str]:
+        """Stream a detailed explanation of a topic as it is generated."""
+        prompt = self._build_explanation_prompt(topic, self._fit_context(topic, context))
+        return self._stream_api_call(prompt, kind='explanation')
@@ -0,0 +1,203 @@
+"""Extraction and summarization of many uploaded files at once."""
+import logging
+import os
+import posixpath
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+
+from config import BATCH_MAX_FILES, BATCH_MAX_BYTES, BATCH_SUMMARY_CONCURRENCY, PDF_EXTRACT_WORKERS
+from services.file_processor import SEGMENT_READERS, cache_extraction, cached_extraction
+from services.pdf_extractor import get_extraction_pool
+from services.text_stream import ExtractedText
+from services.upload import SpooledUpload, UnsupportedFileError, spool_upload
+
+logger = logging.getLogger(__name__)
+
+class BatchItem:
+    """One document of a batch, spooled to disk.
+    
+    Attributes:
+        index: Position of the document in the batch
+        filename: Sanitized name, including its folder inside a zip
+        file_type: "txt", "pdf" or "docx"
+        path: Temporary file holding the document
+        digest: Hex SHA-256 of the document bytes
+        size: Size of the document in bytes
+    """
+    
+    __slots__ = ('index', 'filename', 'file_type', 'path', 'digest', 'size')
+    
+    def __init__(self, index: int, filename: str, file_type: str, path: str, digest: str, size: int):
+        self.index = index
+        self.filename = filename
+        self.file_type = file_type
+        self.path = path
+        self.digest = digest
+        self.size = size
+
+class BatchCollector:
+    """Spool the documents of a batch upload, expanding zip archives.
+    
+    Documents beyond the file or byte limits and unsupported files,
+    including zips inside a zip, are reported as skipped.
+    """
+    
+    def __init__(self, max_files: int = BATCH_MAX_FILES, max_bytes: int = BATCH_MAX_BYTES):
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.items: List[BatchItem] = []
+        self.skipped: List[Dict[str, Any]] = []
+        self.total_bytes = 0
+        self._position = 0
+    
+    def _skip(self, filename: str, reason: str):
+        self.skipped.append({'index': self._next_index(), 'filename': filename,
+                             'status': 'skipped', 'error': reason})
+    
+    def _next_index(self) -> int:
+        self._position += 1
+        return self._position - 1
+    
+    def _admit(self, filename: str, size: Optional[int] = None) -> bool:
+        """Return True if a document fits in the batch, or skip it and return False."""
+        if len(self.items) >= self.max_files:
+            self._skip(filename, f'Batch limit of {self.max_files} files reached')
+        elif size is not None and self.total_bytes + size > self.max_bytes:
+            self._skip(filename, f'Batch limit of {self.max_bytes // (1024 * 1024)} MB reached')
+        else:
+            return True
+        return False
+    
+    def _add(self, upload: SpooledUpload):
+        """Add a spooled document, taking over its temporary file."""
+        if upload.file_type not in SEGMENT_READERS:
+            upload.close()
+            self._skip(upload.filename, str(UnsupportedFileError(SEGMENT_READERS)))
+        elif self._admit(upload.filename, upload.size):
+            self.total_bytes += upload.size
+            self.items.append(BatchItem(self._next_index(), upload.filename, upload.file_type,
+                                        upload.path, upload.digest, upload.size))
+        else:
+            upload.close()
+    
+    def add_upload(self, upload: FileStorage):
+        """Add an uploaded document, or every supported document in an uploaded zip.
+        
+        Types are sniffed from the content, so a zip is expanded and a
+        document is read correctly whatever their names say.
+        """
+        if not secure_filename(upload.filename or ''):
+            return
+        spooled = spool_upload(upload.stream, upload.filename, allowed=None)
+        if spooled.file_type == 'zip':
+            with spooled:
+                self._add_zip(spooled)
+        else:
+            self._add(spooled)
+    
+    def _add_zip(self, archive_upload: SpooledUpload):
+        try:
+            archive = zipfile.ZipFile(archive_upload.path)
+        except zipfile.BadZipFile:
+            self._skip(archive_upload.filename, 'Not a valid zip archive')
+            return
+        with archive:
+            for info in archive.infolist():
+                name = info.filename
+                base = posixpath.basename(name)
+                if info.is_dir() or name.startswith('__MACOSX/') or base.startswith('.'):
+                    continue
+                # Keep the folder as part of the name so files from different folders stay apart
+                filename = secure_filename(name.replace('/', '_'))
+                # The declared size is enforced while reading, so it is safe to budget with
+                if not self._admit(filename, info.file_size):
+                    continue
+                with archive.open(info) as member:
+                    spooled = spool_upload(member, filename, allowed=None)
+                # Nested archives are not expanded
+                self._add(spooled)
+    
+    def cleanup(self):
+        """Delete the spooled files."""
+        remove_batch_items(self.items)
+
+def remove_batch_items(items: Iterable[BatchItem]):
+    """Delete the spool files of batch items."""
+    for item in items:
+        try:
+            os.unlink(item.path)
+        except FileNotFoundError:
+            pass
+
+def _extract_item(path: str, file_type: str) -> ExtractedText:
+    """Extract one document of a batch (runs in a pool worker)."""
+    with open(path, 'rb') as handle:
+        return ExtractedText.from_segments(SEGMENT_READERS[file_type](handle))
+
+def process_batch(items: List[BatchItem], summarize: Callable[[str], str],
+                  concurrency: int = BATCH_SUMMARY_CONCURRENCY,
+                  extract_workers: int = PDF_EXTRACT_WORKERS
+                  ) -> Iterator[Tuple[BatchItem, Optional[ExtractedText], Optional[str], Optional[str]]]:
+    """Extract and summarize documents, yielding each as soon as it is done.
+    
+    Documents are extracted on the shared extraction process pool, or
+    taken from the extraction cache, and each is summarized on a thread
+    pool as soon as its text is ready, so extraction and Gemini calls
+    overlap. Only a bounded number of documents is in flight at a time,
+    so memory does not grow with the size of the batch.
+    
+    Args:
+        items: The spooled documents
+        summarize: Function generating the summary of a text
+        concurrency: Maximum number of concurrent summary calls
+        extract_workers: Number of extraction workers to keep busy
+    
+    Yields:
+        (item, extracted text, summary, error) in completion order; the
+        error is None for a document that succeeded
+    """
+    pool = get_extraction_pool()
+    waiting = list(reversed(items))
+    extracting = {}
+    summarizing = {}
+    max_in_flight = extract_workers * 2 + concurrency
+    
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='batch-summary') as summary_pool:
+        def start_summary(item, extracted):
+            summarizing[summary_pool.submit(summarize, extracted.text)] = (item, extracted)
+        
+        while waiting or extracting or summarizing:
+            while waiting and len(extracting) + len(summarizing) < max_in_flight:
+                item = waiting.pop()
+                cached = cached_extraction(item.digest)
+                if cached is not None:
+                    start_summary(item, cached)
+                else:
+                    extracting[pool.submit(_extract_item, item.path, item.file_type)] = item
+            
+            done, _ = wait(list(extracting) + list(summarizing), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in extracting:
+                    item = extracting.pop(future)
+                    try:
+                        extracted = future.result()
+                    except Exception as e:
+                        logger.error("Error processing %s: %s", item.filename, e)
+                        yield item, None, None, str(e)
+                        continue
+                    if not extracted.text.strip():
+                        yield item, None, None, 'No text could be extracted from the file'
+                        continue
+                    cache_extraction(item.digest, extracted, item.filename, item.file_type, item.size)
+                    start_summary(item, extracted)
+                else:
+                    item, extracted = summarizing.pop(future)
+                    try:
+                        yield item, extracted, future.result(), None
+                    except Exception as e:
+                        logger.error("Error summarizing %s: %s", item.filename, e)
+                        yield item, extracted, None, f'Error generating summary: {e}'
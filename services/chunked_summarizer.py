@@ -0,0 +1,190 @@
+"""Map-reduce summarization for documents too large for a single prompt."""
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from flask import current_app, has_app_context
+
+from config import SUMMARY_CHUNK_TOKENS, SUMMARY_MAX_WORKERS
+from services.chunking import chunk_text, estimate_tokens
+from services.gemini_client import GeminiClient
+
+logger = logging.getLogger(__name__)
+
+class ChunkedSummarizer:
+    """Summarize large documents by summarizing chunks in parallel, then merging.
+    
+    The document is split on paragraph/page boundaries into chunks of at
+    most ``chunk_tokens`` estimated tokens. Chunks are summarized
+    concurrently on a bounded thread pool shared by every caller, and the
+    partial summaries are merged level by level until one summary remains.
+    """
+    
+    def __init__(self, gemini_client: GeminiClient, chunk_tokens: int = SUMMARY_CHUNK_TOKENS,
+                 max_workers: int = SUMMARY_MAX_WORKERS):
+        """Initialize the summarizer.
+        
+        Args:
+            gemini_client: Client used for the map and reduce calls
+            chunk_tokens: Token budget for each chunk and each reduce group
+            max_workers: Maximum concurrent Gemini calls across all callers
+        """
+        self.gemini_client = gemini_client
+        self.chunk_tokens = chunk_tokens
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='summarize')
+    
+    def summarize(self, text: str) -> str:
+        """Summarize text of any length.
+        
+        Args:
+            text: The document text
+            
+        Returns:
+            A single summary of the whole document
+        """
+        chunks = chunk_text(text, self.chunk_tokens)
+        if not chunks:
+            raise ValueError("No text to summarize")
+        if len(chunks) == 1:
+            return self.gemini_client.generate_summary(chunks[0])
+        
+        logger.info("Summarizing document in %s chunks", len(chunks))
+        summaries = self._map(self.gemini_client.generate_summary, chunks)
+        
+        # Reduce level by level until a single summary is left
+        level = 0
+        while len(summaries) > 1:
+            level += 1
+            groups = self._group(summaries)
+            logger.debug("Reduce level %s: %s summaries into %s groups", level, len(summaries), len(groups))
+            summaries = self._map(self._reduce_group, groups)
+        return summaries[0]
+    
+    def _reduce_group(self, group: List[str]) -> str:
+        if len(group) == 1:
+            return group[0]
+        return self.gemini_client.generate_combined_summary(group)
+    
+    def _group(self, summaries: List[str]) -> List[List[str]]:
+        """Pack consecutive summaries into groups within the token budget.
+        
+        Every group holds at least two summaries so each level shrinks.
+        """
+        groups = []
+        current = []
+        current_tokens = 0
+        for summary in summaries:
+            tokens = estimate_tokens(summary)
+            if len(current) >= 2 and current_tokens + tokens > self.chunk_tokens:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(summary)
+            current_tokens += tokens
+        if current:
+            groups.append(current)
+        return groups
+    
+    def _map(self, func: Callable, items: List) -> List[str]:
+        """Apply func to every item on the worker pool, preserving order."""
+        app = current_app._get_current_object() if has_app_context() else None
+        
+        def run(item):
+            # Keep the Flask app context so Mongo-backed caches work in workers
+            if app is None:
+                return func(item)
+            with app.app_context():
+                return func(item)
+        
+        return list(self.executor.map(run, items))
+
+class AsyncChunkedSummarizer(ChunkedSummarizer):
+    """Map-reduce summarizer for the asyncio serving path.
+    
+    Chunking and grouping are the same as ChunkedSummarizer; the map step
+    runs the chunk calls as concurrent coroutines, bounded by a semaphore
+    shared by every caller on the event loop.
+    """
+    
+    def __init__(self, gemini_client, chunk_tokens: int = SUMMARY_CHUNK_TOKENS,
+                 max_workers: int = SUMMARY_MAX_WORKERS):
+        """Initialize the summarizer.
+        
+        Args:
+            gemini_client: AsyncGeminiClient used for the map and reduce calls
+            chunk_tokens: Token budget for each chunk and each reduce group
+            max_workers: Maximum concurrent Gemini calls across all callers
+        """
+        self.gemini_client = gemini_client
+        self.chunk_tokens = chunk_tokens
+        self.semaphore = asyncio.Semaphore(max_workers)
+    
+    async def summarize(self, text: str) -> str:
+        """Summarize text of any length.
+        
+        Args:
+            text: The document text
+            
+        Returns:
+            A single summary of the whole document
+        """
+        chunks = chunk_text(text, self.chunk_tokens)
+        if not chunks:
+            raise ValueError("No text to summarize")
+        if len(chunks) == 1:
+            return await self.gemini_client.generate_summary(chunks[0])
+        
+        logger.info("Summarizing document in %s chunks", len(chunks))
+        summaries = await self._map(self.gemini_client.generate_summary, chunks)
+        while len(summaries) > 1:
+            summaries = await self._map(self._reduce_group, self._group(summaries))
+        return summaries[0]
+    
+    async def _reduce_group(self, group: List[str]) -> str:
+        if len(group) == 1:
+            return group[0]
+        return await self.gemini_client.generate_combined_summary(group)
+    
+    async def _map(self, func: Callable, items: List) -> List[str]:
+        """Await func for every item concurrently, preserving order."""
+        async def run(item):
+            async with self.semaphore:
+                return await func(item)
+        
+        return list(await asyncio.gather(*(run(item) for item in items)))
+
+_shared_summarizer: Optional[ChunkedSummarizer] = None
+_summarizer_lock = threading.Lock()
+
+def get_chunked_summarizer(gemini_client: GeminiClient) -> ChunkedSummarizer:
+    """Get the process-wide ChunkedSummarizer so the worker bound is global.
+    
+    Args:
+        gemini_client: Client to use if the summarizer has not been created yet
+        
+    Returns:
+        The shared ChunkedSummarizer
+    """
+    global _shared_summarizer
+    if _shared_summarizer is None:
+        with _summarizer_lock:
+            if _shared_summarizer is None:
+                _shared_summarizer = ChunkedSummarizer(gemini_client)
+    return _shared_summarizer
+
+_shared_async_summarizer: Optional[AsyncChunkedSummarizer] = None
+
+def get_async_chunked_summarizer(gemini_client) -> AsyncChunkedSummarizer:
+    """Get the process-wide AsyncChunkedSummarizer so the concurrency bound is global.
+    
+    Args:
+        gemini_client: AsyncGeminiClient to use if the summarizer has not been created yet
+        
+    Returns:
+        The shared AsyncChunkedSummarizer
+    """
+    global _shared_async_summarizer
+    if _shared_async_summarizer is None:
+        _shared_async_summarizer = AsyncChunkedSummarizer(gemini_client)
+    return _shared_async_summarizer
@@ -0,0 +1,137 @@
+"""Helpers for splitting extracted documents into token-budgeted chunks."""
+import re
+from typing import Iterable, Iterator, List
+
+# Rough characters-per-token ratio for English prose with Gemini's tokenizer
+CHARS_PER_TOKEN = 4
+
+# Blank lines separate paragraphs; PDF pages are joined with blank lines and
+# some extractors emit form feeds between pages
+_PARAGRAPH_RE = re.compile(r'(?:\n[ \t]*){2,}|\f')
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a piece of text.
+    
+    Args:
+        text: The text to measure
+    
+    Returns:
+        The approximate token count
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def split_paragraphs(text: str) -> List[str]:
+    """Split text on paragraph and page boundaries, dropping empty pieces."""
+    return [p.strip() for p in _PARAGRAPH_RE.split(text) if p.strip()]
+
+def _split_oversized(paragraph: str, max_tokens: int) -> Iterable[str]:
+    """Break a paragraph that exceeds the budget on sentence, then word, boundaries."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    units = []
+    for sentence in _SENTENCE_RE.split(paragraph):
+        if len(sentence) > max_chars:
+            # No usable sentence boundary, fall back to word boundaries
+            units.extend(sentence.split())
+        else:
+            units.append(sentence)
+    
+    current = []
+    current_len = 0
+    for unit in units:
+        if current and current_len + len(unit) + 1 > max_chars:
+            yield " ".join(current)
+            current, current_len = [], 0
+        current.append(unit)
+        current_len += len(unit) + 1
+    if current:
+        yield " ".join(current)
+
+def _trailing_whitespace(text: str) -> str:
+    return text[len(text.rstrip()):]
+
+def _leading_whitespace(text: str) -> str:
+    return text[:len(text) - len(text.lstrip())]
+
+def iter_paragraphs(pieces: Iterable[str]) -> Iterator[str]:
+    """Yield the paragraphs of a text that arrives in consecutive pieces.
+    
+    Gives the same paragraphs as split_paragraphs() on the joined text,
+    including breaks that straddle two pieces, while holding only the
+    paragraph being read.
+    
+    Args:
+        pieces: Consecutive parts of the text, e.g. extracted segments
+    
+    Yields:
+        Each non-empty paragraph, stripped
+    """
+    current: List[str] = []
+    # Whitespace at the end of the paragraph being read, which a break may continue
+    tail = ''
+    
+    def flush():
+        paragraph = ''.join(current).strip()
+        current.clear()
+        return paragraph
+    
+    for piece in pieces:
+        parts = _PARAGRAPH_RE.split(piece)
+        if current and _PARAGRAPH_RE.search(tail + _leading_whitespace(parts[0])):
+            paragraph = flush()
+            if paragraph:
+                yield paragraph
+        for index, part in enumerate(parts):
+            if index:
+                paragraph = flush()
+                if paragraph:
+                    yield paragraph
+            current.append(part)
+        last = parts[-1]
+        tail = tail + last if not last.strip() and len(parts) == 1 else _trailing_whitespace(last)
+    
+    paragraph = flush()
+    if paragraph:
+        yield paragraph
+
+def iter_chunks(pieces: Iterable[str], max_tokens: int) -> Iterator[str]:
+    """Pack paragraphs into chunks that each fit within a token budget.
+    
+    Paragraph boundaries are preserved wherever possible; only paragraphs
+    larger than the budget are split internally. Chunks are yielded as
+    soon as they are full, so a document can be chunked as it is
+    extracted.
+    
+    Args:
+        pieces: Consecutive parts of the document text
+        max_tokens: Maximum estimated tokens per chunk
+    
+    Yields:
+        Chunk strings in document order
+    """
+    current = []
+    current_tokens = 0
+    for paragraph in iter_paragraphs(pieces):
+        tokens = estimate_tokens(paragraph)
+        parts = [paragraph] if tokens <= max_tokens else list(_split_oversized(paragraph, max_tokens))
+        for part in parts:
+            part_tokens = estimate_tokens(part)
+            if current and current_tokens + part_tokens > max_tokens:
+                yield "\n\n".join(current)
+                current, current_tokens = [], 0
+            current.append(part)
+            current_tokens += part_tokens
+    if current:
+        yield "\n\n".join(current)
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """Pack the paragraphs of a text into token-budgeted chunks; see iter_chunks().
+    
+    Args:
+        text: The document text
+        max_tokens: Maximum estimated tokens per chunk
+    
+    Returns:
+        A list of chunk strings in document order
+    """
+    return list(iter_chunks([text], max_tokens))
@@ -0,0 +1,186 @@
+"""Server-side storage for large values referenced from the Flask session.
+
+The signed-cookie session only holds a short reference ID; the document
+text, summaries and quiz data themselves live in this store.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from flask import session
+
+from config import CONTENT_STORE_BACKEND, CONTENT_STORE_DIR, CONTENT_STORE_TTL
+
+logger = logging.getLogger(__name__)
+
+# Expired files are swept from the disk store once every this many writes
+_SWEEP_INTERVAL = 100
+
+class DiskContentBackend:
+    """Store values as compressed files in a local directory."""
+    
+    def __init__(self, directory: str = CONTENT_STORE_DIR):
+        self.directory = directory
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+    
+    def _path(self, ref_id: str) -> str:
+        return os.path.join(self.directory, f"{ref_id}.z")
+    
+    def get(self, ref_id: str, ttl: int) -> Optional[bytes]:
+        """Return the stored bytes, or None if missing or older than ttl."""
+        path = self._path(ref_id)
+        try:
+            if os.path.getmtime(path) + ttl < time.time():
+                return None
+            with open(path, 'rb') as handle:
+                return handle.read()
+        except FileNotFoundError:
+            return None
+    
+    def put(self, ref_id: str, data: bytes, ttl: int):
+        """Write bytes under ref_id, refreshing the expiry of an existing entry."""
+        path = self._path(ref_id)
+        if os.path.exists(path):
+            os.utime(path)
+        else:
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as handle:
+                handle.write(data)
+            os.replace(tmp_path, path)
+        
+        with self._lock:
+            self._writes += 1
+            sweep = self._writes % _SWEEP_INTERVAL == 0
+        if sweep:
+            self._sweep(ttl)
+    
+    def _sweep(self, ttl: int):
+        cutoff = time.time() - ttl
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+
+class MongoContentBackend:
+    """Store values in the ``session_content`` MongoDB collection.
+    
+    Expired documents are removed by a TTL index on ``expires_at``.
+    """
+    
+    collection_name = 'session_content'
+    
+    def __init__(self):
+        self._index_ready = False
+    
+    def _collection(self):
+        from models import mongo
+        collection = mongo.db[self.collection_name]
+        if not self._index_ready:
+            collection.create_index('expires_at', expireAfterSeconds=0)
+            self._index_ready = True
+        return collection
+    
+    def get(self, ref_id: str, ttl: int) -> Optional[bytes]:
+        """Return the stored bytes, or None if missing or expired."""
+        doc = self._collection().find_one(
+            {'_id': ref_id, 'expires_at': {'$gt': datetime.utcnow()}},
+            {'data': 1}
+        )
+        return bytes(doc['data']) if doc else None
+    
+    def put(self, ref_id: str, data: bytes, ttl: int):
+        """Write bytes under ref_id, refreshing the expiry of an existing entry."""
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl)
+        self._collection().update_one(
+            {'_id': ref_id},
+            {'$set': {'expires_at': expires_at}, '$setOnInsert': {'data': data}},
+            upsert=True
+        )
+
+class ContentStore:
+    """Content-addressed store for JSON-serializable values with a TTL."""
+    
+    def __init__(self, backend, ttl: int = CONTENT_STORE_TTL):
+        """Initialize the store.
+        
+        Args:
+            backend: Storage backend implementing get/put
+            ttl: Seconds a value stays available after it was last stored
+        """
+        self.backend = backend
+        self.ttl = ttl
+    
+    def put(self, value: Any) -> Optional[str]:
+        """Store a value and return its reference ID.
+        
+        Args:
+            value: A JSON-serializable value
+            
+        Returns:
+            The reference ID, or None if the value could not be stored
+        """
+        raw = json.dumps(value).encode('utf-8')
+        ref_id = hashlib.sha256(raw).hexdigest()
+        try:
+            self.backend.put(ref_id, zlib.compress(raw), self.ttl)
+            return ref_id
+        except Exception as e:
+            logger.error("Failed to store session content: %s", e)
+            return None
+    
+    def get(self, ref_id: str) -> Any:
+        """Load a value by reference ID.
+        
+        Returns:
+            The stored value, or None if it is missing or has expired
+        """
+        try:
+            data = self.backend.get(ref_id, self.ttl)
+            return json.loads(zlib.decompress(data)) if data is not None else None
+        except Exception as e:
+            logger.error("Failed to load session content: %s", e)
+            return None
+
+def _create_content_store() -> ContentStore:
+    if CONTENT_STORE_BACKEND == 'mongo':
+        return ContentStore(MongoContentBackend())
+    if CONTENT_STORE_BACKEND != 'disk':
+        logger.warning("Unknown CONTENT_STORE_BACKEND '%s', using disk", CONTENT_STORE_BACKEND)
+    return ContentStore(DiskContentBackend())
+
+content_store = _create_content_store()
+
+def remember(key: str, value: Any):
+    """Keep a large value for this session, storing only its ID in the cookie.
+    
+    Args:
+        key: Session key, e.g. "last_content"
+        value: A JSON-serializable value
+    """
+    ref_id = content_store.put(value)
+    if ref_id:
+        session[f'{key}_ref'] = ref_id
+    else:
+        session.pop(f'{key}_ref', None)
+
+def recall(key: str) -> Any:
+    """Load a value previously kept with remember().
+    
+    Returns:
+        The value, or None if nothing was kept or it has expired
+    """
+    ref_id = session.get(f'{key}_ref')
+    if not ref_id:
+        return None
+    return content_store.get(ref_id)
@@ -0,0 +1,101 @@
+"""Streaming DOCX text extraction that iterparses word/document.xml."""
+import logging
+import zipfile
+from typing import BinaryIO, Iterator, List, Union
+from xml.etree.ElementTree import iterparse
+
+logger = logging.getLogger(__name__)
+
+# Separator placed between paragraphs and table cells in the joined text
+BLOCK_SEPARATOR = "\n\n"
+
+DOCUMENT_PART = "word/document.xml"
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_BODY = _W + "body"
+_PARAGRAPH = _W + "p"
+_CELL = _W + "tc"
+_TEXT = _W + "t"
+# Run content rendered as whitespace
+_WHITESPACE = {_W + "tab": "\t", _W + "br": "\n", _W + "cr": "\n"}
+
+def _paragraph_text(paragraph) -> str:
+    """Join the text runs, tabs and breaks of a paragraph element."""
+    parts = []
+    for element in paragraph.iter():
+        if element.tag == _TEXT:
+            parts.append(element.text or "")
+        elif element.tag in _WHITESPACE:
+            parts.append(_WHITESPACE[element.tag])
+    return "".join(parts)
+
+def iter_docx_blocks(file: Union[str, BinaryIO]) -> Iterator[str]:
+    """Yield the text of a DOCX body in document order.
+    
+    Body paragraphs are yielded one by one; each table cell is yielded as
+    the newline-joined text of its paragraphs. Empty blocks are skipped.
+    The document part is decompressed and parsed incrementally, and
+    every element is discarded once its text has been read, so memory
+    stays flat however long the document is.
+    
+    Args:
+        file: Path or seekable binary file of the DOCX
+    
+    Yields:
+        The text of each paragraph or table cell
+    
+    Raises:
+        ValueError: If the file is not a DOCX package
+    """
+    try:
+        package = zipfile.ZipFile(file)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Not a DOCX file: {e}")
+    
+    with package, package.open(DOCUMENT_PART) as part:
+        body = None
+        body_depth = depth = 0
+        # Paragraph texts of the table cells being read, innermost last
+        cells: List[List[str]] = []
+        for event, element in iterparse(part, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if element.tag == _BODY:
+                    body, body_depth = element, depth
+                elif element.tag == _CELL:
+                    if cells and cells[-1]:
+                        # A nested table: emit the outer cell's text so far to keep document order
+                        yield "\n".join(cells[-1])
+                        cells[-1] = []
+                    cells.append([])
+                continue
+            
+            depth -= 1
+            if element.tag == _PARAGRAPH:
+                text = _paragraph_text(element)
+                # Clearing also keeps a text box's paragraphs out of the paragraph around it
+                element.clear()
+                if text.strip():
+                    if cells:
+                        cells[-1].append(text)
+                    else:
+                        yield text
+            elif element.tag == _CELL:
+                text = "\n".join(cells.pop())
+                if text.strip():
+                    yield text
+            
+            if depth == body_depth and body is not None:
+                # A top-level paragraph or table is done with; drop it from the tree
+                body.remove(element)
+
+def extract_docx(file: Union[str, BinaryIO]) -> str:
+    """Extract the text of a DOCX, paragraphs and table cells included.
+    
+    Args:
+        file: Path or seekable binary file of the DOCX
+    
+    Returns:
+        The blocks from iter_docx_blocks() joined with BLOCK_SEPARATOR
+    """
+    return BLOCK_SEPARATOR.join(iter_docx_blocks(file))
@@ -0,0 +1,159 @@
+"""Persistent cache of extracted document text keyed by upload content hash."""
+import json
+import logging
+import os
+import threading
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from config import EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+_COMPRESSION_LEVEL = 6
+
+class ExtractionCache:
+    """Disk cache mapping a SHA-256 of uploaded bytes to its extracted text.
+    
+    Each entry is one file holding a JSON metadata line followed by the
+    zlib-compressed text. Files are written atomically, so several worker
+    processes can share one directory. When the directory grows past
+    ``max_bytes`` the least recently used entries are removed; hits refresh
+    an entry's modification time.
+    """
+    
+    def __init__(self, directory: str = EXTRACTION_CACHE_DIR, max_bytes: int = EXTRACTION_CACHE_MAX_BYTES):
+        """Initialize the cache.
+        
+        Args:
+            directory: Directory holding the cache files
+            max_bytes: Maximum total size of the cache files
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._ready = False
+    
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}.zt")
+    
+    def _ensure_dir(self):
+        if not self._ready:
+            os.makedirs(self.directory, exist_ok=True)
+            self._ready = True
+    
+    def get(self, digest: str) -> Optional[str]:
+        """Return the cached text for an upload hash, or None on a miss.
+        
+        Args:
+            digest: Hex SHA-256 of the uploaded bytes
+        
+        Returns:
+            The extracted text or None
+        """
+        entry = self.get_entry(digest)
+        return entry[0] if entry is not None else None
+    
+    def get_entry(self, digest: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Return the cached text and its metadata for an upload hash, or None on a miss."""
+        path = self._path(digest)
+        try:
+            with open(path, 'rb') as handle:
+                metadata = json.loads(handle.readline())
+                text = zlib.decompress(handle.read()).decode('utf-8')
+            os.utime(path)
+            entry = (text, metadata)
+        except FileNotFoundError:
+            entry = None
+        except Exception as e:
+            logger.warning("Discarding unreadable extraction cache entry %s: %s", digest[:12], e)
+            entry = None
+        
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+    
+    def put(self, digest: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+        """Store extracted text and file metadata for an upload hash.
+        
+        Args:
+            digest: Hex SHA-256 of the uploaded bytes
+            text: The extracted text
+            metadata: Optional file metadata such as name, type and size
+        """
+        record = dict(metadata or {})
+        record.update({
+            'sha256': digest,
+            'char_count': len(text),
+            'cached_at': datetime.utcnow().isoformat()
+        })
+        try:
+            self._ensure_dir()
+            path = self._path(digest)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as handle:
+                handle.write(json.dumps(record).encode('utf-8') + b"\n")
+                handle.write(zlib.compress(text.encode('utf-8'), _COMPRESSION_LEVEL))
+            os.replace(tmp_path, path)
+            with self._lock:
+                self.stores += 1
+            self._evict()
+        except Exception as e:
+            logger.warning("Failed to store extraction cache entry: %s", e)
+    
+    def metadata(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Return the stored metadata for an upload hash, or None."""
+        try:
+            with open(self._path(digest), 'rb') as handle:
+                return json.loads(handle.readline())
+        except Exception:
+            return None
+    
+    def _evict(self):
+        """Remove least recently used entries until the cache fits its budget."""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if not entry.name.endswith('.zt'):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            with self._lock:
+                self.evictions += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the hit rate."""
+        with self._lock:
+            stats = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'evictions': self.evictions
+            }
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / total if total else 0.0
+        return stats
+
+extraction_cache = ExtractionCache()
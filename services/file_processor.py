@@ -1,134 +1,219 @@
+import codecs
 import logging
-import io
 from werkzeug.datastructures import FileStorage
-from typing import Union
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
+from services.pdf_extractor import PAGE_SEPARATOR, iter_pdf_pages
+from services.docx_extractor import BLOCK_SEPARATOR, iter_docx_blocks
+from services.extraction_cache import extraction_cache
+from services.text_stream import ExtractedText, TextSegment, build_preview
+from services.upload import SpooledUpload, UnsupportedFileError, spool_upload
+from services.metrics import timed
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
-def process_file_content(file: FileStorage) -> str:
-    """Process uploaded file and extract its text content.
+# Plain-text uploads are decoded and emitted in blocks of this many bytes
+_TEXT_BLOCK_SIZE = 64 * 1024
+
+def cached_extraction(digest: str) -> Optional[ExtractedText]:
+    """Return the cached extraction of an upload hash, statistics included, or None."""
+    entry = extraction_cache.get_entry(digest)
+    if entry is None:
+        return None
+    text, metadata = entry
+    if 'word_count' not in metadata:
+        # Entries written before the statistics were cached
+        return ExtractedText.from_text(text)
+    return ExtractedText(text, metadata['word_count'], metadata['text_sha256'])
+
+def cache_extraction(digest: str, extracted: ExtractedText, filename: str, file_type: str, size: int):
+    """Store an extraction and its statistics in the extraction cache."""
+    extraction_cache.put(digest, extracted.text, {
+        'filename': filename,
+        'file_type': file_type,
+        'size': size,
+        'word_count': extracted.word_count,
+        'text_sha256': extracted.sha256
+    })
+
+@timed('file_parse')
+def _extract_upload(upload: SpooledUpload) -> ExtractedText:
+    """Extract a spooled upload, using the extraction cache.
+    
+    If the same bytes were extracted before, the cached text and its
+    statistics are used without parsing the file again. Otherwise the
+    file's segments are read once, feeding every statistic as they arrive.
+    """
+    extracted = cached_extraction(upload.digest)
+    if extracted is not None:
+        logger.debug("Extraction cache hit for %s", upload.filename)
+        return extracted
+    
+    with open(upload.path, 'rb') as spooled:
+        extracted = ExtractedText.from_segments(SEGMENT_READERS[upload.file_type](spooled))
+    
+    cache_extraction(upload.digest, extracted, upload.filename, upload.file_type, upload.size)
+    return extracted
+
+def extract_file(file: FileStorage) -> ExtractedText:
+    """Extract the text of an uploaded file along with its word count and hash.
+    
+    The upload is spooled to disk and hashed in a single pass, and its type
+    is sniffed from its content.
     
     Args:
         file: The uploaded file object
-        
+    
     Returns:
-        The extracted text content
-        
+        The extracted text and its statistics
+    
     Raises:
         ValueError: If the file type is not supported or processing fails
     """
-    filename = file.filename.lower()
-    
-    if filename.endswith('.txt'):
-        return _process_txt_file(file)
-    elif filename.endswith('.pdf'):
-        return _process_pdf_file(file)
-    elif filename.endswith('.docx'):
-        return _process_docx_file(file)
-    else:
-        raise ValueError(f"Unsupported file type: {filename}")
+    with spool_upload(file.stream, file.filename) as upload:
+        return _extract_upload(upload)
 
-def _process_txt_file(file: FileStorage) -> str:
-    """Process a text file and return its content.
+def process_upload(file: FileStorage) -> Tuple[ExtractedText, str, str]:
+    """Ingest an uploaded document; the single upload path for the blueprints.
     
     Args:
-        file: The uploaded text file
-        
+        file: The uploaded file object
+    
     Returns:
-        The text content
+        An (extracted text, sanitized filename, file type) tuple, the type
+        being sniffed from the file's content rather than taken from its name
+    
+    Raises:
+        ValueError: With a message for the user if the file type is not
+            supported or the file cannot be processed
     """
     try:
-        content = file.read().decode('utf-8')
-        return content
-    except UnicodeDecodeError:
-        try:
-            # Try another common encoding if utf-8 fails
-            file.seek(0)
-            content = file.read().decode('latin-1')
-            return content
-        except Exception as e:
-            logger.error(f"Error decoding text file: {str(e)}")
-            raise ValueError(f"Could not decode text file: {str(e)}")
+        with spool_upload(file.stream, file.filename) as upload:
+            return _extract_upload(upload), upload.filename, upload.file_type
+    except UnsupportedFileError:
+        raise
+    except Exception as e:
+        logger.error("Error processing file: %s", e)
+        raise ValueError(f'Error processing file: {str(e)}')
 
-def _process_pdf_file(file: FileStorage) -> str:
-    """Process a PDF file and extract its text content.
+def process_file_content(file: FileStorage) -> str:
+    """Process uploaded file and extract its text content.
     
     Args:
-        file: The uploaded PDF file
-        
+        file: The uploaded file object
+    
     Returns:
         The extracted text content
+    
+    Raises:
+        ValueError: If the file type is not supported or processing fails
+    """
+    return extract_file(file).text
+
+def _detect_text_encoding(file: BinaryIO) -> str:
+    """Return 'utf-8' if the whole file is valid UTF-8, else 'latin-1'.
+    
+    The file is validated in blocks without keeping the decoded text, then
+    rewound.
     """
+    decoder = codecs.getincrementaldecoder('utf-8')()
     try:
-        # Import PyPDF2 here to avoid dependency issues if it's not installed
-        import PyPDF2
-        
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file.read()))
-        text = ""
-        
-        # Extract text from each page
-        for page_num in range(len(pdf_reader.pages)):
-            page = pdf_reader.pages[page_num]
-            text += page.extract_text() + "\n\n"
+        while True:
+            block = file.read(_TEXT_BLOCK_SIZE)
+            decoder.decode(block, final=not block)
+            if not block:
+                return 'utf-8'
+    except UnicodeDecodeError:
+        # Try another common encoding if utf-8 fails
+        return 'latin-1'
+    finally:
+        file.seek(0)
+
+def _iter_txt_segments(file: BinaryIO) -> Iterator[TextSegment]:
+    """Decode a text file block by block.
+    
+    Args:
+        file: The spooled text file
+    
+    Yields:
+        Segments of decoded text
+    """
+    decoder = codecs.getincrementaldecoder(_detect_text_encoding(file))()
+    while True:
+        block = file.read(_TEXT_BLOCK_SIZE)
+        text = decoder.decode(block, final=not block)
+        if text:
+            yield TextSegment(text)
+        if not block:
+            return
+
+def _iter_pdf_segments(file: BinaryIO) -> Iterator[TextSegment]:
+    """Extract a PDF's text page by page.
+    
+    Pages arrive from services.pdf_extractor as each batch of the
+    page-parallel extraction finishes, so the document is never held as
+    a list of pages as well as the consumer's copy.
+    
+    Args:
+        file: The spooled PDF file, opened from disk
+    
+    Yields:
+        One segment per page, ending in the page separator
+    """
+    try:
+        has_text = False
+        for number, page in enumerate(iter_pdf_pages(file.name), start=1):
+            has_text = has_text or bool(page.strip())
+            yield TextSegment(page + PAGE_SEPARATOR, page=number)
         
-        if not text.strip():
+        if not has_text:
             logger.warning("PDF text extraction returned empty result")
             raise ValueError("Could not extract text from PDF - it may be scanned or image-based")
-            
-        return text
     
     except ImportError:
         logger.error("PyPDF2 library not available")
         raise ValueError("PDF processing is not available - PyPDF2 library is required")
     except Exception as e:
-        logger.error(f"Error processing PDF file: {str(e)}")
+        logger.error("Error processing PDF file: %s", e)
         raise ValueError(f"Error processing PDF file: {str(e)}")
 
-def _process_docx_file(file: FileStorage) -> str:
-    """Process a DOCX file and extract its text content.
+def _iter_docx_segments(file: BinaryIO) -> Iterator[TextSegment]:
+    """Stream a DOCX's paragraphs and table cells through services.docx_extractor.
     
     Args:
-        file: The uploaded DOCX file
-        
-    Returns:
-        The extracted text content
+        file: The spooled DOCX file
+    
+    Yields:
+        One segment per paragraph or table cell, after the first each
+        starting with the block separator
     """
     try:
-        # Import docx here to avoid dependency issues if it's not installed
-        import docx
+        index = -1
+        for index, block in enumerate(iter_docx_blocks(file)):
+            yield TextSegment(block if index == 0 else BLOCK_SEPARATOR + block, section=index)
         
-        doc = docx.Document(io.BytesIO(file.read()))
-        text = "\n\n".join([paragraph.text for paragraph in doc.paragraphs])
-        
-        if not text.strip():
+        if index < 0:
             logger.warning("DOCX text extraction returned empty result")
             raise ValueError("Could not extract text from DOCX - it may be corrupted or empty")
-            
-        return text
     
-    except ImportError:
-        logger.error("python-docx library not available")
-        raise ValueError("DOCX processing is not available - python-docx library is required")
     except Exception as e:
-        logger.error(f"Error processing DOCX file: {str(e)}")
+        logger.error("Error processing DOCX file: %s", e)
         raise ValueError(f"Error processing DOCX file: {str(e)}")
 
+SEGMENT_READERS = {
+    'txt': _iter_txt_segments,
+    'pdf': _iter_pdf_segments,
+    'docx': _iter_docx_segments
+}
+
 def get_file_content_summary(content: str, max_length: int = 200) -> str:
     """Get a short summary of file content for display purposes.
     
     Args:
         content: The full content text
         max_length: Maximum length of the summary
-        
+    
     Returns:
         A truncated summary of the content
     """
-    # Remove excess whitespace
-    content = " ".join(content.split())
-    
-    if len(content) <= max_length:
-        return content
-    
-    # Truncate and add ellipsis
-    return content[:max_length - 3] + "..."
+    return build_preview(content, max_length)
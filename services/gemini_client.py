@@ -1,38 +1,257 @@
-from config import GEMINI_API_KEY
+from config import (
+    GEMINI_API_KEY, GEMINI_MODEL, GEMINI_API_BASE, GEMINI_COALESCE_BACKEND,
+    GEMINI_POOL_SIZE, GEMINI_CONNECT_TIMEOUT, GEMINI_READ_TIMEOUT, SUMMARY_CHUNK_TOKENS
+)
 import json
 import logging
+import threading
+import time
 import requests
-from typing import Dict, List, Any, Optional
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterator, List, Any, Optional
+from services.response_cache import ResponseCache, create_response_cache, make_cache_key
+from services.chunking import estimate_tokens
+from services.token_budget import TokenBudget, TokenUsage, truncate_to_tokens, usage_from_response
+from services.resilience import (
+    CircuitBreaker, GeminiAPIError, RateLimitExceededError, RetryPolicy, TokenBucket, gemini_circuit_breaker, gemini_rate_limiter,
+    parse_retry_after
+)
+from services.single_flight import MongoLease, SingleFlight, create_lease
+from services.metrics import timed
 
 logger = logging.getLogger(__name__)
 
+# Process-wide HTTP session shared by every GeminiClient
+_shared_session = None
+_session_lock = threading.Lock()
+
+# Process-wide client shared by the blueprints
+_shared_client = None
+_client_lock = threading.Lock()
+
+def create_session(pool_size: int = GEMINI_POOL_SIZE) -> requests.Session:
+    """Create a keep-alive HTTP session backed by a bounded connection pool.
+    
+    Args:
+        pool_size: Maximum number of connections kept open per host
+    
+    Returns:
+        A configured requests session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Content-Type": "application/json",
+        "Connection": "keep-alive"
+    })
+    return session
+
+def get_shared_session() -> requests.Session:
+    """Get the process-wide pooled session, creating it on first use.
+    
+    The underlying urllib3 pool is thread-safe, so one session can serve
+    every request thread in the process.
+    
+    Returns:
+        The shared requests session
+    """
+    global _shared_session
+    if _shared_session is None:
+        with _session_lock:
+            if _shared_session is None:
+                _shared_session = create_session()
+    return _shared_session
+
+def get_gemini_client() -> "GeminiClient":
+    """Get the process-wide GeminiClient used by the route blueprints.
+    
+    Returns:
+        The shared GeminiClient instance
+    """
+    global _shared_client
+    if _shared_client is None:
+        with _client_lock:
+            if _shared_client is None:
+                _shared_client = GeminiClient(cache=create_response_cache(), lease=create_lease())
+    return _shared_client
+
+def extract_text(response: Dict[str, Any]) -> str:
+    """Extract the generated text from a Gemini response or stream event.
+    
+    Args:
+        response: A generateContent response or one streamed event
+    
+    Returns:
+        The concatenated text parts of the first candidate
+    """
+    candidates = response.get('candidates') or [{}]
+    parts = candidates[0].get('content', {}).get('parts') or []
+    return ''.join(part.get('text', '') for part in parts)
+
+def make_text_response(text: str) -> Dict[str, Any]:
+    """Build a generateContent-shaped response holding the given text."""
+    return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+
+def extract_json(response_text: str) -> Any:
+    """Parse JSON from generated text, tolerating a surrounding markdown code block.
+    
+    Raises:
+        ValueError: If the text is empty or does not hold valid JSON
+    """
+    if not response_text:
+        raise ValueError("Received empty response from API")
+    
+    # Sometimes the API includes markdown code blocks, so we need to handle that
+    if "```json" in response_text:
+        json_text = response_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in response_text:
+        json_text = response_text.split("```")[1].strip()
+    else:
+        json_text = response_text
+    
+    return json.loads(json_text)
+
+# Structured-output schema for study packs, in Gemini's OpenAPI subset
+STUDY_PACK_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "summary": {"type": "STRING"},
+        "key_points": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "categories": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "title": {"type": "STRING"},
+                    "summary": {"type": "STRING"},
+                    "key_points": {"type": "ARRAY", "items": {"type": "STRING"}}
+                },
+                "required": ["title", "summary", "key_points"]
+            }
+        },
+        "quiz": {
+            "type": "OBJECT",
+            "properties": {
+                "questions": {
+                    "type": "ARRAY",
+                    "items": {
+                        "type": "OBJECT",
+                        "properties": {
+                            "question": {"type": "STRING"},
+                            "options": {"type": "ARRAY", "items": {"type": "STRING"}},
+                            "correct_answer": {"type": "STRING"},
+                            "explanation": {"type": "STRING"}
+                        },
+                        "required": ["question", "options", "correct_answer", "explanation"]
+                    }
+                }
+            },
+            "required": ["questions"]
+        }
+    },
+    "required": ["summary", "key_points", "categories", "quiz"]
+}
+
+STUDY_PACK_GENERATION_CONFIG = {
+    "responseMimeType": "application/json",
+    "responseSchema": STUDY_PACK_RESPONSE_SCHEMA
+}
+
 class GeminiClient:
     """Client for interacting with Google's Gemini API."""
     
-    def __init__(self):
-        """Initialize the Gemini client with API key from environment."""
+    def __init__(self, session: Optional[requests.Session] = None, api_base: str = GEMINI_API_BASE,
+                 model: str = GEMINI_MODEL, cache: Optional[ResponseCache] = None,
+                 budget: Optional[TokenBudget] = None, retry_policy: Optional[RetryPolicy] = None,
+                 rate_limiter: Optional[TokenBucket] = None, circuit_breaker: Optional[CircuitBreaker] = None,
+                 lease: Optional[MongoLease] = None):
+        """Initialize the Gemini client with API key from environment.
+        
+        Args:
+            session: Optional HTTP session; defaults to the shared pooled session
+            api_base: Base URL of the Gemini REST API
+            model: Name of the Gemini model to call
+            cache: Optional response cache consulted before each API call
+            budget: Optional prompt size policy; defaults to the configured limits
+            retry_policy: Optional backoff policy; defaults to the configured retries
+            rate_limiter: Optional token bucket; defaults to the process-wide limiter
+            circuit_breaker: Optional breaker; defaults to the process-wide breaker
+            lease: Optional MongoDB lease for coalescing calls across processes;
+                used only together with a shared response cache
+        """
         self.api_key = GEMINI_API_KEY
         if not self.api_key:
             logger.warning("GEMINI_API_KEY environment variable not set. API calls will fail.")
         
-        self.api_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
+        self.model = model
+        self.api_base = api_base.rstrip('/')
+        self.api_url = f"{self.api_base}/models/{self.model}:generateContent"
+        self.stream_url = f"{self.api_base}/models/{self.model}:streamGenerateContent"
+        self.session = session or get_shared_session()
+        self.timeout = (GEMINI_CONNECT_TIMEOUT, GEMINI_READ_TIMEOUT)
+        self.cache = cache
+        self.budget = budget or TokenBudget()
+        # Prompt/response token totals per kind of call
+        self.usage = TokenUsage()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter or gemini_rate_limiter
+        self.circuit_breaker = circuit_breaker or gemini_circuit_breaker
+        # Concurrent calls with the same prompt share one upstream request
+        self.single_flight = self._create_single_flight() if GEMINI_COALESCE_BACKEND != 'none' else None
+        self.lease = lease
+    
+    def _create_single_flight(self) -> SingleFlight:
+        return SingleFlight()
+    
+    def coalescing_stats(self) -> Dict[str, Any]:
+        """Return how many calls were coalesced in this process and across processes."""
+        stats = self.single_flight.stats() if self.single_flight is not None else {}
+        if self.lease is not None:
+            stats['lease'] = self.lease.stats()
+        return stats
     
-    def _make_api_call(self, prompt: str) -> Dict[str, Any]:
-        """Make a request to the Gemini API.
+    def fit_content(self, kind: str, content: str, prompt_template: str = "") -> str:
+        """Fit material to the prompt budget using the policy for this kind of call.
         
         Args:
-            prompt: The text prompt to send to the API
-            
+            kind: The kind of call, e.g. "quiz" or "explanation"
+            content: The material to be interpolated into the prompt
+            prompt_template: The prompt built without the material, to size its overhead
+        
         Returns:
-            The JSON response from the API
-            
+            The material, reduced if it would overflow the budget
+        
         Raises:
-            Exception: If the API call fails
+            PromptTooLargeError: If the material is over budget and the policy is "reject"
         """
-        if not self.api_key:
-            raise ValueError("Gemini API key not configured. Please set the GEMINI_API_KEY environment variable.")
+        return self.budget.fit(kind, content, estimate_tokens(prompt_template))
+    
+    def _fit_summary_content(self, content: str) -> Optional[str]:
+        """Fit material for a summary prompt.
         
-        # Construct the API request payload
+        Returns:
+            The material to summarize in one call, or None if it is over
+            budget and should be summarized in chunks instead
+        """
+        overhead = estimate_tokens(self._build_summary_prompt(""))
+        if self.budget.policy_for('summary') == 'chunk' and self.budget.exceeds(content, overhead):
+            if SUMMARY_CHUNK_TOKENS + overhead <= self.budget.max_tokens:
+                return None
+            # Chunks would not fit the budget either, so keep the start of the material
+            return truncate_to_tokens(content, self.budget.max_tokens - overhead)
+        return self.budget.fit('summary', content, overhead)
+    
+    def _record_usage(self, kind: str, prompt: str, response: Dict[str, Any]):
+        """Record the token counts of a completed call."""
+        prompt_tokens, response_tokens, estimated = usage_from_response(response, prompt, extract_text(response))
+        self.usage.record(kind, prompt_tokens, response_tokens, estimated)
+        logger.debug("Gemini %s call used %s prompt and %s response tokens%s", kind, prompt_tokens,
+                     response_tokens, ' (estimated)' if estimated else '')
+    
+    def _build_payload(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Construct the API request payload for a single-turn prompt."""
         payload = {
             "contents": [
                 {
@@ -44,31 +263,221 @@ class GeminiClient:
                 }
             ]
         }
+        if generation_config:
+            payload["generationConfig"] = generation_config
+        return payload
+    
+    def _before_attempt(self) -> float:
+        """Pass the circuit breaker and reserve a rate limiter token.
         
-        # Make the API call
-        response = requests.post(
-            f"{self.api_url}?key={self.api_key}",
-            headers={"Content-Type": "application/json"},
-            json=payload
-        )
+        Returns:
+            Seconds to wait for the token before sending
         
-        # Check for successful response
-        if response.status_code != 200:
-            logger.error(f"Gemini API error: {response.status_code} - {response.text}")
-            raise Exception(f"API request failed with status code {response.status_code}: {response.text}")
+        Raises:
+            CircuitOpenError: If the circuit breaker is refusing calls
+            RateLimitExceededError: If the token would take too long to become available
+        """
+        self.circuit_breaker.before_call()
+        wait = self.rate_limiter.reserve()
+        if wait is None:
+            self.circuit_breaker.cancel_call()
+            raise RateLimitExceededError("Too many Gemini requests queued; try again shortly")
+        return wait
+    
+    def _after_failure(self, attempt: int, error: Exception, retry_after: Optional[float] = None,
+                       retryable: bool = True) -> float:
+        """Record a failed attempt and decide whether to retry it.
+        
+        Args:
+            attempt: Number of attempts made so far
+            error: The error the attempt failed with
+            retry_after: Seconds the server asked us to wait, if any
+            retryable: False if the failure counts against the upstream but must not be retried
         
-        return response.json()
+        Returns:
+            Seconds to wait before the next attempt
+        
+        Raises:
+            Exception: The error itself, if the call should not be retried
+        """
+        self.circuit_breaker.record_failure()
+        delay = self.retry_policy.backoff(attempt, retry_after) if retryable else None
+        if delay is None:
+            raise error
+        logger.warning("Gemini attempt %s failed (%s); retrying in %.2f s", attempt, str(error)[:200], delay)
+        return delay
     
-    def generate_summary(self, content: str) -> str:
-        """Generate a summary of the provided content.
+    def _check_status(self, status_code: int, body: str, retry_after_header: Optional[str]) -> GeminiAPIError:
+        """Build the error for a non-200 response, raising at once if it is not retryable."""
+        logger.error("Gemini API error: %s - %s", status_code, body)
+        error = GeminiAPIError(status_code, body, parse_retry_after(retry_after_header))
+        if not self.retry_policy.is_retryable(status_code):
+            # The request itself was bad; the upstream is healthy
+            self.circuit_breaker.record_success()
+            raise error
+        return error
+    
+    def _post(self, url: str, payload: Dict[str, Any], stream: bool = False) -> requests.Response:
+        """POST to the Gemini API through the rate limiter, circuit breaker and retries.
+        
+        Throttling (429), timeouts and 5xx responses are retried with
+        jittered exponential backoff, honoring Retry-After. Other errors
+        are raised at once.
         
         Args:
-            content: The text content to summarize
+            url: Endpoint URL including the query string
+            payload: JSON request body
+            stream: Whether to leave the response body unread for streaming
+        
+        Returns:
+            The successful (200) response
+        
+        Raises:
+            GeminiAPIError: If the API answers with an error status
+            CircuitOpenError: If the circuit breaker is refusing calls
+            RateLimitExceededError: If the rate limiter queue is too long
+            requests.RequestException: If the connection keeps failing
+        """
+        attempt = 0
+        while True:
+            wait = self._before_attempt()
+            if wait:
+                time.sleep(wait)
+            attempt += 1
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout, stream=stream)
+            except requests.RequestException as e:
+                # A read timeout already held the worker for the whole timeout, so it is not retried
+                time.sleep(self._after_failure(attempt, e, retryable=not isinstance(e, requests.ReadTimeout)))
+                continue
             
+            if response.status_code == 200:
+                self.circuit_breaker.record_success()
+                return response
+            
+            with response:
+                error = self._check_status(response.status_code, response.text, response.headers.get('Retry-After'))
+            time.sleep(self._after_failure(attempt, error, error.retry_after))
+    
+    def _make_api_call(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+                       kind: str = 'generic') -> Dict[str, Any]:
+        """Make a request to the Gemini API, serving repeats from the response cache.
+        
+        Args:
+            prompt: The text prompt to send to the API
+            generation_config: Optional Gemini generation parameters
+            kind: The kind of call, used to group token usage
+        
         Returns:
-            A concise summary of the content
+            The JSON response from the API
+        
+        Raises:
+            Exception: If the API call fails
         """
-        prompt = f"""Please provide a concise but comprehensive summary of the following study material:
+        if not self.api_key:
+            raise ValueError("Gemini API key not configured. Please set the GEMINI_API_KEY environment variable.")
+        
+        cache_key = make_cache_key(prompt, self.model, generation_config)
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.debug("Response cache hit for %s", cache_key[:12])
+                return cached
+        
+        if self.single_flight is None:
+            return self._fetch(prompt, generation_config, kind, cache_key)
+        return self.single_flight.do(cache_key, lambda: self._fetch(prompt, generation_config, kind, cache_key))
+    
+    def _fetch(self, prompt: str, generation_config: Optional[Dict[str, Any]], kind: str,
+               cache_key: str) -> Dict[str, Any]:
+        """Call the API for a prompt and cache the response.
+        
+        With a cross-process lease, a call already being made by another
+        process is waited on and its cached response returned instead.
+        """
+        token = None
+        if self.lease is not None and self.cache is not None:
+            token = self.lease.acquire(cache_key)
+            if token is None:
+                result = self.lease.wait_for_result(cache_key, lambda: self.cache.peek(cache_key))
+                if result is not None:
+                    return result
+                token = self.lease.acquire(cache_key)
+        
+        try:
+            payload = self._build_payload(prompt, generation_config)
+            
+            # Make the API call over the pooled keep-alive session
+            with timed('gemini_request'):
+                response = self._post(f"{self.api_url}?key={self.api_key}", payload)
+                result = response.json()
+            self._record_usage(kind, prompt, result)
+            if self.cache is not None:
+                self.cache.set(cache_key, result)
+            return result
+        finally:
+            if token is not None:
+                self.lease.release(cache_key, token)
+    
+    def _stream_api_call(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+                         kind: str = 'generic') -> Iterator[str]:
+        """Stream a generation from the Gemini API as server-sent events.
+        
+        A cached response is replayed as a single piece. Otherwise text is
+        yielded as soon as each event arrives, and the assembled response is
+        cached once the stream completes.
+        
+        Args:
+            prompt: The text prompt to send to the API
+            generation_config: Optional Gemini generation parameters
+            kind: The kind of call, used to group token usage
+        
+        Yields:
+            Pieces of generated text in order
+        
+        Raises:
+            Exception: If the API call fails
+        """
+        if not self.api_key:
+            raise ValueError("Gemini API key not configured. Please set the GEMINI_API_KEY environment variable.")
+        
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_cache_key(prompt, self.model, generation_config)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                yield extract_text(cached)
+                return
+        
+        payload = self._build_payload(prompt, generation_config)
+        # Failures are retried until the stream starts; text is never repeated
+        with timed('gemini_stream_open'):
+            response = self._post(f"{self.stream_url}?alt=sse&key={self.api_key}", payload, stream=True)
+        
+        with response:
+            pieces = []
+            usage_metadata = None
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                event = json.loads(line[5:])
+                # Each event carries running totals; the last one is final
+                usage_metadata = event.get('usageMetadata', usage_metadata)
+                text = extract_text(event)
+                if text:
+                    pieces.append(text)
+                    yield text
+        
+        result = make_text_response(''.join(pieces))
+        if usage_metadata:
+            result['usageMetadata'] = usage_metadata
+        self._record_usage(kind, prompt, result)
+        if cache_key is not None and pieces:
+            self.cache.set(cache_key, result)
+    
+    def _build_summary_prompt(self, content: str) -> str:
+        """Build the prompt used to summarize study material."""
+        return f"""Please provide a concise but comprehensive summary of the following study material:
 
 {content}
 
@@ -78,33 +487,104 @@ The summary should:
 3. Be organized in a clear, logical structure
 4. Be suitable for a student reviewing this material
 """
+
+    def generate_summary(self, content: str) -> str:
+        """Generate a summary of the provided content.
+        
+        Content over the prompt budget is reduced, or summarized with
+        map-reduce, according to the "summary" budget policy.
+        
+        Args:
+            content: The text content to summarize
+        
+        Returns:
+            A concise summary of the content
+        """
+        fitted = self._fit_summary_content(content)
+        if fitted is None:
+            return self._summarize_in_chunks(content)
+        prompt = self._build_summary_prompt(fitted)
         
         try:
-            response = self._make_api_call(prompt)
+            response = self._make_api_call(prompt, kind='summary')
             # Extract the generated text from the response
             summary = response.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '')
             
             if not summary:
                 raise ValueError("Received empty summary from API")
-                
-            return summary
             
+            return summary
+        
         except Exception as e:
-            logger.error(f"Error generating summary: {str(e)}")
+            logger.error("Error generating summary: %s", e)
             raise
     
-    def generate_quiz(self, content: str, question_count: int = 5, difficulty: str = "medium") -> Dict[str, Any]:
-        """Generate a quiz based on the content.
+    def stream_summary(self, content: str) -> Iterator[str]:
+        """Stream a summary of the provided content as it is generated.
         
         Args:
-            content: The text content to generate questions from
-            question_count: The number of questions to generate
-            difficulty: The difficulty level (easy, medium, hard)
-            
+            content: The text content to summarize
+        
+        Yields:
+            Pieces of the summary text in order
+        """
+        fitted = self._fit_summary_content(content)
+        if fitted is None:
+            return self._stream_in_chunks(content)
+        return self._stream_api_call(self._build_summary_prompt(fitted), kind='summary')
+    
+    def _summarize_in_chunks(self, content: str) -> str:
+        """Summarize over-budget content with the shared map-reduce summarizer."""
+        from services.chunked_summarizer import get_chunked_summarizer
+        return get_chunked_summarizer(self).summarize(content)
+    
+    def _stream_in_chunks(self, content: str) -> Iterator[str]:
+        # Map-reduce output only exists once the final reduce is done
+        yield self._summarize_in_chunks(content)
+    
+    def _build_combined_summary_prompt(self, partial_summaries: List[str]) -> str:
+        """Build the prompt used to merge summaries of consecutive sections."""
+        sections = "\n\n".join(
+            f"Part {index}:\n{summary}" for index, summary in enumerate(partial_summaries, start=1)
+        )
+        return f"""The following are summaries of consecutive parts of the same study material, in order:
+
+{sections}
+
+Combine them into one concise but comprehensive summary of the whole material. The summary should:
+1. Highlight the main ideas and concepts
+2. Include key facts and important details
+3. Be organized in a clear, logical structure without repeating points
+4. Be suitable for a student reviewing this material
+"""
+
+    def generate_combined_summary(self, partial_summaries: List[str]) -> str:
+        """Merge summaries of consecutive sections into one summary.
+        
+        Args:
+            partial_summaries: Summaries of consecutive parts of a document, in order
+        
         Returns:
-            A dictionary containing quiz questions, options, and answers
+            A single summary covering all of the parts
         """
-        prompt = f"""Create a {difficulty} difficulty quiz with {question_count} multiple-choice questions based on the following study material:
+        prompt = self._build_combined_summary_prompt(partial_summaries)
+        
+        try:
+            response = self._make_api_call(prompt, kind='combined_summary')
+            summary = response.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '')
+            
+            if not summary:
+                raise ValueError("Received empty summary from API")
+            
+            return summary
+        
+        except Exception as e:
+            logger.error("Error combining summaries: %s", e)
+            raise
+    
+    def _build_quiz_prompt(self, content: str, question_count: int, difficulty: str) -> str:
+        """Build the prompt used to generate a multiple-choice quiz."""
+        return f"""Create a {difficulty} difficulty quiz with {question_count} multiple-choice questions based on the following study material:
 
 {content}
 
@@ -122,48 +602,166 @@ Format your response as valid JSON with the following structure:
 
 Make sure each question tests understanding, not just memorization. Include an explanation for each correct answer.
 """
+
+    @timed('response_parse')
+    def _parse_quiz_response(self, response_text: str) -> Dict[str, Any]:
+        """Parse and validate the quiz JSON in a generated response.
+        
+        Raises:
+            ValueError: If the response is empty or not a valid quiz
+        """
+        quiz_data = extract_json(response_text)
+        
+        # Validate the structure
+        if "questions" not in quiz_data or not isinstance(quiz_data["questions"], list):
+            raise ValueError("Invalid quiz data structure received from API")
+        
+        return quiz_data
+    
+    def generate_quiz(self, content: str, question_count: int = 5, difficulty: str = "medium") -> Dict[str, Any]:
+        """Generate a quiz based on the content.
+        
+        Args:
+            content: The text content to generate questions from
+            question_count: The number of questions to generate
+            difficulty: The difficulty level (easy, medium, hard)
+        
+        Returns:
+            A dictionary containing quiz questions, options, and answers
+        """
+        content = self.fit_content('quiz', content, self._build_quiz_prompt("", question_count, difficulty))
+        prompt = self._build_quiz_prompt(content, question_count, difficulty)
         
         try:
-            response = self._make_api_call(prompt)
+            response = self._make_api_call(prompt, kind='quiz')
             # Extract the generated text from the response
             response_text = response.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '')
             
-            if not response_text:
-                raise ValueError("Received empty response from API")
-            
-            # Extract JSON from the response text
-            # Sometimes the API includes markdown code blocks, so we need to handle that
-            if "```json" in response_text:
-                json_text = response_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in response_text:
-                json_text = response_text.split("```")[1].strip()
-            else:
-                json_text = response_text
-            
-            quiz_data = json.loads(json_text)
-            
-            # Validate the structure
-            if "questions" not in quiz_data or not isinstance(quiz_data["questions"], list):
-                raise ValueError("Invalid quiz data structure received from API")
-                
-            return quiz_data
-            
+            return self._parse_quiz_response(response_text)
+        
         except Exception as e:
-            logger.error(f"Error generating quiz: {str(e)}")
+            logger.error("Error generating quiz: %s", e)
             raise
     
-    def generate_explanation(self, topic: str, context: Optional[str] = None) -> str:
-        """Generate a detailed explanation of a topic.
+    def _build_study_pack_prompt(self, content: str, question_count: int, difficulty: str, max_points: int) -> str:
+        """Build the prompt that asks for every study artifact in one response."""
+        return f"""Create a complete study pack for the following study material:
+
+{content}
+
+The study pack must contain:
+1. "summary": a concise summary covering the main points and key concepts, formatted with clear headings and bullet points
+2. "key_points": the {max_points} most important key points, each clearly and briefly stated
+3. "categories": 3-5 main topics or sections of the material, each with a title, a brief summary and its key points
+4. "quiz": {question_count} multiple-choice questions at {difficulty} difficulty, each with 4 options, the correct answer and an explanation of why it is correct
+
+Format your response as valid JSON with the following structure:
+{{
+  "summary": "Summary text",
+  "key_points": ["Point 1", "Point 2"],
+  "categories": [
+    {{
+      "title": "Category Title",
+      "summary": "Brief summary of this category",
+      "key_points": ["Point 1", "Point 2", "Point 3"]
+    }}
+  ],
+  "quiz": {{
+    "questions": [
+      {{
+        "question": "Question text here?",
+        "options": ["Option A", "Option B", "Option C", "Option D"],
+        "correct_answer": "Option A",
+        "explanation": "Why this answer is correct"
+      }}
+    ]
+  }}
+}}
+
+Make sure each question tests understanding, not just memorization.
+"""
+
+    @timed('response_parse')
+    def _parse_study_pack_response(self, response_text: str, max_points: int) -> Dict[str, Any]:
+        """Parse and validate the study pack JSON in a generated response.
+        
+        Returns:
+            Dictionary with "summary", "key_points", "categories" and "quiz"
+        
+        Raises:
+            ValueError: If the response is empty or any part of the pack is malformed
+        """
+        pack = extract_json(response_text)
+        if not isinstance(pack, dict):
+            raise ValueError("Invalid study pack structure received from API")
+        
+        summary = pack.get("summary")
+        if not isinstance(summary, str) or not summary.strip():
+            raise ValueError("Study pack is missing its summary")
+        
+        key_points = pack.get("key_points")
+        if not isinstance(key_points, list) or not all(isinstance(point, str) for point in key_points):
+            raise ValueError("Study pack key points must be a list of strings")
+        
+        categories = pack.get("categories")
+        if not isinstance(categories, list) or not all(
+            isinstance(category, dict) and isinstance(category.get("title"), str) for category in categories
+        ):
+            raise ValueError("Study pack categories must be a list of objects with a title")
+        
+        quiz = pack.get("quiz")
+        if not isinstance(quiz, dict) or not isinstance(quiz.get("questions"), list):
+            raise ValueError("Invalid quiz data structure received from API")
+        for question in quiz["questions"]:
+            if not (isinstance(question, dict) and isinstance(question.get("question"), str)
+                    and isinstance(question.get("options"), list) and question.get("correct_answer") in question["options"]):
+                raise ValueError("Study pack quiz questions need a question, options and a correct answer among them")
+        
+        return {
+            "summary": summary.strip(),
+            "key_points": [point.strip() for point in key_points if point.strip()][:max_points],
+            "categories": {"categories": categories},
+            "quiz": quiz
+        }
+    
+    def generate_study_pack(self, content: str, question_count: int = 5, difficulty: str = "medium",
+                            max_points: int = 5) -> Dict[str, Any]:
+        """Generate a summary, key points, categories and a quiz in one call.
+        
+        The material is sent once and the model answers with a single JSON
+        document constrained by STUDY_PACK_RESPONSE_SCHEMA, instead of four
+        separate calls that each re-send the whole document.
         
         Args:
-            topic: The topic or concept to explain
-            context: Optional additional context or material
-            
+            content: The study material
+            question_count: The number of quiz questions to generate
+            difficulty: The quiz difficulty level (easy, medium, hard)
+            max_points: Maximum number of key points
+        
         Returns:
-            A detailed explanation of the topic
+            Dictionary with "summary" (str), "key_points" (list of str),
+            "categories" (in the shape returned by Summarizer.categorize_content)
+            and "quiz" (in the shape returned by generate_quiz)
+        
+        Raises:
+            ValueError: If the response is not a valid study pack
         """
+        content = self.fit_content(
+            'study_pack', content, self._build_study_pack_prompt("", question_count, difficulty, max_points)
+        )
+        prompt = self._build_study_pack_prompt(content, question_count, difficulty, max_points)
+        
+        try:
+            response = self._make_api_call(prompt, STUDY_PACK_GENERATION_CONFIG, kind='study_pack')
+            return self._parse_study_pack_response(extract_text(response), max_points)
+        except Exception as e:
+            logger.error("Error generating study pack: %s", e)
+            raise
+    
+    def _build_explanation_prompt(self, topic: str, context: Optional[str] = None) -> str:
+        """Build the prompt used to explain a topic, with optional context."""
         if context:
-            prompt = f"""Please provide a detailed explanation of the following topic/concept:
+            return f"""Please provide a detailed explanation of the following topic/concept:
 
 Topic: {topic}
 
@@ -178,7 +776,7 @@ Your explanation should:
 5. Include a summary of the main points at the end
 """
         else:
-            prompt = f"""Please provide a detailed explanation of the following topic/concept:
+            return f"""Please provide a detailed explanation of the following topic/concept:
 
 Topic: {topic}
 
@@ -189,17 +787,48 @@ Your explanation should:
 4. Connect this topic to broader concepts where relevant
 5. Include a summary of the main points at the end
 """
+
+    def _fit_context(self, topic: str, context: Optional[str]) -> Optional[str]:
+        """Fit explanation context to the prompt budget."""
+        if not context:
+            return context
+        return self.fit_content('explanation', context, self._build_explanation_prompt(topic, " "))
+    
+    def generate_explanation(self, topic: str, context: Optional[str] = None) -> str:
+        """Generate a detailed explanation of a topic.
+        
+        Args:
+            topic: The topic or concept to explain
+            context: Optional additional context or material
+        
+        Returns:
+            A detailed explanation of the topic
+        """
+        prompt = self._build_explanation_prompt(topic, self._fit_context(topic, context))
         
         try:
-            response = self._make_api_call(prompt)
+            response = self._make_api_call(prompt, kind='explanation')
             # Extract the generated text from the response
             explanation = response.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '')
             
             if not explanation:
                 raise ValueError("Received empty explanation from API")
-                
-            return explanation
             
+            return explanation
+        
         except Exception as e:
-            logger.error(f"Error generating explanation: {str(e)}")
+            logger.error("Error generating explanation: %s", e)
             raise
+    
+    def stream_explanation(self, topic: str, context: Optional[str] = None) -> Iterator[str]:
+        """Stream a detailed explanation of a topic as it is generated.
+        
+        Args:
+            topic: The topic or concept to explain
+            context: Optional additional context or material
+        
+        Yields:
+            Pieces of the explanation text in order
+        """
+        prompt = self._build_explanation_prompt(topic, self._fit_context(topic, context))
+        return self._stream_api_call(prompt, kind='explanation')
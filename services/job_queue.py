@@ -0,0 +1,130 @@
+"""Background job queue for long-running generation requests."""
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from flask import current_app, has_app_context
+
+from config import JOB_WORKERS, JOB_MAX_PENDING
+from models import save_job, update_job, get_job
+
+logger = logging.getLogger(__name__)
+
+# Number of job documents remembered in-process for status lookups
+_LOCAL_JOB_LIMIT = 1000
+
+class QueueFullError(Exception):
+    """Raised when the queue already holds the maximum number of pending jobs."""
+
+class JobQueue:
+    """Run generation work on a bounded pool of background threads.
+    
+    Jobs are recorded in the ``jobs`` MongoDB collection so any process can
+    report their status. A bounded in-process copy is also kept so status
+    lookups keep working when the database is not available.
+    
+    Job functions receive a ``progress(percent, message)`` callback as
+    their first argument and return a JSON-serializable dict.
+    """
+    
+    def __init__(self, workers: int = JOB_WORKERS, max_pending: int = JOB_MAX_PENDING):
+        """Initialize the queue.
+        
+        Args:
+            workers: Number of jobs that may run concurrently
+            max_pending: Maximum number of queued plus running jobs
+        """
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def submit(self, job_type: str, func: Callable[..., Dict[str, Any]], *args) -> str:
+        """Enqueue a job and return its ID immediately.
+        
+        Args:
+            job_type: Type of work, e.g. "summarize"
+            func: Function to run as ``func(progress, *args)``
+            *args: Extra arguments for func
+            
+        Returns:
+            The new job ID
+            
+        Raises:
+            QueueFullError: If too many jobs are already pending
+        """
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError("Too many requests are being processed. Please try again shortly.")
+        
+        now = datetime.utcnow()
+        job = {
+            '_id': uuid.uuid4().hex,
+            'job_type': job_type,
+            'status': 'queued',
+            'progress': 0,
+            'message': 'Waiting for a worker',
+            'result': None,
+            'error': None,
+            'created_at': now,
+            'updated_at': now
+        }
+        self._remember(job)
+        save_job(dict(job))
+        
+        app = current_app._get_current_object() if has_app_context() else None
+        try:
+            self.executor.submit(self._run, app, job['_id'], func, args)
+        except Exception:
+            self._slots.release()
+            raise
+        return job['_id']
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job's current state from this process or the database."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        return get_job(job_id)
+    
+    def _run(self, app, job_id: str, func: Callable, args: tuple):
+        if app is None:
+            self._execute(job_id, func, args)
+            return
+        # Database helpers need an application context
+        with app.app_context():
+            self._execute(job_id, func, args)
+    
+    def _execute(self, job_id: str, func: Callable, args: tuple):
+        try:
+            self._update(job_id, status='running', message='Generating')
+            
+            def progress(percent: int, message: str):
+                self._update(job_id, progress=percent, message=message)
+            
+            result = func(progress, *args)
+            self._update(job_id, status='succeeded', progress=100, message='Done', result=result)
+        except Exception as e:
+            logger.error("Job %s failed: %s", job_id, e)
+            self._update(job_id, status='failed', message='Failed', error=str(e))
+        finally:
+            self._slots.release()
+    
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields, updated_at=datetime.utcnow())
+        update_job(job_id, dict(fields))
+    
+    def _remember(self, job: Dict[str, Any]):
+        with self._lock:
+            self._jobs[job['_id']] = job
+            while len(self._jobs) > _LOCAL_JOB_LIMIT:
+                self._jobs.popitem(last=False)
+
+job_queue = JobQueue()
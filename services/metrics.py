@@ -0,0 +1,221 @@
+"""Latency histograms and per-request stage timings in Prometheus text format."""
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bucket upper bounds in seconds, from a cache lookup to a long generation
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+METRIC_PREFIX = 'study_assistant'
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+def _flatten(stats: Dict[str, Any], prefix: str = '') -> Iterator[Tuple[str, Any]]:
+    """Yield (key, value) pairs of a nested stats dictionary with joined keys."""
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f'{prefix}{key}_')
+        else:
+            yield f'{prefix}{key}', value
+
+class Histogram:
+    """Thread-safe Prometheus histogram with optional labels."""
+    
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """Initialize the histogram.
+        
+        Args:
+            name: Metric name
+            help_text: Description shown in the exposition
+            label_names: Names of the labels each observation carries
+            buckets: Sorted bucket upper bounds
+        """
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, *label_values: str):
+        """Record one observation."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+    
+    def snapshot(self) -> Dict[Tuple[str, ...], Dict[str, Any]]:
+        """Return count, sum and per-bucket counts for each label set."""
+        with self._lock:
+            return {
+                labels: {'counts': list(counts), 'sum': total, 'count': sum(counts)}
+                for labels, (counts, total) in self._series.items()
+            }
+    
+    def render(self) -> List[str]:
+        """Render the histogram in Prometheus text format."""
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, series in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series['counts']):
+                cumulative += count
+                le = _format_labels(self.label_names, labels, f'le="{_format_value(bound)}"')
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(series["sum"])}')
+            lines.append(f'{self.name}_count{label_text} {series["count"]}')
+        return lines
+
+class MetricsRegistry:
+    """Histograms plus callbacks exposing the statistics of other components."""
+    
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+        self._collectors: List[Tuple[str, str, Callable[[], Dict[str, Any]], Optional[str]]] = []
+        self._lock = threading.Lock()
+    
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Get the histogram with this name, creating it on first use."""
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(name, help_text, label_names, buckets)
+            return self._histograms[name]
+    
+    def register_stats(self, name: str, help_text: str, stats: Callable[[], Dict[str, Any]],
+                       label_name: Optional[str] = None):
+        """Expose a component's stats() dictionary as metrics.
+        
+        Each numeric entry becomes ``<prefix>_<name>_<key>``. String
+        entries become ``<prefix>_<name>_<key>{<key>="<value>"} 1``. If
+        label_name is given, stats() returns one dictionary per label
+        value, e.g. token usage per kind of call.
+        
+        Args:
+            name: Component name used in the metric names
+            help_text: Description shown in the exposition
+            stats: Callable returning the statistics
+            label_name: Label for the outer keys of a nested dictionary
+        """
+        with self._lock:
+            self._collectors.append((name, help_text, stats, label_name))
+    
+    def _render_stats(self, name: str, help_text: str, stats: Callable[[], Dict[str, Any]],
+                      label_name: Optional[str]) -> List[str]:
+        try:
+            values = stats()
+        except Exception as e:
+            logger.warning("Failed to collect %s metrics: %s", name, e)
+            return []
+        
+        samples: Dict[str, List[str]] = {}
+        groups = values.items() if label_name else [(None, values)]
+        for label_value, group in groups:
+            for key, value in _flatten(group):
+                metric = f'{METRIC_PREFIX}_{name}_{key}'
+                labels = [(label_name, label_value)] if label_name else []
+                if isinstance(value, str):
+                    labels.append((key, value))
+                    value = 1
+                elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                label_text = _format_labels([n for n, _ in labels], [v for _, v in labels])
+                samples.setdefault(metric, []).append(f'{metric}{label_text} {_format_value(value)}')
+        
+        lines = []
+        for metric, metric_samples in sorted(samples.items()):
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} untyped')
+            lines.extend(metric_samples)
+        return lines
+    
+    def render(self) -> str:
+        """Render every metric in Prometheus text format."""
+        with self._lock:
+            histograms = list(self._histograms.values())
+            collectors = list(self._collectors)
+        lines = []
+        for histogram in histograms:
+            lines.extend(histogram.render())
+        for collector in collectors:
+            lines.extend(self._render_stats(*collector))
+        return '\n'.join(lines) + '\n'
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    f'{METRIC_PREFIX}_stage_seconds', 'Time spent in each stage of handling a request', ('stage',)
+)
+REQUEST_SECONDS = registry.histogram(
+    f'{METRIC_PREFIX}_http_request_seconds', 'HTTP request latency', ('method', 'endpoint', 'status')
+)
+
+# Stage durations of the request being handled in this context
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar('request_timings', default=None)
+
+def record_stage(stage: str, seconds: float):
+    """Record the duration of a stage in its histogram and the current request's timings."""
+    STAGE_SECONDS.observe(seconds, stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time a block, or a function when used as a decorator, as a named stage.
+    
+    Usage::
+        
+        with timed('gemini_request'):
+            response = session.post(...)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+def start_request_timing():
+    """Begin collecting stage timings for the current request."""
+    _request_timings.set({'_start': time.perf_counter()})
+
+def finish_request_timing() -> Tuple[float, Dict[str, float]]:
+    """Stop collecting timings for the current request.
+    
+    Returns:
+        The total seconds since start_request_timing() and the stage
+        durations recorded meanwhile
+    """
+    timings = _request_timings.get() or {'_start': time.perf_counter()}
+    _request_timings.set(None)
+    start = timings.pop('_start')
+    return time.perf_counter() - start, timings
+
+def server_timing_header(total: float, timings: Dict[str, float]) -> str:
+    """Format stage timings as a Server-Timing header value, in milliseconds."""
+    entries = [f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in timings.items()]
+    entries.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(entries)
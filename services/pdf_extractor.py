@@ -0,0 +1,220 @@
+"""Page-parallel PDF text extraction over a memory-mapped spool file."""
+import logging
+import mmap
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from config import PDF_EXTRACT_WORKERS, PDF_PAGES_PER_BATCH, PDF_PARALLEL_MIN_PAGES
+
+logger = logging.getLogger(__name__)
+
+# Separator placed between pages in the joined text
+PAGE_SEPARATOR = "\n\n"
+
+_SPOOL_CHUNK_SIZE = 1024 * 1024
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+# Set in the extraction pool's own workers, which must not submit to the pool
+_in_pool_worker = False
+
+def spool_to_tempfile(stream, suffix: str = "", hasher=None) -> str:
+    """Copy an upload stream to a temporary file in fixed-size chunks.
+    
+    Args:
+        stream: A readable binary stream
+        suffix: Suffix for the temporary file name
+        hasher: Optional hashlib object updated with every chunk, so the
+            upload can be hashed without being read twice
+    
+    Returns:
+        Path of the temporary file; the caller must delete it
+    """
+    handle = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    try:
+        with handle:
+            while True:
+                chunk = stream.read(_SPOOL_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if hasher is not None:
+                    hasher.update(chunk)
+                handle.write(chunk)
+    except Exception:
+        os.unlink(handle.name)
+        raise
+    return handle.name
+
+def _open_mapped(path: str) -> Tuple[object, mmap.mmap]:
+    """Open a file and memory-map it read-only."""
+    handle = open(path, 'rb')
+    try:
+        return handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    except Exception:
+        handle.close()
+        raise
+
+# Reader for the most recent file opened by this worker process. Batches of
+# the same upload usually land on the same worker, and reusing the reader
+# avoids re-parsing the page tree for every batch. It is released after the
+# document's last batch, or once the worker has been idle for
+# _READER_IDLE_SECONDS, so the space of a deleted spool file is freed.
+_worker_reader = None
+_worker_reader_lock = threading.Lock()
+_worker_reader_timer: Optional[threading.Timer] = None
+_READER_IDLE_SECONDS = 2.0
+
+def _file_identity(path: str) -> Tuple:
+    """Identify a file's contents so a new file reusing the same path is not mistaken for it."""
+    stat = os.stat(path)
+    return path, stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+def _get_worker_reader(path: str):
+    """Return a PdfReader over a memory map of path, reusing the last one if possible.
+    
+    Must be called with _worker_reader_lock held.
+    """
+    global _worker_reader
+    import PyPDF2
+    
+    identity = _file_identity(path)
+    if _worker_reader is not None:
+        if _worker_reader[0] == identity:
+            return _worker_reader[3]
+        _close_worker_reader()
+    
+    handle, mapped = _open_mapped(path)
+    reader = PyPDF2.PdfReader(mapped)
+    _worker_reader = (identity, handle, mapped, reader)
+    return reader
+
+def _close_worker_reader():
+    """Close the cached reader; must be called with _worker_reader_lock held."""
+    global _worker_reader
+    if _worker_reader is not None:
+        _, handle, mapped, _ = _worker_reader
+        _worker_reader = None
+        mapped.close()
+        handle.close()
+
+def _release_worker_reader():
+    """Close the cached reader, e.g. when the worker has gone idle."""
+    with _worker_reader_lock:
+        _close_worker_reader()
+
+def _extract_page_range(path: str, start: int, stop: int, last: bool = False) -> List[str]:
+    """Extract text from pages [start, stop) of the PDF at path.
+    
+    Runs in a worker process. The file is memory-mapped, so concurrent
+    workers share the operating system page cache instead of each holding
+    a private copy of the upload.
+    
+    Args:
+        path: Path of the PDF file
+        start: First page to extract
+        stop: Page after the last one to extract
+        last: True for the document's last batch, after which the cached
+            reader is released at once
+    """
+    global _worker_reader_timer
+    with _worker_reader_lock:
+        if _worker_reader_timer is not None:
+            _worker_reader_timer.cancel()
+            _worker_reader_timer = None
+        try:
+            reader = _get_worker_reader(path)
+            pages = reader.pages
+            texts = [(pages[index].extract_text() or "") for index in range(start, stop)]
+        except Exception:
+            _close_worker_reader()
+            raise
+        if last:
+            _close_worker_reader()
+        else:
+            # Other workers may finish the document; release the reader if no batch follows here
+            _worker_reader_timer = threading.Timer(_READER_IDLE_SECONDS, _release_worker_reader)
+            _worker_reader_timer.daemon = True
+            _worker_reader_timer.start()
+    return texts
+
+def _mark_pool_worker():
+    """Initializer of the extraction pool's worker processes."""
+    global _in_pool_worker
+    _in_pool_worker = True
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """Get the shared extraction process pool, starting it on first use.
+    
+    Workers come from a fork server so they are not forked from a
+    multi-threaded web worker.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                context = multiprocessing.get_context('forkserver')
+                _pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS, mp_context=context,
+                                            initializer=_mark_pool_worker)
+    return _pool
+
+def iter_pdf_pages(path: str, workers: int = PDF_EXTRACT_WORKERS,
+                   pages_per_batch: int = PDF_PAGES_PER_BATCH) -> Iterator[str]:
+    """Extract the text of a PDF file on disk, yielding pages in order as they are ready.
+    
+    Small documents are extracted in-process. Larger ones are split into
+    page batches and extracted on the shared process pool, with at most
+    two batches per worker in flight; each batch is yielded and dropped as
+    soon as the batches before it are done, so only the batches in flight
+    are held, never the whole document.
+    
+    Args:
+        path: Path of the PDF file
+        workers: Maximum number of worker processes to use
+        pages_per_batch: Number of pages extracted per task
+    
+    Yields:
+        The text of each page
+    """
+    import PyPDF2
+    
+    handle, mapped = _open_mapped(path)
+    try:
+        reader = PyPDF2.PdfReader(mapped)
+        page_count = len(reader.pages)
+        # Inside a pool worker (e.g. a batch upload) the pages are extracted in-process
+        if workers <= 1 or page_count < PDF_PARALLEL_MIN_PAGES or _in_pool_worker:
+            # A reader of its own, since the generator may be suspended while other threads extract
+            for page in reader.pages:
+                yield page.extract_text() or ""
+            return
+    finally:
+        mapped.close()
+        handle.close()
+    
+    batches = [(start, min(start + pages_per_batch, page_count))
+               for start in range(0, page_count, pages_per_batch)]
+    logger.debug("Extracting %s PDF pages in %s batches", page_count, len(batches))
+    
+    pool = get_extraction_pool()
+    max_in_flight = workers * 2
+    in_flight = {}
+    next_batch = 0
+    try:
+        while next_batch < len(batches) or in_flight:
+            while next_batch < len(batches) and len(in_flight) < max_in_flight:
+                start, stop = batches[next_batch]
+                in_flight[next_batch] = pool.submit(_extract_page_range, path, start, stop,
+                                                    next_batch == len(batches) - 1)
+                next_batch += 1
+            # Collect the oldest batch first, since pages are yielded in order
+            oldest = min(in_flight)
+            yield from in_flight.pop(oldest).result()
+    finally:
+        # The consumer stopped early or extraction failed
+        for future in in_flight.values():
+            future.cancel()
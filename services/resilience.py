@@ -0,0 +1,289 @@
+"""Retry, rate limiting and circuit breaking for calls to the Gemini API."""
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from config import (
+    GEMINI_RETRY_ATTEMPTS, GEMINI_RETRY_BASE_DELAY, GEMINI_RETRY_MAX_DELAY, GEMINI_RETRY_AFTER_MAX,
+    GEMINI_RATE_LIMIT_RPS, GEMINI_RATE_LIMIT_BURST, GEMINI_RATE_LIMIT_MAX_WAIT,
+    GEMINI_BREAKER_FAILURE_RATE, GEMINI_BREAKER_MIN_CALLS, GEMINI_BREAKER_WINDOW, GEMINI_BREAKER_RESET_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: throttling, timeouts and transient server errors
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+class GeminiAPIError(Exception):
+    """Raised when the Gemini API answers with an error status."""
+    
+    def __init__(self, status_code: int, body: str, retry_after: Optional[float] = None):
+        super().__init__(f"API request failed with status code {status_code}: {body}")
+        self.status_code = status_code
+        self.body = body
+        self.retry_after = retry_after
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the API while the circuit breaker is open."""
+    
+    def __init__(self, retry_in: float):
+        super().__init__(f"Gemini API is unavailable after repeated failures; try again in {max(math.ceil(retry_in), 1)} s")
+        self.retry_in = retry_in
+
+class RateLimitExceededError(Exception):
+    """Raised when a call would wait longer than allowed for the rate limiter."""
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date.
+    
+    Returns:
+        Seconds to wait, or None if the header is missing or malformed
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy:
+    """Jittered exponential backoff for failed calls.
+    
+    After the n-th failed attempt the delay is drawn uniformly from zero
+    to ``base_delay * 2**(n - 1)`` ("full jitter"), capped at
+    ``max_delay``, so clients that failed
+    together do not retry together. A server's Retry-After is honored as
+    a lower bound, unless it asks for longer than ``max_retry_after``, in
+    which case the call fails instead of holding a worker.
+    """
+    
+    def __init__(self, max_attempts: int = GEMINI_RETRY_ATTEMPTS, base_delay: float = GEMINI_RETRY_BASE_DELAY,
+                 max_delay: float = GEMINI_RETRY_MAX_DELAY, max_retry_after: float = GEMINI_RETRY_AFTER_MAX):
+        """Initialize the policy.
+        
+        Args:
+            max_attempts: Total attempts per call, including the first
+            base_delay: Backoff ceiling in seconds for the first retry
+            max_delay: Largest backoff in seconds
+            max_retry_after: Longest Retry-After in seconds worth waiting for
+        """
+        self.max_attempts = max(max_attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+    
+    def is_retryable(self, status_code: int) -> bool:
+        """Return True if a call that failed with this status may be retried."""
+        return status_code in RETRYABLE_STATUSES
+    
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """Get the delay before the next attempt.
+        
+        Args:
+            attempt: Number of attempts made so far
+            retry_after: Seconds the server asked us to wait, if any
+        
+        Returns:
+            Seconds to sleep, or None if the call should not be retried
+        """
+        if attempt >= self.max_attempts:
+            return None
+        if retry_after is not None and retry_after > self.max_retry_after:
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every caller in the process.
+    
+    Tokens refill at ``rate`` per second up to ``capacity``. A caller
+    reserves a token and sleeps until it becomes available, so bursts are
+    smoothed to the configured rate. A rate of zero disables limiting.
+    """
+    
+    def __init__(self, rate: float = GEMINI_RATE_LIMIT_RPS, capacity: int = GEMINI_RATE_LIMIT_BURST):
+        """Initialize the bucket.
+        
+        Args:
+            rate: Tokens added per second; 0 disables the limiter
+            capacity: Largest burst allowed after an idle period
+        """
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.throttled = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+    
+    def reserve(self, max_wait: float = GEMINI_RATE_LIMIT_MAX_WAIT) -> Optional[float]:
+        """Take a token, possibly one that is not available yet.
+        
+        Args:
+            max_wait: Longest acceptable wait in seconds
+        
+        Returns:
+            Seconds the caller must wait before proceeding, or None if the
+            wait would exceed max_wait (no token is taken then)
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Tokens go negative while callers queue for future refills
+            wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+            if wait > max_wait:
+                self.rejected += 1
+                return None
+            self.tokens -= 1
+            if wait:
+                self.throttled += 1
+            return wait
+    
+    def acquire(self, max_wait: float = GEMINI_RATE_LIMIT_MAX_WAIT):
+        """Block until a token is available.
+        
+        Raises:
+            RateLimitExceededError: If that would take longer than max_wait
+        """
+        wait = self.reserve(max_wait)
+        if wait is None:
+            raise RateLimitExceededError("Too many Gemini requests queued; try again shortly")
+        if wait:
+            time.sleep(wait)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return the configured rate and throttling counters."""
+        with self._lock:
+            return {'rate': self.rate, 'capacity': self.capacity, 'throttled': self.throttled, 'rejected': self.rejected}
+
+class CircuitBreaker:
+    """Fail fast while the upstream error rate is high.
+    
+    Outcomes of the calls made in the last ``window`` seconds are kept.
+    Once at least ``min_calls`` were made and the share of failures
+    reaches ``failure_rate`` the circuit opens, and calls are refused
+    without touching the network for ``reset_timeout`` seconds. After that
+    a single trial call is let through ("half-open"): success closes the
+    circuit, failure opens it again.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_rate: float = GEMINI_BREAKER_FAILURE_RATE, min_calls: int = GEMINI_BREAKER_MIN_CALLS,
+                 window: float = GEMINI_BREAKER_WINDOW, reset_timeout: float = GEMINI_BREAKER_RESET_TIMEOUT):
+        """Initialize the breaker.
+        
+        Args:
+            failure_rate: Share of failed calls in the window that opens the circuit
+            min_calls: Calls needed in the window before the rate is trusted
+            window: Length in seconds of the sliding window of outcomes
+            reset_timeout: Seconds to stay open before a trial call
+        """
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._outcomes = deque()
+        self._failures = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+    
+    def _trim(self, now: float):
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            _, failed = self._outcomes.popleft()
+            self._failures -= failed
+    
+    def _open(self, now: float):
+        self.state = self.OPEN
+        self.opened_at = now
+        self.times_opened += 1
+        self._trial_in_flight = False
+        self._outcomes.clear()
+        self._failures = 0
+    
+    def before_call(self):
+        """Check that a call may be made.
+        
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with its trial call in flight
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                logger.info("Gemini circuit half-open; sending a trial call")
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self.rejected += 1
+            raise CircuitOpenError(max(self.reset_timeout - (now - self.opened_at), 0.0))
+    
+    def cancel_call(self):
+        """Release a call permitted by before_call() that never reached the upstream."""
+        with self._lock:
+            self._trial_in_flight = False
+    
+    def record_success(self):
+        """Record a call that reached a healthy upstream."""
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Gemini circuit closed after a successful trial call")
+                self.state = self.CLOSED
+                self._trial_in_flight = False
+            now = time.monotonic()
+            self._outcomes.append((now, 0))
+            self._trim(now)
+    
+    def record_failure(self):
+        """Record a call that failed because of the upstream."""
+        with self._lock:
+            now = time.monotonic()
+            if self.state != self.CLOSED:
+                logger.warning("Gemini trial call failed; circuit open again")
+                self._open(now)
+                return
+            self._outcomes.append((now, 1))
+            self._failures += 1
+            self._trim(now)
+            calls = len(self._outcomes)
+            if calls >= self.min_calls and self._failures / calls >= self.failure_rate:
+                logger.error("Opening Gemini circuit: %s of %s calls failed in the last %.0f s",
+                             self._failures, calls, self.window)
+                self._open(now)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return the circuit state and counters."""
+        with self._lock:
+            return {
+                'state': self.state,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+                'window_calls': len(self._outcomes),
+                'window_failures': self._failures
+            }
+
+# Shared by every Gemini client in the process, sync and async alike
+gemini_rate_limiter = TokenBucket()
+gemini_circuit_breaker = CircuitBreaker()
@@ -0,0 +1,227 @@
+"""Content-addressed cache for Gemini API responses."""
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from config import (
+    RESPONSE_CACHE_BACKEND, RESPONSE_CACHE_TTL,
+    RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_BYTES
+)
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize a prompt so trivially different copies share a cache key.
+    
+    Args:
+        prompt: The raw prompt text
+    
+    Returns:
+        The prompt with line endings unified and whitespace runs collapsed
+    """
+    return _WHITESPACE_RE.sub(' ', prompt.replace('\r\n', '\n')).strip()
+
+def make_cache_key(prompt: str, model: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+    """Build a cache key from the prompt, model and generation parameters.
+    
+    Args:
+        prompt: The prompt text
+        model: The Gemini model name
+        generation_config: Optional generation parameters sent with the prompt
+    
+    Returns:
+        A hex SHA-256 digest identifying the request
+    """
+    hasher = hashlib.sha256()
+    hasher.update(model.encode('utf-8'))
+    hasher.update(b'\0')
+    hasher.update(json.dumps(generation_config or {}, sort_keys=True).encode('utf-8'))
+    hasher.update(b'\0')
+    hasher.update(normalize_prompt(prompt).encode('utf-8'))
+    return hasher.hexdigest()
+
+class MemoryCacheBackend:
+    """In-process LRU cache with per-entry TTL and a total byte budget."""
+    
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        """Initialize the backend.
+        
+        Args:
+            max_entries: Maximum number of cached responses
+            max_bytes: Maximum total size of cached responses in bytes
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, payload)
+        self._bytes = 0
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached payload for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return payload
+    
+    def set(self, key: str, payload: str, ttl: int):
+        """Store a payload, evicting least recently used entries as needed."""
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, payload)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+    
+    def _remove(self, key: str):
+        _, payload = self._entries.pop(key)
+        self._bytes -= len(payload)
+    
+    def stats(self) -> Dict[str, int]:
+        """Return size and eviction figures for the backend."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'evictions': self.evictions
+            }
+
+class MongoCacheBackend:
+    """Cache backend stored in the ``response_cache`` MongoDB collection.
+    
+    Expired documents are removed by a TTL index on ``expires_at``. Any
+    database error is treated as a cache miss so generation still works
+    without MongoDB.
+    """
+    
+    collection_name = 'response_cache'
+    
+    def __init__(self):
+        self._index_ready = False
+    
+    def _collection(self):
+        from models import mongo
+        collection = mongo.db[self.collection_name]
+        if not self._index_ready:
+            collection.create_index('expires_at', expireAfterSeconds=0)
+            self._index_ready = True
+        return collection
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached payload for key, or None if missing or expired."""
+        try:
+            doc = self._collection().find_one(
+                {'_id': key, 'expires_at': {'$gt': datetime.utcnow()}},
+                {'payload': 1}
+            )
+            return doc['payload'] if doc else None
+        except Exception as e:
+            logger.warning("Response cache lookup failed: %s", e)
+            return None
+    
+    def set(self, key: str, payload: str, ttl: int):
+        """Store a payload with an expiry ``ttl`` seconds from now."""
+        try:
+            self._collection().replace_one(
+                {'_id': key},
+                {'_id': key, 'payload': payload, 'expires_at': datetime.utcnow() + timedelta(seconds=ttl)},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning("Response cache store failed: %s", e)
+    
+    def stats(self) -> Dict[str, int]:
+        """Return size figures for the backend."""
+        try:
+            return {'entries': self._collection().estimated_document_count()}
+        except Exception:
+            return {}
+
+class ResponseCache:
+    """Cache of Gemini responses keyed on prompt, model and parameters."""
+    
+    def __init__(self, backend, ttl: int = RESPONSE_CACHE_TTL):
+        """Initialize the cache.
+        
+        Args:
+            backend: Storage backend implementing get/set/stats
+            ttl: Lifetime of cached responses in seconds
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached response.
+        
+        Args:
+            key: Key from make_cache_key
+        
+        Returns:
+            The cached API response, or None on a miss
+        """
+        payload = self.backend.get(key)
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(payload)
+    
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached response without counting a hit or miss."""
+        payload = self.backend.get(key)
+        return json.loads(payload) if payload is not None else None
+    
+    def set(self, key: str, response: Dict[str, Any]):
+        """Store an API response under key."""
+        self.backend.set(key, json.dumps(response), self.ttl)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters merged with backend statistics."""
+        with self._lock:
+            stats = {'hits': self.hits, 'misses': self.misses}
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / total if total else 0.0
+        stats.update(self.backend.stats())
+        return stats
+
+def create_response_cache(backend_name: str = RESPONSE_CACHE_BACKEND) -> Optional[ResponseCache]:
+    """Create the response cache selected by configuration.
+    
+    Args:
+        backend_name: "memory", "mongo" or "none"
+    
+    Returns:
+        A ResponseCache, or None when caching is disabled
+    """
+    if backend_name == 'memory':
+        return ResponseCache(MemoryCacheBackend())
+    if backend_name == 'mongo':
+        return ResponseCache(MongoCacheBackend())
+    if backend_name not in ('none', ''):
+        logger.warning("Unknown RESPONSE_CACHE_BACKEND '%s', response caching disabled", backend_name)
+    return None
@@ -0,0 +1,328 @@
+"""BM25 retrieval over uploaded material, used to ground explanations."""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import (
+    RETRIEVAL_INDEX_DIR, RETRIEVAL_INDEX_MAX_BYTES, RETRIEVAL_CHUNK_TOKENS,
+    RETRIEVAL_TOP_K, RETRIEVAL_MIN_TOKENS
+)
+from services.chunking import chunk_text, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+_TERM_RE = re.compile(r"[a-z0-9]+")
+
+# Very common English words carry no signal for ranking
+STOPWORDS = frozenset("""
+a an and are as at be but by can did do does for from had has have how i if in into is it its
+me my no not of on or our so than that the their them then there these they this to was we were
+what when where which who why will with would you your
+""".split())
+
+CHUNK_SEPARATOR = "\n\n[...]\n\n"
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase index terms, dropping stopwords and single characters."""
+    return [term for term in _TERM_RE.findall(text.lower()) if len(term) > 1 and term not in STOPWORDS]
+
+class BM25Index:
+    """Okapi BM25 index over the chunks of one document.
+    
+    Postings are stored term-major in flat NumPy arrays (CSR layout):
+    the chunks containing term ``t`` are ``doc_ids[indptr[t]:indptr[t + 1]]``
+    with matching ``term_freqs``. A query touches only the postings of its
+    own terms.
+    """
+    
+    def __init__(self, chunks: List[str], terms: List[str], indptr: np.ndarray, doc_ids: np.ndarray,
+                 term_freqs: np.ndarray, doc_lengths: np.ndarray, k1: float = 1.5, b: float = 0.75):
+        """Initialize the index from its arrays; use build() or load() to create one."""
+        self.chunks = chunks
+        self.vocabulary = {term: term_id for term_id, term in enumerate(terms)}
+        self.terms = terms
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        
+        doc_count = len(chunks)
+        doc_freqs = np.diff(indptr)
+        self.idf = np.log1p((doc_count - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+        average_length = float(doc_lengths.mean()) if doc_count and doc_lengths.mean() > 0 else 1.0
+        # Per-chunk length normalization, the part of the BM25 denominator that does not depend on tf
+        self.length_norm = (k1 * (1 - b + b * doc_lengths / average_length)).astype(np.float32)
+    
+    @classmethod
+    def build(cls, chunks: List[str]) -> "BM25Index":
+        """Build an index over a list of chunks.
+        
+        Args:
+            chunks: Chunk texts in document order
+        
+        Returns:
+            The index
+        """
+        vocabulary: Dict[str, int] = {}
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        term_freqs: List[int] = []
+        doc_lengths: List[int] = []
+        for doc_id, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk))
+            for term, count in counts.items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                doc_ids.append(doc_id)
+                term_freqs.append(count)
+            doc_lengths.append(sum(counts.values()))
+        
+        term_id_array = np.asarray(term_ids, dtype=np.int32)
+        order = np.argsort(term_id_array, kind='stable')
+        indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_id_array, minlength=len(vocabulary)), out=indptr[1:])
+        return cls(
+            chunks,
+            list(vocabulary),
+            indptr,
+            np.asarray(doc_ids, dtype=np.int32)[order],
+            np.asarray(term_freqs, dtype=np.float32)[order],
+            np.asarray(doc_lengths, dtype=np.float32)
+        )
+    
+    def search(self, query: str, top_k: int = RETRIEVAL_TOP_K) -> List[Tuple[int, float]]:
+        """Rank chunks against a query.
+        
+        Args:
+            query: The query text
+            top_k: Maximum number of chunks to return
+        
+        Returns:
+            (chunk index, score) pairs with positive scores, best first
+        """
+        if not self.chunks:
+            return []
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            docs = self.doc_ids[start:end]
+            tf = self.term_freqs[start:end]
+            # Each chunk appears once per term, so fancy-index addition is safe
+            scores[docs] += self.idf[term_id] * tf * (self.k1 + 1) / (tf + self.length_norm[docs])
+        
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(int(index), float(scores[index])) for index in top if scores[index] > 0]
+    
+    def save(self, handle):
+        """Write the index to an open binary file as a compressed .npz archive."""
+        np.savez_compressed(
+            handle,
+            chunks=np.array(json.dumps(self.chunks)),
+            terms=np.array(json.dumps(self.terms)),
+            indptr=self.indptr,
+            doc_ids=self.doc_ids,
+            term_freqs=self.term_freqs,
+            doc_lengths=self.doc_lengths
+        )
+    
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Load an index written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                json.loads(str(data['chunks'])),
+                json.loads(str(data['terms'])),
+                data['indptr'],
+                data['doc_ids'],
+                data['term_freqs'],
+                data['doc_lengths']
+            )
+
+class RetrievalIndexStore:
+    """Build, persist and reuse BM25 indexes keyed by SHA-256 of the document text.
+    
+    Indexes are kept in a small in-memory LRU and as ``<digest>.npz`` files
+    on disk, so a document is chunked and indexed once and every later
+    question about it only pays for the query. Files are written
+    atomically and the least recently used ones are removed when the
+    directory grows past ``max_bytes``.
+    """
+    
+    def __init__(self, directory: str = RETRIEVAL_INDEX_DIR, max_bytes: int = RETRIEVAL_INDEX_MAX_BYTES,
+                 chunk_tokens: int = RETRIEVAL_CHUNK_TOKENS, memory_entries: int = 8):
+        """Initialize the store.
+        
+        Args:
+            directory: Directory holding the index files
+            max_bytes: Maximum total size of the index files
+            chunk_tokens: Token budget of each indexed chunk
+            memory_entries: Number of indexes kept loaded in memory
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.chunk_tokens = chunk_tokens
+        self.memory_entries = memory_entries
+        self.queries = 0
+        self.builds = 0
+        self.query_ms_total = 0.0
+        self.last_query_ms = 0.0
+        self._memory: "OrderedDict[str, BM25Index]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}.npz")
+    
+    def get_index(self, text: str) -> BM25Index:
+        """Get the index for a document, loading or building it as needed.
+        
+        Args:
+            text: The full document text
+        
+        Returns:
+            The document's BM25 index
+        """
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        with self._lock:
+            index = self._memory.get(digest)
+            if index is not None:
+                self._memory.move_to_end(digest)
+                return index
+        
+        path = self._path(digest)
+        try:
+            index = BM25Index.load(path)
+            os.utime(path)
+        except FileNotFoundError:
+            index = None
+        except Exception as e:
+            logger.warning("Discarding unreadable retrieval index %s: %s", digest[:12], e)
+            index = None
+        
+        if index is None:
+            start = time.perf_counter()
+            index = BM25Index.build(chunk_text(text, self.chunk_tokens))
+            logger.info("Indexed %s chunks for retrieval in %.1f ms", len(index.chunks),
+                        (time.perf_counter() - start) * 1000)
+            with self._lock:
+                self.builds += 1
+            self._save(digest, index)
+        
+        with self._lock:
+            self._memory[digest] = index
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+        return index
+    
+    def _save(self, digest: str, index: BM25Index):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(digest)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as handle:
+                index.save(handle)
+            os.replace(tmp_path, path)
+            self._evict()
+        except Exception as e:
+            logger.warning("Failed to store retrieval index: %s", e)
+    
+    def _evict(self):
+        """Remove least recently used index files until the store fits its budget."""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if not entry.name.endswith('.npz'):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+    
+    def retrieve(self, query: str, text: str, top_k: int = RETRIEVAL_TOP_K) -> Dict[str, Any]:
+        """Select the chunks of a document most relevant to a query.
+        
+        Args:
+            query: The query text, e.g. the topic to explain
+            text: The full document text
+            top_k: Maximum number of chunks to select
+        
+        Returns:
+            Dictionary with "chunks" (selected chunk texts in document
+            order), "total_chunks", and "query_ms", the time taken
+            including any index load or build
+        """
+        start = time.perf_counter()
+        index = self.get_index(text)
+        hits = index.search(query, top_k)
+        chunks = [index.chunks[position] for position in sorted(position for position, _ in hits)]
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        with self._lock:
+            self.queries += 1
+            self.query_ms_total += elapsed_ms
+            self.last_query_ms = elapsed_ms
+        return {'chunks': chunks, 'total_chunks': len(index.chunks), 'query_ms': elapsed_ms}
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return query and build counters and query latency figures."""
+        with self._lock:
+            return {
+                'queries': self.queries,
+                'builds': self.builds,
+                'loaded_indexes': len(self._memory),
+                'last_query_ms': self.last_query_ms,
+                'mean_query_ms': self.query_ms_total / self.queries if self.queries else 0.0
+            }
+
+retrieval_store = RetrievalIndexStore()
+
+def select_context(topic: str, context: Optional[str], top_k: int = RETRIEVAL_TOP_K) -> Optional[str]:
+    """Reduce explanation context to the chunks most relevant to the topic.
+    
+    Context small enough to send whole is returned unchanged, as is
+    context in which no chunk matches the topic.
+    
+    Args:
+        topic: The topic to explain
+        context: The full study material, if any
+        top_k: Maximum number of chunks to keep
+    
+    Returns:
+        The grounded context
+    """
+    if not context or estimate_tokens(context) <= RETRIEVAL_MIN_TOKENS:
+        return context
+    
+    try:
+        result = retrieval_store.retrieve(topic, context, top_k)
+    except Exception as e:
+        logger.warning("Retrieval failed, using the full context: %s", e)
+        return context
+    
+    logger.info("Retrieved %s of %s chunks for '%s' in %.1f ms", len(result['chunks']), result['total_chunks'],
+                topic[:50], result['query_ms'])
+    if not result['chunks']:
+        return context
+    return CHUNK_SEPARATOR.join(result['chunks'])
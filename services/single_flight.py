@@ -0,0 +1,261 @@
+"""Coalescing of identical in-flight Gemini requests."""
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config import GEMINI_COALESCE_BACKEND, GEMINI_LEASE_TTL, GEMINI_LEASE_POLL_INTERVAL, RESPONSE_CACHE_BACKEND
+
+logger = logging.getLogger(__name__)
+
+class _Flight:
+    """One upstream call and the callers waiting on it."""
+    
+    __slots__ = ('done', 'result', 'error')
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Run at most one call per key at a time within the process.
+    
+    The first caller for a key (the leader) runs the function; callers
+    arriving with the same key while it runs wait for it and receive the
+    same result or exception instead of making their own call.
+    """
+    
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+    
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """Call func, or wait for the in-flight call with the same key.
+        
+        Args:
+            key: Identity of the call, e.g. a response cache key
+            func: The call to make if none is in flight
+        
+        Returns:
+            The result of func, shared by every caller of the flight
+        
+        Raises:
+            Exception: Whatever func raised, re-raised in every waiting caller
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+        
+        if not leader:
+            logger.debug("Coalesced call %s with the one in flight", key[:12])
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        
+        try:
+            flight.result = func()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+    
+    def stats(self) -> Dict[str, int]:
+        """Return leader and coalesced call counts and the number of calls in flight."""
+        with self._lock:
+            return {'leaders': self.leaders, 'coalesced': self.coalesced, 'in_flight': len(self._flights)}
+
+class AsyncSingleFlight(SingleFlight):
+    """SingleFlight for coroutines on one event loop.
+    
+    The leader's call runs as its own task, so a caller that is cancelled
+    (for example when its client disconnects) does not cancel the call
+    the other callers are waiting on.
+    """
+    
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Await func, or the in-flight call with the same key; see SingleFlight.do()."""
+        with self._lock:
+            task = self._flights.get(key)
+            if task is None:
+                task = self._flights[key] = asyncio.ensure_future(func())
+                task.add_done_callback(lambda _: self._finish(key))
+                self.leaders += 1
+            else:
+                logger.debug("Coalesced call %s with the one in flight", key[:12])
+                self.coalesced += 1
+        return await asyncio.shield(task)
+    
+    def _finish(self, key: str):
+        with self._lock:
+            self._flights.pop(key, None)
+
+class MongoLease:
+    """Cross-process single flight through lease documents in MongoDB.
+    
+    A process about to call the API for a key first inserts a lease
+    document for it in ``generation_leases``. Processes that find the lease
+    held wait for the holder's response to appear in the shared response
+    cache instead of calling the API themselves. Leases expire after
+    ``ttl`` seconds, so a holder that dies only delays the others.
+    """
+    
+    collection_name = 'generation_leases'
+    
+    def __init__(self, ttl: float = GEMINI_LEASE_TTL, poll_interval: float = GEMINI_LEASE_POLL_INTERVAL):
+        """Initialize the lease manager.
+        
+        Args:
+            ttl: Seconds before an unreleased lease may be taken over
+            poll_interval: Seconds between checks while waiting on another process
+        """
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.owner_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self.acquired = 0
+        self.waited = 0
+        self.served_by_peer = 0
+        self.fallbacks = 0
+        self._index_ready = False
+        self._lock = threading.Lock()
+    
+    def _collection(self):
+        from models import mongo
+        collection = mongo.db[self.collection_name]
+        if not self._index_ready:
+            collection.create_index('expires_at', expireAfterSeconds=0)
+            self._index_ready = True
+        return collection
+    
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+    
+    def acquire(self, key: str) -> Optional[str]:
+        """Try to take the lease for a key.
+        
+        Returns:
+            A token to pass to release(), or None if another process
+            holds the lease. If MongoDB is unavailable a token is returned
+            so the caller goes ahead on its own.
+        """
+        token = f"{self.owner_prefix}:{uuid.uuid4().hex}"
+        now = datetime.utcnow()
+        lease = {'owner': token, 'expires_at': now + timedelta(seconds=self.ttl)}
+        try:
+            from pymongo.errors import DuplicateKeyError
+            collection = self._collection()
+            try:
+                collection.insert_one({'_id': key, **lease})
+            except DuplicateKeyError:
+                # The TTL monitor only runs once a minute, so take over expired leases directly
+                result = collection.update_one({'_id': key, 'expires_at': {'$lte': now}}, {'$set': lease})
+                if result.modified_count != 1:
+                    self._count('waited')
+                    return None
+        except Exception as e:
+            logger.warning("Generation lease unavailable, calling without it: %s", e)
+            return token
+        
+        self._count('acquired')
+        return token
+    
+    def is_held(self, key: str) -> bool:
+        """Return True if an unexpired lease exists for the key."""
+        try:
+            return self._collection().count_documents(
+                {'_id': key, 'expires_at': {'$gt': datetime.utcnow()}}, limit=1
+            ) > 0
+        except Exception:
+            return False
+    
+    def wait_for_result(self, key: str, lookup: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Wait for the lease holder's result while its lease is held.
+        
+        Args:
+            key: The leased key
+            lookup: Returns the holder's result once it is available, else None
+        
+        Returns:
+            The result, or None if the lease ended or expired without one,
+            in which case the caller should make the call itself
+        """
+        deadline = time.monotonic() + self.ttl
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            result = lookup()
+            if result is not None:
+                self._count('served_by_peer')
+                return result
+            if not self.is_held(key):
+                break
+        self._count('fallbacks')
+        return None
+    
+    async def await_result(self, key: str, lookup: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Async variant of wait_for_result(); database lookups run on worker threads."""
+        deadline = time.monotonic() + self.ttl
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            result = await asyncio.to_thread(lookup)
+            if result is not None:
+                self._count('served_by_peer')
+                return result
+            if not await asyncio.to_thread(self.is_held, key):
+                break
+        self._count('fallbacks')
+        return None
+    
+    def release(self, key: str, token: str):
+        """Release a lease taken with acquire()."""
+        try:
+            self._collection().delete_one({'_id': key, 'owner': token})
+        except Exception as e:
+            logger.warning("Failed to release generation lease: %s", e)
+    
+    def stats(self) -> Dict[str, int]:
+        """Return lease counters."""
+        with self._lock:
+            return {
+                'acquired': self.acquired,
+                'waited': self.waited,
+                'served_by_peer': self.served_by_peer,
+                'fallbacks': self.fallbacks
+            }
+
+def create_lease(backend_name: str = GEMINI_COALESCE_BACKEND) -> Optional[MongoLease]:
+    """Create the cross-process lease selected by configuration.
+    
+    Args:
+        backend_name: "mongo" for cross-process coalescing; "memory" or
+            "none" for none
+    
+    Returns:
+        A MongoLease, or None
+    """
+    if backend_name != 'mongo':
+        return None
+    if RESPONSE_CACHE_BACKEND != 'mongo':
+        # Waiting processes read the leader's result from the shared cache
+        logger.warning("GEMINI_COALESCE_BACKEND=mongo needs RESPONSE_CACHE_BACKEND=mongo; "
+                       "coalescing within each process only")
+        return None
+    return MongoLease()
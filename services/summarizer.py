@@ -1,5 +1,5 @@
 import logging
-from services.gemini_client import GeminiClient
+from services.gemini_client import get_gemini_client
 
 logger = logging.getLogger(__name__)
 
@@ -7,12 +7,16 @@ class Summarizer:
     """Service to handle text summarization logic."""
     
     def __init__(self):
-        """Initialize the summarizer with a Gemini client."""
-        self.gemini_client = GeminiClient()
+        """Initialize the summarizer with the shared Gemini client."""
+        self.gemini_client = get_gemini_client()
     
     def summarize_text(self, text: str) -> str:
         """Summarize the given text using Gemini AI.
         
+        Text that fits the prompt budget is summarized in one call; only
+        text over the budget is summarized with the map-reduce
+        ChunkedSummarizer, as decided by GeminiClient.generate_summary.
+        
         Args:
             text: The text content to summarize
             
@@ -24,9 +28,41 @@ class Summarizer:
             summary = self.gemini_client.generate_summary(text)
             return summary
         except Exception as e:
-            logger.error(f"Error in summarize_text: {str(e)}")
+            logger.error("Error in summarize_text: %s", e)
             raise
     
+    def _build_key_points_prompt(self, text: str, max_points: int) -> str:
+        """Build the prompt used to extract key points."""
+        return f"""Extract the {max_points} most important key points from the following text:
+
+{text}
+
+Format your response as a list, with each key point clearly and briefly stated.
+"""
+    
+    def _build_categories_prompt(self, text: str) -> str:
+        """Build the prompt used to categorize content into topics."""
+        return f"""Analyze the following study material and categorize it into 3-5 main topics or sections:
+
+{text}
+
+For each category/topic, provide:
+1. A clear title for the category
+2. A brief summary of what this category covers
+3. The key points within this category
+
+Format your response as a JSON object with this structure:
+{{
+  "categories": [
+    {{
+      "title": "Category Title",
+      "summary": "Brief summary of this category",
+      "key_points": ["Point 1", "Point 2", "Point 3"]
+    }}
+  ]
+}}
+"""
+    
     def extract_key_points(self, text: str, max_points: int = 5) -> list:
         """Extract key points from the text.
         
@@ -38,16 +74,12 @@ class Summarizer:
             A list of key points
         """
         try:
-            # Construct a prompt to extract key points
-            prompt = f"""Extract the {max_points} most important key points from the following text:
-
-{text}
-
-Format your response as a list, with each key point clearly and briefly stated.
-"""
+            # Construct a prompt to extract key points, keeping the text within the prompt budget
+            text = self.gemini_client.fit_content('key_points', text, self._build_key_points_prompt("", max_points))
+            prompt = self._build_key_points_prompt(text, max_points)
             
             # Use the Gemini client to process the prompt
-            response = self.gemini_client._make_api_call(prompt)
+            response = self.gemini_client._make_api_call(prompt, kind='key_points')
             key_points_text = response.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '')
             
             # Process the response into a list
@@ -60,7 +92,7 @@ Format your response as a list, with each key point clearly and briefly stated.
             return key_points[:max_points]
             
         except Exception as e:
-            logger.error(f"Error in extract_key_points: {str(e)}")
+            logger.error("Error in extract_key_points: %s", e)
             raise
     
     def categorize_content(self, text: str) -> dict:
@@ -73,30 +105,12 @@ Format your response as a list, with each key point clearly and briefly stated.
             A dictionary with categories and their relevant content
         """
         try:
-            # Construct a prompt to categorize content
-            prompt = f"""Analyze the following study material and categorize it into 3-5 main topics or sections:
-
-{text}
-
-For each category/topic, provide:
-1. A clear title for the category
-2. A brief summary of what this category covers
-3. The key points within this category
-
-Format your response as a JSON object with this structure:
-{{
-  "categories": [
-    {{
-      "title": "Category Title",
-      "summary": "Brief summary of this category",
-      "key_points": ["Point 1", "Point 2", "Point 3"]
-    }}
-  ]
-}}
-"""
+            # Construct a prompt to categorize content, keeping the text within the prompt budget
+            text = self.gemini_client.fit_content('categories', text, self._build_categories_prompt(""))
+            prompt = self._build_categories_prompt(text)
             
             # Use the Gemini client to process the prompt
-            response = self.gemini_client._make_api_call(prompt)
+            response = self.gemini_client._make_api_call(prompt, kind='categories')
             response_text = response.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '')
             
             # Extract JSON from the response text
@@ -114,5 +128,5 @@ Format your response as a JSON object with this structure:
             return categories
             
         except Exception as e:
-            logger.error(f"Error in categorize_content: {str(e)}")
+            logger.error("Error in categorize_content: %s", e)
             raise
@@ -0,0 +1,141 @@
+"""Streams of extracted text segments and the incremental consumers that read them.
+
+Extractors yield a document as TextSegment objects whose texts, joined,
+form the document text. Word counts and content hashes are computed from
+the stream one segment at a time, so neither needs the joined text or a
+list of its words.
+"""
+import hashlib
+import re
+from typing import Iterable, Optional
+
+_WORD_RE = re.compile(r'\S+')
+
+class TextSegment:
+    """A consecutive piece of a document's text.
+    
+    Attributes:
+        text: The text, including any separator before the next segment
+        page: 1-based PDF page the text is on, if known
+        section: 0-based index of the DOCX paragraph or table cell, if known
+    """
+    
+    __slots__ = ('text', 'page', 'section')
+    
+    def __init__(self, text: str, page: Optional[int] = None, section: Optional[int] = None):
+        self.text = text
+        self.page = page
+        self.section = section
+    
+    def __repr__(self):
+        return f"TextSegment({self.text[:30]!r}..., page={self.page}, section={self.section})"
+
+class WordCounter:
+    """Count whitespace-separated words of a text fed in pieces.
+    
+    Matches ``len(text.split())`` on the joined text, including words
+    that straddle two pieces, without building the list of words.
+    """
+    
+    def __init__(self):
+        self.count = 0
+        self._in_word = False
+    
+    def feed(self, text: str):
+        """Count the words in the next piece of text."""
+        if not text:
+            return
+        count = sum(1 for _ in _WORD_RE.finditer(text))
+        if self._in_word and not text[0].isspace():
+            # The first word continues the one the previous piece ended in
+            count -= 1
+        self.count += count
+        self._in_word = not text[-1].isspace()
+
+class PreviewBuilder:
+    """Build a whitespace-normalized, truncated preview of a text fed in pieces.
+    
+    Stops collecting as soon as the preview is known, so only the start of
+    the document is ever held.
+    """
+    
+    def __init__(self, max_length: int = 200):
+        """Initialize the builder.
+        
+        Args:
+            max_length: Maximum length of the preview, ellipsis included
+        """
+        self.max_length = max_length
+        self._normalized = ''
+        self._in_word = False
+        self.done = False
+    
+    def feed(self, text: str):
+        """Add the next piece of text, unless the preview is already complete."""
+        if self.done or not text:
+            return
+        words = text.split()
+        if words:
+            if self._in_word and not text[0].isspace():
+                self._normalized += words.pop(0)
+            if words:
+                self._normalized += (" " if self._normalized else "") + " ".join(words)
+        self._in_word = not text[-1].isspace()
+        # A word still being read may grow, but never below the truncation point
+        self.done = len(self._normalized) > self.max_length
+    
+    @property
+    def preview(self) -> str:
+        """The preview, ending in "..." if the text was truncated."""
+        if len(self._normalized) <= self.max_length:
+            return self._normalized
+        return self._normalized[:self.max_length - 3] + "..."
+
+class ExtractedText:
+    """The text of a document plus statistics gathered while it was read.
+    
+    Attributes:
+        text: The joined document text
+        word_count: Number of whitespace-separated words
+        sha256: Hex SHA-256 of the UTF-8 encoded text, which is also its
+            ID in the documents collection
+    """
+    
+    def __init__(self, text: str, word_count: int, sha256: str):
+        self.text = text
+        self.word_count = word_count
+        self.sha256 = sha256
+    
+    @classmethod
+    def from_segments(cls, segments: Iterable[TextSegment]) -> 'ExtractedText':
+        """Read a segment stream once, feeding every consumer as it goes.
+        
+        Args:
+            segments: The extracted segments, in document order
+        
+        Returns:
+            The joined text and its statistics
+        """
+        parts = []
+        words = WordCounter()
+        hasher = hashlib.sha256()
+        for segment in segments:
+            parts.append(segment.text)
+            words.feed(segment.text)
+            hasher.update(segment.text.encode('utf-8', 'surrogatepass'))
+        return cls("".join(parts), words.count, hasher.hexdigest())
+    
+    @classmethod
+    def from_text(cls, text: str) -> 'ExtractedText':
+        """Gather the statistics of text that was not extracted, e.g. pasted text."""
+        return cls.from_segments([TextSegment(text)])
+
+def build_preview(text: str, max_length: int = 200) -> str:
+    """Return a whitespace-normalized preview of a text; see PreviewBuilder."""
+    builder = PreviewBuilder(max_length)
+    # Feed in blocks so a long text is only normalized up to the preview
+    for start in range(0, len(text), max_length * 4):
+        builder.feed(text[start:start + max_length * 4])
+        if builder.done:
+            break
+    return builder.preview
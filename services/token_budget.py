@@ -0,0 +1,177 @@
+"""Prompt-size budgeting and token accounting for Gemini calls."""
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from config import PROMPT_MAX_TOKENS, PROMPT_BUDGET_POLICIES
+from services.chunking import CHARS_PER_TOKEN, chunk_text, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# What to do with material that does not fit the prompt budget
+POLICIES = ('truncate', 'sample', 'chunk', 'reject')
+
+TRUNCATION_MARKER = "\n\n[Remaining material omitted to fit the prompt size limit]"
+SAMPLE_SEPARATOR = "\n\n[...]\n\n"
+
+class PromptTooLargeError(ValueError):
+    """Raised when material exceeds the prompt budget under the "reject" policy."""
+
+def parse_policies(spec: str) -> Dict[str, str]:
+    """Parse a "kind=policy,kind=policy" string into a dictionary.
+    
+    Args:
+        spec: Comma-separated kind=policy pairs
+    
+    Returns:
+        Mapping of call kind to policy name
+    
+    Raises:
+        ValueError: If a policy name is not recognized
+    """
+    policies = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        kind, _, policy = item.partition('=')
+        policy = policy.strip().lower()
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown prompt budget policy '{policy}' for '{kind.strip()}'")
+        policies[kind.strip()] = policy
+    return policies
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Keep the start of text within max_tokens, cutting at a paragraph or word boundary."""
+    max_chars = max(max_tokens * CHARS_PER_TOKEN - len(TRUNCATION_MARKER), 0)
+    head = text[:max_chars]
+    for boundary in ('\n\n', '\n', ' '):
+        cut = head.rfind(boundary)
+        # Only back off to a boundary if it keeps most of the budget
+        if cut > max_chars * 0.8:
+            head = head[:cut]
+            break
+    return head.rstrip() + TRUNCATION_MARKER
+
+def sample_to_tokens(text: str, max_tokens: int, sections: int = 8) -> str:
+    """Keep evenly spaced sections of text so the whole document is represented.
+    
+    Args:
+        text: The material to reduce
+        max_tokens: Token budget for the result
+        sections: Number of sections to keep
+    
+    Returns:
+        The sampled sections joined with an omission marker
+    """
+    separator_tokens = estimate_tokens(SAMPLE_SEPARATOR)
+    section_tokens = max(max_tokens // sections - separator_tokens, 1)
+    chunks = chunk_text(text, section_tokens)
+    if len(chunks) <= sections:
+        return truncate_to_tokens(text, max_tokens)
+    step = len(chunks) / sections
+    return SAMPLE_SEPARATOR.join(chunks[int(index * step)] for index in range(sections))
+
+class TokenBudget:
+    """Per-call-kind policy for material that would overflow the prompt budget.
+    
+    Each kind of call ("summary", "quiz", "explanation", ...) has a policy:
+    ``truncate`` keeps the start of the material, ``sample`` keeps evenly
+    spaced sections, ``chunk`` leaves the material whole for the caller to
+    summarize with map-reduce, and ``reject`` fails fast instead of sending
+    a prompt upstream that would be refused or billed needlessly.
+    """
+    
+    def __init__(self, max_tokens: int = PROMPT_MAX_TOKENS, policies: Optional[Dict[str, str]] = None,
+                 default_policy: str = 'truncate'):
+        """Initialize the budget.
+        
+        Args:
+            max_tokens: Maximum estimated tokens for a whole prompt
+            policies: Mapping of call kind to policy; defaults to configuration
+            default_policy: Policy for kinds without an entry
+        """
+        self.max_tokens = max_tokens
+        self.policies = policies if policies is not None else parse_policies(PROMPT_BUDGET_POLICIES)
+        self.default_policy = default_policy
+    
+    def policy_for(self, kind: str) -> str:
+        """Return the policy applied to a call kind."""
+        return self.policies.get(kind, self.default_policy)
+    
+    def exceeds(self, material: str, overhead_tokens: int = 0) -> bool:
+        """Return True if material plus the prompt overhead is over budget."""
+        return estimate_tokens(material) + overhead_tokens > self.max_tokens
+    
+    def fit(self, kind: str, material: str, overhead_tokens: int = 0) -> str:
+        """Reduce material so that its prompt fits the budget.
+        
+        Args:
+            kind: The kind of call the material is for
+            material: The document or context text
+            overhead_tokens: Tokens used by the rest of the prompt
+        
+        Returns:
+            The material, reduced if the policy calls for it. Under the
+            "chunk" policy it is returned unchanged.
+        
+        Raises:
+            PromptTooLargeError: If the material is over budget and the policy is "reject"
+        """
+        if not self.exceeds(material, overhead_tokens):
+            return material
+        
+        policy = self.policy_for(kind)
+        available = max(self.max_tokens - overhead_tokens, 1)
+        logger.info("%s prompt needs ~%s tokens, budget is %s; applying '%s'", kind,
+                    estimate_tokens(material) + overhead_tokens, self.max_tokens, policy)
+        if policy == 'truncate':
+            return truncate_to_tokens(material, available)
+        if policy == 'sample':
+            return sample_to_tokens(material, available)
+        if policy == 'reject':
+            raise PromptTooLargeError(
+                f"Material is too large: about {estimate_tokens(material)} tokens, limit is {available}"
+            )
+        return material
+
+class TokenUsage:
+    """Thread-safe per-kind counters of prompt and response tokens."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, int]] = {}
+    
+    def record(self, kind: str, prompt_tokens: int, response_tokens: int, estimated: bool):
+        """Record the token counts of one call.
+        
+        Args:
+            kind: The kind of call
+            prompt_tokens: Tokens in the prompt
+            response_tokens: Tokens in the generated response
+            estimated: True if the counts are local estimates rather than API-reported
+        """
+        with self._lock:
+            totals = self._totals.setdefault(kind, {
+                'calls': 0, 'prompt_tokens': 0, 'response_tokens': 0, 'estimated_calls': 0
+            })
+            totals['calls'] += 1
+            totals['prompt_tokens'] += prompt_tokens
+            totals['response_tokens'] += response_tokens
+            if estimated:
+                totals['estimated_calls'] += 1
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return a copy of the per-kind totals."""
+        with self._lock:
+            return {kind: dict(totals) for kind, totals in self._totals.items()}
+
+def usage_from_response(response: Dict[str, Any], prompt: str, text: str):
+    """Get (prompt_tokens, response_tokens, estimated) for a call.
+    
+    Counts reported in the response's ``usageMetadata`` are used when
+    present; otherwise both sides are estimated locally.
+    """
+    metadata = response.get('usageMetadata') or {}
+    if 'promptTokenCount' in metadata:
+        return metadata['promptTokenCount'], metadata.get('candidatesTokenCount', estimate_tokens(text)), False
+    return estimate_tokens(prompt), estimate_tokens(text), True
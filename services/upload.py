@@ -0,0 +1,234 @@
+"""Upload ingestion: request size limits, spooling and file type sniffing.
+
+Every uploaded document goes through spool_upload(), which gets it into a
+temporary file along with its hash and identifies its type from its first
+bytes, whatever its name says. Flask's form parser already writes uploaded
+files to hashed temporary files, which spool_upload() takes over; other
+streams are copied while hashing.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import zipfile
+from functools import wraps
+from typing import Iterable, Optional
+
+from flask import Request, flash, jsonify, redirect, request, url_for
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
+
+from config import MAX_UPLOAD_BYTES, MAX_FORM_MEMORY_BYTES
+from services.pdf_extractor import spool_to_tempfile
+
+logger = logging.getLogger(__name__)
+
+# Document types the extractors handle
+SUPPORTED_TYPES = ('txt', 'pdf', 'docx')
+
+# Bytes read from the start of a file to identify it
+_SNIFF_BYTES = 8192
+# Readers accept a PDF header anywhere in the first kilobyte
+_PDF_HEADER_WINDOW = 1024
+# Control characters that plain text may contain: tab, newline, form feed, carriage return, escape
+_TEXT_CONTROL_CHARS = {0x09, 0x0a, 0x0c, 0x0d, 0x1b}
+
+class UnsupportedFileError(ValueError):
+    """Raised when an upload is not one of the accepted document types."""
+    
+    def __init__(self, allowed: Iterable[str] = SUPPORTED_TYPES):
+        super().__init__(f'File type not supported. Please upload {", ".join(allowed)} files')
+
+def _looks_like_text(head: bytes) -> bool:
+    """Return True if the start of a file looks like plain text in any 8-bit encoding."""
+    if b'\x00' in head:
+        return False
+    control = sum(1 for byte in head if byte < 0x20 and byte not in _TEXT_CONTROL_CHARS)
+    return control <= len(head) // 100
+
+def sniff_file_type(path: str) -> Optional[str]:
+    """Identify a file from its content.
+    
+    Args:
+        path: Path of the file
+    
+    Returns:
+        "pdf", "docx", "zip" (any other zip archive), "txt", or None if
+        the file is none of these
+    """
+    with open(path, 'rb') as handle:
+        head = handle.read(_SNIFF_BYTES)
+    
+    # Checked first: an archive may store a PDF uncompressed near its start
+    if head.startswith((b'PK\x03\x04', b'PK\x05\x06')):
+        try:
+            with zipfile.ZipFile(path) as archive:
+                # Only the central directory is read
+                names = set(archive.namelist())
+        except zipfile.BadZipFile:
+            return None
+        return 'docx' if 'word/document.xml' in names else 'zip'
+    if b'%PDF-' in head[:_PDF_HEADER_WINDOW]:
+        return 'pdf'
+    if _looks_like_text(head):
+        return 'txt'
+    return None
+
+class SpooledUpload:
+    """An uploaded file copied to a temporary file; use as a context manager.
+    
+    Attributes:
+        filename: Sanitized file name
+        file_type: Type sniffed from the content, see sniff_file_type()
+        path: Temporary file holding the upload, deleted by close()
+        digest: Hex SHA-256 of the file
+        size: Size of the file in bytes
+    """
+    
+    def __init__(self, filename: str, file_type: Optional[str], path: str, digest: str, size: int):
+        self.filename = filename
+        self.file_type = file_type
+        self.path = path
+        self.digest = digest
+        self.size = size
+    
+    def close(self):
+        """Delete the temporary file."""
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class UploadTempFile:
+    """Temporary file the form parser writes an uploaded file to, hashing it on the way.
+    
+    spool_upload() takes the file over with claim() instead of copying it.
+    A file nobody claimed is deleted when the request closes it.
+    
+    Attributes:
+        path: Path of the temporary file
+        size: Number of bytes written
+    """
+    
+    def __init__(self):
+        fd, self.path = tempfile.mkstemp(prefix='upload-')
+        self._file = os.fdopen(fd, 'wb+')
+        self._hasher = hashlib.sha256()
+        self._claimed = False
+        self.size = 0
+    
+    def write(self, data) -> int:
+        self._hasher.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+    
+    def claim(self) -> str:
+        """Take ownership of the file; it is no longer deleted on close()."""
+        self._file.flush()
+        self._claimed = True
+        return self.path
+    
+    @property
+    def digest(self) -> str:
+        """Hex SHA-256 of the bytes written."""
+        return self._hasher.hexdigest()
+    
+    def close(self):
+        self._file.close()
+        if not self._claimed:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+    
+    def __iter__(self):
+        return iter(self._file)
+    
+    def __getattr__(self, name):
+        # Reading, seeking and the rest go to the underlying file
+        return getattr(self._file, name)
+
+def spool_upload(stream, filename: str, allowed: Optional[Iterable[str]] = SUPPORTED_TYPES) -> SpooledUpload:
+    """Spool an upload to disk, hashing it and sniffing its type.
+    
+    A stream the form parser already wrote to an UploadTempFile is used in
+    place; any other stream is copied to a temporary file.
+    
+    Args:
+        stream: Readable binary stream of the upload
+        filename: Name the client gave the file
+        allowed: Accepted types, or None to accept any (file_type may then be None)
+    
+    Returns:
+        The spooled upload; the caller must close it
+    
+    Raises:
+        UnsupportedFileError: If the sniffed type is not allowed
+    """
+    if isinstance(stream, UploadTempFile):
+        path, digest, size = stream.claim(), stream.digest, stream.size
+    else:
+        hasher = hashlib.sha256()
+        path = spool_to_tempfile(stream, hasher=hasher)
+        digest, size = hasher.hexdigest(), os.path.getsize(path)
+    try:
+        file_type = sniff_file_type(path)
+    except Exception:
+        os.unlink(path)
+        raise
+    
+    upload = SpooledUpload(secure_filename(filename or '') or 'upload', file_type, path, digest, size)
+    if allowed is not None and file_type not in allowed:
+        upload.close()
+        logger.info("Rejected upload %s sniffed as %s", upload.filename, file_type or 'unknown')
+        raise UnsupportedFileError(allowed)
+    return upload
+
+def upload_limit(max_bytes: int):
+    """Decorate a view to accept request bodies up to max_bytes instead of MAX_UPLOAD_BYTES.
+    
+    The limit is set before the body is read, so it applies to the 413
+    check on the declared length as well as to the form parser.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            request.max_content_length = max_bytes
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class UploadRequest(Request):
+    """Flask request that writes uploaded files to UploadTempFile objects."""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadTempFile()
+
+def init_upload_limits(app):
+    """Apply the upload limits and upload temporary files to a Flask app.
+    
+    Bodies over MAX_UPLOAD_BYTES, or the limit a view sets with
+    upload_limit(), are rejected with 413 as soon as their declared length
+    is seen, or once that much has been read from a body of unknown
+    length. Browsers are sent back to the page with a message naming the
+    limit; other clients get a JSON error.
+    """
+    app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+    app.config['MAX_FORM_MEMORY_SIZE'] = MAX_FORM_MEMORY_BYTES
+    app.request_class = UploadRequest
+    
+    @app.errorhandler(RequestEntityTooLarge)
+    def upload_too_large(error):
+        limit = request.max_content_length or MAX_UPLOAD_BYTES
+        message = f'The upload is too large. The limit is {limit // (1024 * 1024)} MB.'
+        logger.info("Rejected %s request to %s: body over %s bytes", request.method, request.path, limit)
+        if request.accept_mimetypes.best_match(['application/json', 'text/html']) == 'text/html':
+            flash(message, 'danger')
+            return redirect(request.referrer or url_for('index'))
+        return jsonify({'error': message}), 413
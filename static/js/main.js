@@ -62,11 +62,17 @@ document.addEventListener('DOMContentLoaded', function() {
             if (submitButton) {
                 // Store the original button content
                 const originalContent = submitButton.innerHTML;
+                submitButton.dataset.originalContent = originalContent;
                 
                 // Update button to show loading state
                 submitButton.innerHTML = '<span class="spinner-border spinner-border-sm me-2" role="status" aria-hidden="true"></span>Processing...';
                 submitButton.disabled = true;
                 
+                // Streaming forms reset the button themselves when the stream ends
+                if (this.dataset.streamUrl) {
+                    return;
+                }
+                
                 // Reset button after 30 seconds (in case the form submission takes too long or fails)
                 setTimeout(() => {
                     if (submitButton.disabled) {
@@ -77,4 +83,106 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         });
     });
+
+    // Stream results over server-sent events for forms that opt in with data-stream-url
+    forms.forEach(form => {
+        if (!form.dataset.streamUrl) {
+            return;
+        }
+        form.addEventListener('submit', function(event) {
+            if (event.defaultPrevented) {
+                return;
+            }
+            event.preventDefault();
+            streamForm(form);
+        });
+    });
 });
+
+/**
+ * Submit a form to its data-stream-url and render the streamed text.
+ *
+ * The output element is named by data-stream-target and its card by
+ * data-stream-container. The server sends unnamed events with text pieces,
+ * then a "done" or "error" event.
+ */
+async function streamForm(form) {
+    const container = document.querySelector(form.dataset.streamContainer);
+    const output = document.querySelector(form.dataset.streamTarget);
+    const submitButton = form.querySelector('button[type="submit"]');
+    
+    const finish = () => {
+        if (submitButton) {
+            submitButton.innerHTML = submitButton.dataset.originalContent;
+            submitButton.disabled = false;
+        }
+    };
+    const showError = (message) => {
+        const alert = document.createElement('div');
+        alert.className = 'alert alert-danger mt-3';
+        alert.textContent = message;
+        output.appendChild(alert);
+    };
+    
+    output.textContent = '';
+    container.classList.remove('d-none');
+    
+    try {
+        const response = await fetch(form.dataset.streamUrl, {
+            method: 'POST',
+            body: new FormData(form)
+        });
+        
+        if (!response.ok) {
+            const body = await response.json().catch(() => ({}));
+            showError(body.error || `Request failed with status ${response.status}`);
+            return;
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, { stream: true });
+            
+            // Events are separated by a blank line
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                
+                let eventName = 'message';
+                let data = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) {
+                        eventName = line.slice(6).trim();
+                    } else if (line.startsWith('data:')) {
+                        data += line.slice(5).trim();
+                    }
+                });
+                if (!data) {
+                    continue;
+                }
+                
+                const payload = JSON.parse(data);
+                if (eventName === 'message') {
+                    output.appendChild(document.createTextNode(payload.text));
+                } else if (eventName === 'error') {
+                    showError(payload.error);
+                } else if (eventName === 'done') {
+                    form.dispatchEvent(new CustomEvent('stream:done', { detail: payload }));
+                }
+            }
+        }
+    } catch (err) {
+        console.error('Streaming request failed: ', err);
+        showError('Connection lost while generating. Please try again.');
+    } finally {
+        finish();
+    }
+}